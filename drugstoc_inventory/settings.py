@@ -83,6 +83,98 @@ DATABASES = {
 }
 
 
+# Cache
+# Redis (django-redis) when REDIS_URL is set, otherwise an in-process cache
+
+REDIS_URL = env("REDIS_URL", default=None)
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": REDIS_URL,
+            "OPTIONS": {
+                "CLIENT_CLASS": "django_redis.client.DefaultClient",
+                # A cache outage should degrade to database reads, not errors
+                "IGNORE_EXCEPTIONS": True,
+            },
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "drugstoc-inventory",
+        }
+    }
+
+# Serve product details from the cache. Needs a cache shared by every process (redis),
+# invalidations made by other workers and commands never reach an in-process cache
+PRODUCT_CACHE_ENABLED = env.bool("PRODUCT_CACHE_ENABLED", default=bool(REDIS_URL))
+
+# Seconds a serialized product stays in the cache, invalidation normally evicts it sooner
+PRODUCT_CACHE_TIMEOUT = env.int("PRODUCT_CACHE_TIMEOUT", default=300)
+
+
+# Bulk product upserts
+PRODUCT_BULK_BATCH_SIZE = env.int("PRODUCT_BULK_BATCH_SIZE", default=500)
+PRODUCT_BULK_MAX_ROWS = env.int("PRODUCT_BULK_MAX_ROWS", default=20000)
+
+
+# Most relevant products returned by a search
+PRODUCT_SEARCH_LIMIT = env.int("PRODUCT_SEARCH_LIMIT", default=100)
+
+# Suggestions returned by product autocomplete, by default and at most
+PRODUCT_AUTOCOMPLETE_LIMIT = 10
+PRODUCT_AUTOCOMPLETE_MAX_LIMIT = 50
+
+# Products in a user's buy-again list, by default and at most
+FREQUENT_PRODUCTS_LIMIT = 10
+FREQUENT_PRODUCTS_MAX_LIMIT = 50
+
+
+# Idempotency-Key replays for order creation, kept in the "database" or the "cache"
+IDEMPOTENCY_STORE = env("IDEMPOTENCY_STORE", default="database")
+# Seconds a stored response is replayed for
+IDEMPOTENCY_KEY_TTL = env.int("IDEMPOTENCY_KEY_TTL", default=24 * 60 * 60)
+# Seconds a cache lock on an in-flight request is held at most
+IDEMPOTENCY_LOCK_TIMEOUT = 60
+
+
+# Async order placement (Prefer: respond-async). "worker" leaves queued orders to the
+# process_order_queue command, "eager" places them in-process right after they are queued
+ORDER_QUEUE_MODE = env("ORDER_QUEUE_MODE", default="worker")
+ORDER_QUEUE_BATCH_SIZE = env.int("ORDER_QUEUE_BATCH_SIZE", default=100)
+# Seconds after which an entry claimed by a worker that died is queued again
+ORDER_QUEUE_STALE_AFTER = 600
+
+# Seconds a pending order holds its reserved stock. Once it lapses the
+# release_expired_reservations command hands the units back, the order stays
+# pending and reserves them again when it is completed
+ORDER_RESERVATION_TTL = env.int("ORDER_RESERVATION_TTL", default=30 * 60)
+
+# Bulk order status changes: orders per request and orders locked per transaction
+ORDER_STATUS_MAX_ORDERS = env.int("ORDER_STATUS_MAX_ORDERS", default=10000)
+ORDER_STATUS_BATCH_SIZE = 500
+
+# archive_orders: orders moved per transaction and seconds of pause between batches
+ORDER_ARCHIVE_BATCH_SIZE = env.int("ORDER_ARCHIVE_BATCH_SIZE", default=500)
+ORDER_ARCHIVE_PAUSE = env.float("ORDER_ARCHIVE_PAUSE", default=0.5)
+
+# Sales report buckets per request, e.g. about 41 days of hours or 2.7 years of days
+SALES_REPORT_MAX_BUCKETS = env.int("SALES_REPORT_MAX_BUCKETS", default=1000)
+
+# Best-seller leaderboard kept in "redis" sorted sets (the cache's REDIS_URL) or in the "database"
+LEADERBOARD_BACKEND = env("LEADERBOARD_BACKEND", default="redis" if REDIS_URL else "database")
+# Seconds of sales per bucket, windows slide one bucket at a time
+LEADERBOARD_BUCKET_SECONDS = 300
+# Seconds the database backend serves a top list for before summing the buckets again
+LEADERBOARD_CACHE_TIMEOUT = env.int("LEADERBOARD_CACHE_TIMEOUT", default=60)
+# Top sellers returned, by default and at most
+LEADERBOARD_LIMIT = 10
+LEADERBOARD_MAX_LIMIT = 100
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -1,9 +1,9 @@
 from django.contrib import admin
-from .models import Product, Order, OrderItem
+from .models import Product, Order, OrderItem, ArchivedOrder
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ('id', 'name', 'price', 'quantity', 'created_at', 'updated_at')
+    list_display = ('id', 'name', 'price', 'quantity', 'reserved', 'stock_stripes', 'created_at', 'updated_at')
     list_display_links = ['id', 'name']
     list_filter = ('name',)
     search_fields = ('title', 'description')
@@ -23,4 +23,12 @@ class OrderAdmin(admin.ModelAdmin):
 class OrderItemAdmin(admin.ModelAdmin):
     list_display = ('id', 'quantity', 'price', 'created_at', 'updated_at')
     list_display_links = ['id']
-    ordering = ('-created_at',)
\ No newline at end of file
+    ordering = ('-created_at',)
+
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+    list_display = ('id', 'owner', 'status', 'created_at', 'archived_at')
+    list_display_links = ['id', 'owner']
+    list_filter = ('status',)
+    ordering = ('-created_at',)
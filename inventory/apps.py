@@ -1,6 +1,28 @@
 from django.apps import AppConfig
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_migrate
+
+
+def install_search_index(sender, using, **kwargs):
+    # SQLite table rebuilds drop the product triggers that keep the search index in sync
+    if using != DEFAULT_DB_ALIAS:
+        return
+
+    from django.db import connection
+    from django.db.migrations.recorder import MigrationRecorder
+    from .search import get_search_backend
+
+    backend = get_search_backend()
+    applied = MigrationRecorder(connection).applied_migrations()
+    if backend.migration and (sender.label, backend.migration) in applied:
+        backend.install()
 
 
 class InventoryConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "inventory"
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        post_migrate.connect(install_search_index, sender=self)
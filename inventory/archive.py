@@ -0,0 +1,59 @@
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem, QueuedOrder
+
+# Orders in these statuses never change again and can leave the live tables
+ARCHIVED_STATUSES = ['completed', 'cancelled']
+ORDER_FIELDS = ['id', 'owner_id', 'status', 'total_price', 'item_count', 'created_at', 'updated_at', 'active']
+ITEM_FIELDS = ['id', 'order_id', 'product_id', 'quantity', 'price', 'created_at', 'updated_at', 'active']
+
+
+def archive_batch(cutoff, batch_size):
+    """
+    Move up to ``batch_size`` of the oldest completed or cancelled orders
+    placed before ``cutoff`` and their items to the archive tables, and return
+    how many orders were moved.
+
+    Copying and deleting happen in one transaction, so an interrupted run
+    leaves every order in exactly one of the two tables.
+    """
+    with transaction.atomic():
+        orders = list(
+            Order.objects.select_for_update(skip_locked=True)
+            .filter(status__in=ARCHIVED_STATUSES, created_at__lt=cutoff)
+            .order_by('created_at', 'id').values(*ORDER_FIELDS)[:batch_size]
+        )
+        if not orders:
+            return 0
+        pks = [order['id'] for order in orders]
+        items = OrderItem.objects.filter(order__in=pks).order_by().values(*ITEM_FIELDS)
+
+        ArchivedOrder.objects.bulk_create(ArchivedOrder(**order) for order in orders)
+        ArchivedOrderItem.objects.bulk_create(ArchivedOrderItem(**item) for item in items)
+        # Archived orders keep their id, so queue entries can keep pointing at them
+        QueuedOrder.objects.filter(order__in=pks).update(archived_order=F('order'))
+        # Items go with their orders, OrderItem signals skip cascaded deletes
+        Order.objects.filter(pk__in=pks).delete()
+    return len(orders)
+
+
+def archive_orders(cutoff, batch_size=None, pause=None):
+    """
+    Archive every completed or cancelled order placed before ``cutoff``
+    batch by batch, oldest first, and yield the number moved by each batch.
+
+    Sleeping ``pause`` seconds between batches leaves the database to live
+    traffic. Each batch commits on its own, so a stopped run resumes where it
+    left off when started again.
+    """
+    batch_size = batch_size or settings.ORDER_ARCHIVE_BATCH_SIZE
+    pause = settings.ORDER_ARCHIVE_PAUSE if pause is None else pause
+    while moved := archive_batch(cutoff, batch_size):
+        yield moved
+        if moved < batch_size:
+            return
+        time.sleep(pause)
@@ -0,0 +1,126 @@
+import logging
+from itertools import islice
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from rest_framework import serializers
+
+from .cache import product_cache
+from .low_stock import refresh_low_stock
+from .stock import rebalance_stripes
+from .models import Product
+from .serializers import ProductSerializer
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+class BulkProductSerializer(ProductSerializer):
+    """
+        Row validator for bulk upserts, `name` is the upsert key so it is required.
+    """
+    name = serializers.CharField(max_length=200)
+    quantity = serializers.IntegerField(min_value=0)
+    price = serializers.IntegerField(min_value=0)
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def validate_products(rows):
+    """
+    Validate ``(index, data)`` pairs with the ProductSerializer rules and yield
+    ``(index, validated_data, errors)``. One serializer is reused for every row.
+    """
+    serializer = BulkProductSerializer()
+    for index, data in rows:
+        try:
+            yield index, serializer.run_validation(data), None
+        except serializers.ValidationError as exc:
+            yield index, None, exc.detail
+
+
+def upsert_batch(batch, owner, dry_run=False):
+    """
+    Upsert one batch of validated rows keyed on the unique product name.
+
+    Rows that fail validation, repeat a name already in the batch, or belong to
+    a batch the database rejects are reported in ``errors``; the rest of the
+    batch and every other batch still go through.
+    """
+    result = {'created': [], 'updated': [], 'errors': []}
+
+    rows = {}
+    for index, data, errors in batch:
+        if errors:
+            result['errors'].append({'index': index, 'errors': errors})
+        elif data['name'] in rows:
+            result['errors'].append({'index': index, 'errors': {'name': ['Duplicate product name in this batch.']}})
+        else:
+            rows[data['name']] = (index, data)
+
+    if not rows:
+        return result
+
+    try:
+        with transaction.atomic():
+            existing = dict(Product.objects.filter(name__in=rows).values_list('name', 'id'))
+            if not dry_run:
+                save_products([data for index, data in rows.values()], owner)
+                refresh_low_stock([data['id'] for index, data in rows.values()])
+                # Striped products spread a new quantity over their stock stripes before it commits
+                striped = list(Product.objects.filter(name__in=existing, stock_stripes__gt=0).values_list('pk', flat=True))
+                if striped:
+                    rebalance_stripes(striped)
+    except DatabaseError as exc:
+        logger.error(f"Bulk product upsert failed for rows {[index for index, data in rows.values()]}: {exc}")
+        result['errors'].extend(
+            {'index': index, 'errors': {'non_field_errors': ['Could not save this batch.']}}
+            for index, data in rows.values()
+        )
+        return result
+
+    for name, (index, data) in rows.items():
+        if name in existing:
+            result['updated'].append({'index': index, 'id': existing[name], 'name': name})
+        else:
+            result['created'].append({'index': index, 'id': data.get('id'), 'name': name})
+
+    if not dry_run:
+        product_cache.invalidate_many(existing.values())
+    return result
+
+
+def save_products(rows, owner):
+    """
+    Insert new products and update existing ones in one statement per set of
+    fields. Search vectors are refreshed by the database trigger.
+    """
+    # Rows only overwrite the fields they carry, so group them by field set
+    groups = {}
+    for data in rows:
+        groups.setdefault(frozenset(data) - {'name'}, []).append(data)
+
+    for fields, group in groups.items():
+        products = [Product(owner=owner, **data) for data in group]
+        Product.objects.bulk_create(
+            products,
+            update_conflicts=True,
+            unique_fields=['name'],
+            update_fields=sorted(fields) + ['updated_at'],
+        )
+        for product, data in zip(products, group):
+            data['id'] = product.id
+
+
+def upsert_products(rows, owner, batch_size=None, dry_run=False):
+    """
+    Validate and upsert ``(index, data)`` pairs in batches, yielding the result
+    of every batch as soon as it is committed.
+    """
+    batch_size = batch_size or settings.PRODUCT_BULK_BATCH_SIZE
+    for batch in batched(validate_products(rows), batch_size):
+        yield upsert_batch(batch, owner, dry_run=dry_run)
@@ -0,0 +1,105 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+class ProductCache:
+    """
+        Read-through cache of serialized products.
+
+        Entries are keyed by product id and a per-product version. Invalidation
+        bumps the version instead of deleting the entry, so a reader that loaded
+        the row before a write committed can only ever fill an orphaned key.
+
+        Only used with PRODUCT_CACHE_ENABLED, which needs a cache shared by every
+        process: other workers and management commands invalidate products too.
+        Hit and miss counters live in that cache as well, so stats() covers all
+        processes.
+    """
+    prefix = 'inventory:product'
+    counters = ['hits', 'misses', 'invalidations']
+
+    @property
+    def enabled(self):
+        return settings.PRODUCT_CACHE_ENABLED
+
+    def version_key(self, pk):
+        return f'{self.prefix}:{pk}:version'
+
+    def data_key(self, pk, version):
+        return f'{self.prefix}:{pk}:{version}'
+
+    def get_version(self, pk):
+        key = self.version_key(pk)
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, time.time_ns(), timeout=None)
+            version = cache.get(key, 0)
+        return version
+
+    def get_or_load(self, pk, loader):
+        """
+        Return ``(data, hit)`` for the product, calling ``loader(pk)`` on a miss.
+        """
+        if not self.enabled:
+            return loader(pk), False
+
+        key = self.data_key(pk, self.get_version(pk))
+        data = cache.get(key)
+        if data is not None:
+            self._record('hits')
+            return data, True
+
+        self._record('misses')
+        data = loader(pk)
+        cache.set(key, data, timeout=settings.PRODUCT_CACHE_TIMEOUT)
+        return data, False
+
+    def invalidate(self, pk):
+        self.invalidate_many([pk])
+
+    def invalidate_many(self, pks):
+        """
+        Bump the version of every product now and again once the surrounding
+        transaction commits, so readers never keep pre-commit data.
+        """
+        pks = list(pks)
+        if not pks or not self.enabled:
+            return
+        self._bump(pks)
+        transaction.on_commit(lambda: self._bump(pks))
+
+    def _bump(self, pks):
+        for pk in pks:
+            key = self.version_key(pk)
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, time.time_ns(), timeout=None)
+        self._record('invalidations', len(pks))
+
+    def stats_key(self, name):
+        return f'{self.prefix}:stats:{name}'
+
+    def _record(self, name, amount=1):
+        key = self.stats_key(name)
+        try:
+            cache.incr(key, amount)
+        except ValueError:
+            if not cache.add(key, amount, timeout=None):
+                cache.incr(key, amount)
+
+    def stats(self):
+        values = cache.get_many([self.stats_key(name) for name in self.counters])
+        stats = {name: values.get(self.stats_key(name), 0) for name in self.counters}
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+    def reset_stats(self):
+        cache.delete_many([self.stats_key(name) for name in self.counters])
+
+
+product_cache = ProductCache()
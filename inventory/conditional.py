@@ -0,0 +1,36 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(*parts):
+    """
+    Build a quoted ETag from cheap version markers such as ids, counts and
+    ``updated_at`` values, never from the serialized payload itself.
+    """
+    digest = hashlib.md5('|'.join(str(part) for part in parts).encode('utf-8'), usedforsecurity=False)
+    return quote_etag(digest.hexdigest())
+
+
+def conditional_get(request, etag, last_modified, get_response):
+    """
+    Answer ``304 Not Modified`` when the client's If-None-Match/If-Modified-Since
+    validators are current, otherwise call ``get_response()``.
+
+    Responses are marked ``private, no-cache`` and vary on Authorization, so
+    shared caches never hand one user's payload to another and clients always
+    revalidate before reusing what they hold.
+    """
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is None:
+        response = get_response()
+
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ('Authorization',))
+    return response
@@ -0,0 +1,66 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .models import Product
+
+COLUMNS = ['id', 'name', 'description', 'quantity', 'price', 'owner', 'created_at', 'updated_at']
+FIELDS = ['id', 'name', 'description', 'quantity', 'price', 'owner__name', 'created_at', 'updated_at']
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class Echo:
+    """File-like object whose write() returns the line, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def product_rows(chunk_size=2000):
+    """
+    Stream every product as a tuple of COLUMNS, fetching ``chunk_size`` rows at a
+    time (a server-side cursor on postgres) without building model instances.
+    """
+    # No ORDER BY, so the database can stream rows as it scans them
+    rows = Product.objects.order_by().values_list(*FIELDS).iterator(chunk_size=chunk_size)
+    for row in rows:
+        yield row[:6] + (timezone.localtime(row[6]).isoformat(), timezone.localtime(row[7]).isoformat())
+
+
+def _joined(lines, lines_per_chunk):
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= lines_per_chunk:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+
+def iter_csv(rows, lines_per_chunk=500):
+    writer = csv.writer(Echo())
+    lines = (writer.writerow(row) for row in rows)
+    yield writer.writerow(COLUMNS)
+    yield from _joined(lines, lines_per_chunk)
+
+
+def iter_ndjson(rows, lines_per_chunk=500):
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    lines = (encoder.encode(dict(zip(COLUMNS, row))) + '\n' for row in rows)
+    yield from _joined(lines, lines_per_chunk)
+
+
+def export_products(file_format, chunk_size=2000):
+    """
+    Return an iterator of text chunks for the whole catalog in ``file_format``.
+    """
+    if file_format == 'csv':
+        return iter_csv(product_rows(chunk_size))
+    return iter_ndjson(product_rows(chunk_size))
@@ -0,0 +1,82 @@
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+from django.db.models.functions import Greatest
+
+from .models import ArchivedOrderItem, OrderItem, ProductOrderFrequency
+
+# How often each user ordered each product. ProductOrderFrequency holds the
+# units and the number of orders per (user, product): placing an order adds
+# its items, cancelling it (or deleting it before it was cancelled) takes
+# them away again, both in the order's transaction, the same way as the
+# sales rollups of inventory.rollups. rebuild_frequencies recomputes them
+# from the live and archived items.
+
+FREQUENCY_UPDATE_BATCH_SIZE = 500
+
+
+def frequencies_by_owner(items):
+    """``{(owner id, product id): [units, orders]}`` of order items whose ``order`` is loaded."""
+    totals = defaultdict(lambda: [0, set()])
+    for item in items:
+        amounts = totals[item.order.owner_id, item.product_id]
+        amounts[0] += item.quantity
+        amounts[1].add(item.order_id)
+    return {key: [units, len(orders)] for key, (units, orders) in totals.items()}
+
+
+def record_frequencies(items, sign=1):
+    """
+    Add the orders of ``items`` to their owners' counters, or take them away
+    with ``sign=-1``: rows missing for new orders are inserted, then one
+    UPDATE per batch increments every row by its own amounts. Decrements stop
+    at zero, e.g. for orders placed before the counters existed.
+    """
+    totals = list(frequencies_by_owner(items).items())
+    if sign > 0:
+        ProductOrderFrequency.objects.bulk_create(
+            [ProductOrderFrequency(owner_id=owner, product_id=pk) for (owner, pk), _ in totals], ignore_conflicts=True
+        )
+
+    for offset in range(0, len(totals), FREQUENCY_UPDATE_BATCH_SIZE):
+        batch = totals[offset:offset + FREQUENCY_UPDATE_BATCH_SIZE]
+
+        def per_row(field):
+            return Case(*[When(owner_id=owner, product_id=pk, then=Value(sign * amounts[field])) for (owner, pk), amounts in batch])
+
+        ProductOrderFrequency.objects.filter(reduce(or_, (Q(owner_id=owner, product_id=pk) for (owner, pk), _ in batch)))\
+            .update(units=Greatest(F('units') + per_row(0), 0), orders=Greatest(F('orders') + per_row(1), 0))
+
+
+def frequent_products(owner, limit):
+    """The ``limit`` products ``owner`` ordered the most units of, most first."""
+    return ProductOrderFrequency.objects.filter(owner=owner, units__gt=0).select_related('product')\
+        .order_by('-units', 'product')[:limit]
+
+
+def rebuild_frequencies():
+    """
+    Replace every counter with sums over the live and archived items of
+    orders that were not cancelled, and return how many there are.
+    """
+    totals = defaultdict(lambda: [0, 0])
+    for model in (OrderItem, ArchivedOrderItem):
+        rows = model.objects.exclude(order__status='cancelled').order_by()\
+            .values(owner=F('order__owner'), pk=F('product'))\
+            .annotate(units=Sum('quantity'), orders=Count('order', distinct=True))
+        for row in rows:
+            amounts = totals[row['owner'], row['pk']]
+            amounts[0] += row['units']
+            amounts[1] += row['orders']
+
+    with transaction.atomic():
+        ProductOrderFrequency.objects.all().delete()
+        ProductOrderFrequency.objects.bulk_create(
+            (ProductOrderFrequency(owner_id=owner, product_id=pk, units=units, orders=orders)
+             for (owner, pk), (units, orders) in totals.items()),
+            batch_size=FREQUENCY_UPDATE_BATCH_SIZE,
+        )
+    return len(totals)
@@ -0,0 +1,143 @@
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+
+def request_fingerprint(request):
+    """Hash of the method, path and body, a key may only be reused for the same request."""
+    body = json.dumps(request.data, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(f'{request.method} {request.path} {body}'.encode()).hexdigest()
+
+
+def replay(status_code, data):
+    response = Response(data, status=status_code)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def mismatch():
+    return Response({'error': f'{IDEMPOTENCY_HEADER} was already used for a different request.'},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+
+def should_store(response):
+    # Server errors are not final, a retry must run the request again
+    return response.status_code < 500
+
+
+class DatabaseIdempotencyStore:
+    """
+        Keys are rows inserted in the same transaction as the order they
+        protect. A concurrent duplicate blocks on the unique (owner, key) index
+        until the first request commits, then replays its stored response. If
+        the first request fails, its row rolls back with the order.
+    """
+
+    def run(self, user, key, fingerprint, handler):
+        with transaction.atomic():
+            record = self.claim(user, key, fingerprint)
+            if record.status_code is not None:
+                if record.request_hash != fingerprint:
+                    return mismatch()
+                return replay(record.status_code, record.response)
+
+            response = handler()
+            if should_store(response):
+                record.status_code = response.status_code
+                record.response = response.data
+                record.save(update_fields=['status_code', 'response', 'updated_at'])
+            else:
+                record.delete()
+            return response
+
+    def claim(self, user, key, fingerprint):
+        now = timezone.now()
+        IdempotencyKey.objects.filter(owner=user, key=key, expires_at__lte=now).delete()
+        try:
+            with transaction.atomic():
+                return IdempotencyKey.objects.create(
+                    owner=user, key=key, request_hash=fingerprint,
+                    expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+                )
+        except IntegrityError:
+            # The other request has committed by now, its row holds the response
+            return IdempotencyKey.objects.get(owner=user, key=key)
+
+
+class CacheIdempotencyStore:
+    """
+        Responses live in the cache for the TTL. A short lock entry marks a
+        request in flight, duplicates arriving meanwhile get 409 and retry.
+    """
+    prefix = 'inventory:idempotency'
+
+    def run(self, user, key, fingerprint, handler):
+        result_key = f'{self.prefix}:{user.pk}:{key}'
+        lock_key = f'{result_key}:lock'
+
+        stored = self.stored_response(result_key, fingerprint)
+        if stored is not None:
+            return stored
+
+        # A cache outage (None) must not turn every request into a conflict
+        if cache.add(lock_key, fingerprint, timeout=settings.IDEMPOTENCY_LOCK_TIMEOUT) is False:
+            return Response({'error': f'A request with this {IDEMPOTENCY_HEADER} is already in progress.'},
+                            status=status.HTTP_409_CONFLICT)
+        try:
+            # The first request may have stored its response and released the lock since the read above
+            stored = self.stored_response(result_key, fingerprint)
+            if stored is not None:
+                return stored
+            response = handler()
+            if should_store(response):
+                cache.set(result_key, {
+                    'request_hash': fingerprint,
+                    'status_code': response.status_code,
+                    'response': response.data,
+                }, timeout=settings.IDEMPOTENCY_KEY_TTL)
+            return response
+        finally:
+            cache.delete(lock_key)
+
+
+    def stored_response(self, result_key, fingerprint):
+        stored = cache.get(result_key)
+        if stored is None:
+            return None
+        if stored['request_hash'] != fingerprint:
+            return mismatch()
+        return replay(stored['status_code'], stored['response'])
+
+
+IDEMPOTENCY_STORES = {
+    'database': DatabaseIdempotencyStore,
+    'cache': CacheIdempotencyStore,
+}
+
+
+def idempotent(request, handler):
+    """
+    Run ``handler()`` once per user and Idempotency-Key header and replay its
+    response to retries. Requests without the header run as usual.
+    """
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if key is None:
+        return handler()
+    if not key or len(key) > MAX_KEY_LENGTH:
+        return Response({'error': f'{IDEMPOTENCY_HEADER} must be 1 to {MAX_KEY_LENGTH} characters.'},
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    store = IDEMPOTENCY_STORES[settings.IDEMPOTENCY_STORE]()
+    return store.run(request.user, key, request_fingerprint(request), handler)
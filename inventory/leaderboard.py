@@ -0,0 +1,330 @@
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, transaction
+from django.db.models import Case, F, Q, Sum, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import ArchivedOrderItem, OrderItem, Product, ProductSalesBucket
+
+try:
+    from django_redis import get_redis_connection
+    from redis.exceptions import RedisError
+except ImportError:  # Only the database leaderboard is available
+    get_redis_connection = None
+    RedisError = ()
+
+# Best sellers over sliding windows. Sales are counted in buckets of
+# LEADERBOARD_BUCKET_SECONDS by the time the order was placed: placing an
+# order adds its units to the bucket, withdrawing it takes them away again.
+# A window is its last `window seconds / bucket seconds` buckets, the
+# current one included, so it slides one bucket at a time.
+#
+# ProductSalesBucket rows are the record. They are written once the order
+# commits, in a transaction of their own, so orders for a popular product never
+# queue on its bucket row while they hold their own locks; the
+# rebuild_leaderboard command recounts them should a write be lost. The first
+# write of each bucket deletes the rows that left the longest window. The redis backend also keeps each bucket and a running total per
+# window in sorted sets: a bucket leaving a window is subtracted from its
+# total, and the top K is read off the total. The database backend sums the
+# buckets of the window and caches the result for a short while.
+
+logger = logging.getLogger(__name__)
+
+LEADERBOARD_WINDOWS = {
+    'hour': 60 * 60,
+    'day': 24 * 60 * 60,
+    'week': 7 * 24 * 60 * 60,
+}
+LEADERBOARD_UPDATE_BATCH_SIZE = 500
+
+
+def bucket_of(moment):
+    return int(moment.timestamp()) // settings.LEADERBOARD_BUCKET_SECONDS
+
+
+def bucket_start(bucket):
+    return datetime.fromtimestamp(bucket * settings.LEADERBOARD_BUCKET_SECONDS, tz=dt_timezone.utc)
+
+
+def window_size(window):
+    """Buckets in ``window``, the current partial one included."""
+    return max(LEADERBOARD_WINDOWS[window] // settings.LEADERBOARD_BUCKET_SECONDS, 1)
+
+
+def oldest_bucket(now=None):
+    """First bucket still in the longest window, older sales are no longer counted."""
+    return bucket_of(now or timezone.now()) - max(map(window_size, LEADERBOARD_WINDOWS)) + 1
+
+
+def units_by_bucket(items):
+    """``{(bucket, product id): units}`` of order items whose ``order`` is loaded, within the longest window."""
+    oldest = oldest_bucket()
+    totals = defaultdict(int)
+    for item in items:
+        bucket = bucket_of(item.order.created_at)
+        if bucket >= oldest:
+            totals[bucket, item.product_id] += item.quantity
+    return totals
+
+
+class DatabaseLeaderboard:
+    """
+    Buckets are ProductSalesBucket rows. A top list sums the rows of the
+    window's buckets over the (bucket, product) index and is cached for
+    LEADERBOARD_CACHE_TIMEOUT seconds, so reads cost O(K) between refreshes.
+    """
+    prefix = 'inventory:leaderboard'
+
+    def record(self, totals, sign=1):
+        """
+        Add ``totals`` of ``{(bucket, product id): units}`` to the buckets, or
+        take them away with ``sign=-1``, once the surrounding transaction commits.
+        """
+        transaction.on_commit(lambda: self.write(totals, sign))
+
+    def write(self, totals, sign):
+        """
+        Apply ``totals`` to the buckets in one short transaction. Decrements
+        stop at zero, e.g. for orders placed before the leaderboard existed.
+        """
+        totals = list(totals.items())
+        try:
+            with transaction.atomic():
+                if sign > 0:
+                    ProductSalesBucket.objects.bulk_create(
+                        [ProductSalesBucket(bucket=bucket, product_id=pk) for (bucket, pk), _ in totals],
+                        ignore_conflicts=True,
+                    )
+                for offset in range(0, len(totals), LEADERBOARD_UPDATE_BATCH_SIZE):
+                    batch = totals[offset:offset + LEADERBOARD_UPDATE_BATCH_SIZE]
+                    units = Case(*[When(bucket=bucket, product_id=pk, then=Value(sign * amount))
+                                   for (bucket, pk), amount in batch])
+                    ProductSalesBucket.objects.filter(reduce(or_, (Q(bucket=bucket, product_id=pk) for (bucket, pk), _ in batch)))\
+                        .update(units=Greatest(F('units') + units, 0))
+            self.prune()
+        except DatabaseError as exc:
+            logger.warning(f"Leaderboard update failed, run rebuild_leaderboard to resync: {exc}")
+
+    def prune(self):
+        """Delete the buckets that left the longest window, at most once per bucket."""
+        oldest = oldest_bucket()
+        if cache.add(f'{self.prefix}:pruned:{oldest}', True, timeout=settings.LEADERBOARD_BUCKET_SECONDS):
+            ProductSalesBucket.objects.filter(bucket__lt=oldest).delete()
+
+    def top(self, window, limit):
+        """``[(product id, units)]`` of the ``limit`` best sellers of ``window``, most first."""
+        key = f'{self.prefix}:top:{window}'
+        ranking = cache.get(key)
+        if ranking is None:
+            ranking = self.sum_buckets(window)
+            cache.set(key, ranking, timeout=settings.LEADERBOARD_CACHE_TIMEOUT)
+        return ranking[:limit]
+
+    def sum_buckets(self, window):
+        first = bucket_of(timezone.now()) - window_size(window) + 1
+        return [
+            (row['product'], row['total']) for row in
+            ProductSalesBucket.objects.filter(bucket__gte=first).values('product')
+            .annotate(total=Sum('units')).filter(total__gt=0)
+            .order_by('-total', 'product')[:settings.LEADERBOARD_MAX_LIMIT]
+        ]
+
+    def rebuild(self):
+        """
+        Replace the buckets with sums over the live and archived items of
+        orders placed within the longest window that were not cancelled, and
+        return how many there are.
+        """
+        oldest = oldest_bucket()
+        totals = defaultdict(int)
+        for model in (OrderItem, ArchivedOrderItem):
+            rows = model.objects.filter(order__created_at__gte=bucket_start(oldest))\
+                .exclude(order__status='cancelled').order_by()\
+                .values_list('order__created_at', 'product', 'quantity')
+            for created_at, pk, quantity in rows.iterator():
+                totals[bucket_of(created_at), pk] += quantity
+
+        with transaction.atomic():
+            ProductSalesBucket.objects.all().delete()
+            ProductSalesBucket.objects.bulk_create(
+                (ProductSalesBucket(bucket=bucket, product_id=pk, units=units)
+                 for (bucket, pk), units in totals.items()),
+                batch_size=LEADERBOARD_UPDATE_BATCH_SIZE,
+            )
+        cache.delete_many([f'{self.prefix}:top:{window}' for window in LEADERBOARD_WINDOWS])
+        return len(totals)
+
+
+# KEYS: the bucket, then every window's total and the last bucket taken out of it.
+# ARGV: the bucket, its ttl, then product id and units pairs. A decrement takes
+# at most what the bucket holds, and the windows change by the same amount. A
+# window only counts a bucket it has not taken out yet, late withdrawals leave it alone.
+RECORD_SCRIPT = """
+local bucket = tonumber(ARGV[1])
+local windows = (#KEYS - 1) / 2
+local deltas = {}
+for i = 3, #ARGV, 2 do
+    local delta = tonumber(ARGV[i + 1])
+    if delta < 0 then
+        delta = math.max(delta, -tonumber(redis.call('ZSCORE', KEYS[1], ARGV[i]) or '0'))
+    end
+    deltas[i] = delta
+    if delta ~= 0 then
+        redis.call('ZINCRBY', KEYS[1], delta, ARGV[i])
+    end
+end
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[2]))
+for w = 1, windows do
+    local through = tonumber(redis.call('GET', KEYS[1 + windows + w]) or '-1')
+    if bucket > through then
+        for i = 3, #ARGV, 2 do
+            if deltas[i] ~= 0 then
+                redis.call('ZINCRBY', KEYS[1 + w], deltas[i], ARGV[i])
+            end
+        end
+    end
+end
+"""
+
+# KEYS: the window's total and the last bucket taken out of it.
+# ARGV: the bucket key prefix, the current bucket and the window size.
+# Subtracts the buckets that left the window since the last call, or sums the
+# window's buckets again when the total is new or further behind than a window.
+ADVANCE_SCRIPT = """
+local prefix = ARGV[1]
+local current = tonumber(ARGV[2])
+local size = tonumber(ARGV[3])
+local outside = current - size
+local through = tonumber(redis.call('GET', KEYS[2]) or '-1')
+if through >= outside then
+    return 0
+end
+local rebuild = through < 0 or outside - through >= size
+local first = rebuild and outside + 1 or through + 1
+local last = rebuild and current or outside
+local buckets = {}
+for b = first, last do
+    local key = prefix .. b
+    if redis.call('EXISTS', key) == 1 then
+        table.insert(buckets, key)
+    end
+end
+if rebuild then
+    redis.call('DEL', KEYS[1])
+    if #buckets > 0 then
+        redis.call('ZUNIONSTORE', KEYS[1], #buckets, unpack(buckets))
+    end
+elseif #buckets > 0 then
+    local args = {KEYS[1], #buckets + 1, KEYS[1]}
+    for _, key in ipairs(buckets) do
+        table.insert(args, key)
+    end
+    table.insert(args, 'WEIGHTS')
+    table.insert(args, 1)
+    for _ = 1, #buckets do
+        table.insert(args, -1)
+    end
+    redis.call('ZUNIONSTORE', unpack(args))
+end
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', 0)
+redis.call('SET', KEYS[2], outside)
+return 1
+"""
+
+
+class RedisLeaderboard(DatabaseLeaderboard):
+    """
+    Buckets and window totals are sorted sets on the cache's redis. The sets
+    are updated once the order commits, a top list is one ZREVRANGE of its
+    window total, O(log N + K). Redis errors fall back to the database
+    buckets, the rebuild_leaderboard command resyncs the sets after an outage.
+    """
+
+    def __init__(self):
+        self.redis = get_redis_connection('default')
+
+    def bucket_key(self, bucket=''):
+        return f'{self.prefix}:bucket:{bucket}'
+
+    def bucket_ttl(self):
+        # A bucket must outlive a window total that is up to a window behind
+        return (2 * max(map(window_size, LEADERBOARD_WINDOWS)) + 1) * settings.LEADERBOARD_BUCKET_SECONDS
+
+    def window_keys(self, window):
+        return f'{self.prefix}:window:{window}', f'{self.prefix}:window:{window}:through'
+
+    def record(self, totals, sign=1):
+        super().record(totals, sign)
+        transaction.on_commit(lambda: self.push(totals, sign))
+
+    def push(self, totals, sign):
+        by_bucket = defaultdict(list)
+        for (bucket, pk), units in totals.items():
+            by_bucket[bucket].extend([pk, sign * units])
+
+        windows = [self.window_keys(window) for window in LEADERBOARD_WINDOWS]
+        try:
+            script = self.redis.register_script(RECORD_SCRIPT)
+            for bucket, pairs in by_bucket.items():
+                keys = [self.bucket_key(bucket)] + [total for total, _ in windows] + [through for _, through in windows]
+                script(keys=keys, args=[bucket, self.bucket_ttl(), *pairs])
+        except RedisError as exc:
+            logger.warning(f"Leaderboard update failed, run rebuild_leaderboard to resync: {exc}")
+
+    def top(self, window, limit):
+        total, through = self.window_keys(window)
+        try:
+            self.redis.register_script(ADVANCE_SCRIPT)(
+                keys=[total, through], args=[self.bucket_key(), bucket_of(timezone.now()), window_size(window)]
+            )
+            ranking = self.redis.zrevrange(total, 0, limit - 1, withscores=True)
+        except RedisError as exc:
+            logger.warning(f"Leaderboard read failed, summing the database buckets: {exc}")
+            return super().top(window, limit)
+        return [(pk.decode(), int(units)) for pk, units in ranking if units > 0]
+
+    def rebuild(self):
+        count = super().rebuild()
+        pipeline = self.redis.pipeline()
+        pipeline.delete(*[key for window in LEADERBOARD_WINDOWS for key in self.window_keys(window)])
+        for key in self.redis.scan_iter(f'{self.bucket_key()}*'):
+            pipeline.delete(key)
+        for bucket, pk, units in ProductSalesBucket.objects.filter(units__gt=0).values_list('bucket', 'product', 'units'):
+            pipeline.zadd(self.bucket_key(bucket), {pk: units})
+            pipeline.expire(self.bucket_key(bucket), self.bucket_ttl())
+        pipeline.execute()
+        return count
+
+
+LEADERBOARD_BACKENDS = {
+    'database': DatabaseLeaderboard,
+    'redis': RedisLeaderboard,
+}
+
+
+def leaderboard():
+    return LEADERBOARD_BACKENDS[settings.LEADERBOARD_BACKEND]()
+
+
+def record_leaderboard_sales(items, sign=1):
+    """Count the units of ``items`` in their buckets, or take them away with ``sign=-1``."""
+    totals = units_by_bucket(items)
+    if totals:
+        leaderboard().record(totals, sign)
+
+
+def top_sellers(window, limit):
+    """
+    The ``limit`` best selling products of ``window`` with the units sold,
+    most first. Products deleted since are left out.
+    """
+    ranking = leaderboard().top(window, limit)
+    names = dict(Product.objects.filter(pk__in=[pk for pk, _ in ranking]).values_list('pk', 'name'))
+    return [{'product': pk, 'product_name': names[pk], 'units': units} for pk, units in ranking if pk in names]
@@ -0,0 +1,47 @@
+from django.db import transaction
+from django.db.models import F, Q
+from django.dispatch import Signal
+
+from .cache import product_cache
+from .models import Product
+
+# Sent once the transaction commits with ``entered`` and ``exited``, the ids
+# of the products whose quantity on hand fell below their reorder level or
+# got back to it.
+low_stock_changed = Signal()
+
+
+def refresh_low_stock(pks):
+    """
+    Bring Product.is_low_stock of the products ``pks`` in line with their
+    quantity and reorder level, and report the products that crossed it.
+
+    Called wherever queryset updates change quantity or reorder_level, so the
+    flag (and the partial index the low-stock report reads) never waits for a
+    poll. Costs one indexed SELECT when nothing crossed. Product.save() sets
+    the flag itself.
+    """
+    if not pks:
+        return
+    below = Q(quantity__lt=F('reorder_level'))
+    changed = dict(
+        Product.objects.filter(pk__in=pks)
+        .filter((below & Q(is_low_stock=False)) | (~below & Q(is_low_stock=True)))
+        .values_list('pk', 'is_low_stock')
+    )
+    if not changed:
+        return
+    entered = [pk for pk, was_low in changed.items() if not was_low]
+    exited = [pk for pk, was_low in changed.items() if was_low]
+    # Conditional so a concurrent stock change that crossed back is not overwritten
+    if entered:
+        Product.objects.filter(below, pk__in=entered).update(is_low_stock=True)
+    if exited:
+        Product.objects.filter(pk__in=exited).exclude(below).update(is_low_stock=False)
+    product_cache.invalidate_many(changed)
+    report_crossings(entered, exited)
+
+
+def report_crossings(entered, exited):
+    """Send low_stock_changed for the products ``entered`` and ``exited`` once the transaction commits."""
+    transaction.on_commit(lambda: low_stock_changed.send(sender=Product, entered=entered, exited=exited))
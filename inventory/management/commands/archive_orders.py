@@ -0,0 +1,26 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from inventory.archive import archive_orders
+
+
+class Command(BaseCommand):
+    help = (
+        "Move completed and cancelled orders older than --older-than days and their items "
+        "to the archive tables, in batches with a pause in between. Safe to stop and rerun."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, required=True, help='Archive orders placed more than this many days ago')
+        parser.add_argument('--batch-size', type=int, help='Orders moved per transaction, ORDER_ARCHIVE_BATCH_SIZE by default')
+        parser.add_argument('--pause', type=float, help='Seconds to sleep between batches, ORDER_ARCHIVE_PAUSE by default')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['older_than'])
+        archived = 0
+        for moved in archive_orders(cutoff, options['batch_size'], options['pause']):
+            archived += moved
+            self.stdout.write(f"{archived} orders archived")
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} orders placed before {cutoff:%Y-%m-%d %H:%M}"))
@@ -0,0 +1,113 @@
+import multiprocessing
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, connections
+from rest_framework import serializers
+
+from inventory.models import Order, Product
+from inventory.serializers import OrderSerializer
+from inventory.stock import rebalance_stripes
+
+User = get_user_model()
+
+
+def place_orders(product_id, owner_id, orders, quantity):
+    """
+    Place ``orders`` orders for ``quantity`` units of one product through the
+    regular OrderSerializer path and count how each of them ended.
+    """
+    # Forked workers must not share the parent's database connection
+    connections.close_all()
+    owner = User.objects.get(pk=owner_id)
+    outcome = {'placed': 0, 'rejected': 0, 'errors': 0}
+
+    for _ in range(orders):
+        serializer = OrderSerializer(data={'items': [{'product': product_id, 'quantity': quantity}]})
+        try:
+            serializer.is_valid(raise_exception=True)
+            serializer.save(owner=owner)
+            outcome['placed'] += 1
+        except serializers.ValidationError:
+            outcome['rejected'] += 1
+        except DatabaseError:
+            outcome['errors'] += 1
+
+    connections.close_all()
+    return outcome
+
+
+class Command(BaseCommand):
+    help = (
+        "Stress test order placement: worker processes place orders for the same "
+        "product in parallel, then report orders/sec, the failure rate and whether "
+        "the final available stock matches the orders that were placed. Compare runs "
+        "with and without --stripes to measure the gain of striped stock counters."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=8, help='Worker processes placing orders at once')
+        parser.add_argument('--orders', type=int, default=2000, help='Orders placed across all workers')
+        parser.add_argument('--stock', type=int, default=1000, help='Starting stock of the product')
+        parser.add_argument('--quantity', type=int, default=1, help='Units per order')
+        parser.add_argument('--stripes', type=int, default=0, help='Stock stripes of the product, 0 for a single row')
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark product, user and orders')
+        parser.add_argument('--database', help='Name of the configured database, confirms running without DEBUG')
+
+    def handle(self, *args, **options):
+        processes, orders = options['processes'], options['orders']
+        if processes < 1 or orders < 1:
+            raise CommandError("--processes and --orders must be positive")
+        # The benchmark writes products, orders and a user, keep it off live databases by mistake
+        database = str(connection.settings_dict['NAME'])
+        if not settings.DEBUG and options['database'] != database:
+            raise CommandError(f"Refusing to run against {database} without DEBUG, "
+                               f"pass --database={database} to confirm it is not a live database")
+
+        owner, created = User.objects.get_or_create(
+            email='benchmark@drugstoc.local', defaults={'username': 'benchmark'}
+        )
+        product = Product.objects.create(
+            owner=owner, name=f'Benchmark Product {time.time_ns()}', description='Benchmark',
+            quantity=options['stock'], price=1, stock_stripes=options['stripes'],
+        )
+        rebalance_stripes([product.pk])
+
+        shares = [orders // processes + (1 if worker < orders % processes else 0) for worker in range(processes)]
+        jobs = [(product.pk, owner.pk, share, options['quantity']) for share in shares if share]
+
+        started = time.monotonic()
+        if len(jobs) == 1:
+            results = [place_orders(*jobs[0])]
+        else:
+            connections.close_all()
+            with multiprocessing.get_context('fork').Pool(len(jobs)) as pool:
+                results = pool.starmap(place_orders, jobs)
+        elapsed = time.monotonic() - started
+
+        totals = {key: sum(result[key] for result in results) for key in ('placed', 'rejected', 'errors')}
+        product = Product.objects.with_stock().get(pk=product.pk)
+        # Placed orders are pending, their units are reserved rather than taken out of quantity
+        available = product.quantity - product.reserved_total
+        expected = max(options['stock'] - totals['placed'] * options['quantity'], 0)
+        placed_in_db = Order.objects.filter(owner=owner, items__product=product).count()
+        correct = available == expected and placed_in_db == totals['placed']
+
+        self.stdout.write(
+            f"{orders} orders from {len(jobs)} processes on {options['stripes'] or 'no'} stock stripes in {elapsed:.2f}s ({orders / elapsed:.0f} orders/s)\n"
+            f"placed {totals['placed']}, rejected for stock {totals['rejected']}, "
+            f"failed with database errors {totals['errors']} ({totals['errors'] / orders:.1%})\n"
+            f"final available stock {available}, expected {expected}"
+        )
+        if correct:
+            self.stdout.write(self.style.SUCCESS("Stock is consistent with the placed orders"))
+        else:
+            self.stdout.write(self.style.ERROR("Stock does not match the placed orders"))
+
+        if not options['keep']:
+            Order.objects.filter(owner=owner, items__product=product).delete()
+            product.delete()
+            if created:
+                owner.delete()
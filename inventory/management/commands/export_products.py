@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from inventory.export import export_products
+
+
+class Command(BaseCommand):
+    help = "Stream the whole product catalog as CSV or NDJSON with bounded memory use."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=['csv', 'ndjson'], default='csv')
+        parser.add_argument('--output', help='File to write, defaults to stdout')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows fetched from the database at a time')
+
+    def handle(self, *args, **options):
+        chunks = export_products(options['format'], chunk_size=options['chunk_size'])
+        if not options['output']:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+
+        with open(options['output'], 'w', newline='', encoding='utf-8') as stream:
+            stream.writelines(chunks)
+        self.stderr.write(self.style.SUCCESS(f"Exported products to {options['output']}"))
@@ -0,0 +1,90 @@
+import csv
+import json
+import time
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.bulk import upsert_products
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream products from a CSV or NDJSON file into the catalog. Rows are "
+        "parsed, validated and upserted on their name one batch at a time, so "
+        "memory use does not depend on the file size."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file with a header row, or NDJSON file with one product per line')
+        parser.add_argument('--owner', required=True, help='Email of the user that owns newly created products')
+        parser.add_argument('--format', choices=['csv', 'ndjson'], help='Input format, defaults to the file extension')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per upsert statement and transaction')
+        parser.add_argument('--start-line', type=int, default=1,
+                            help='Skip rows before this line, to resume after an interrupted import')
+        parser.add_argument('--dry-run', action='store_true', help='Validate every row without writing anything')
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f"{path} does not exist")
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive")
+
+        try:
+            owner = User.objects.get(email=options['owner'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user with email {options['owner']}")
+
+        file_format = options['format'] or ('csv' if path.suffix.lower() == '.csv' else 'ndjson')
+        parse = self.parse_csv if file_format == 'csv' else self.parse_ndjson
+
+        totals = {'rows': 0, 'created': 0, 'updated': 0, 'errors': 0}
+        started = time.monotonic()
+        with path.open(newline='', encoding='utf-8') as stream:
+            rows = (row for row in parse(stream) if row[0] >= options['start_line'])
+            results = upsert_products(rows, owner, batch_size=options['batch_size'], dry_run=options['dry_run'])
+            for result in results:
+                self.report(result, totals, started)
+
+        verb = 'Validated' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {totals['rows']} rows in {time.monotonic() - started:.1f}s: "
+            f"{totals['created']} created, {totals['updated']} updated, {totals['errors']} failed"
+        ))
+
+    def parse_csv(self, stream):
+        reader = csv.DictReader(stream)
+        for row in reader:
+            # Empty cells mean "not provided" so they never blank existing values
+            yield reader.line_num, {key: value for key, value in row.items() if key and value not in ('', None)}
+
+    def parse_ndjson(self, stream):
+        for line_number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except ValueError:
+                # Let validation report it like any other bad row
+                yield line_number, line
+
+    def report(self, result, totals, started):
+        for error in result['errors']:
+            self.stderr.write(f"line {error['index']}: {json.dumps(error['errors'])}")
+
+        lines = [row['index'] for key in result for row in result[key]]
+        totals['rows'] += len(lines)
+        totals['created'] += len(result['created'])
+        totals['updated'] += len(result['updated'])
+        totals['errors'] += len(result['errors'])
+
+        elapsed = time.monotonic() - started
+        rate = totals['rows'] / elapsed if elapsed else 0
+        self.stdout.write(
+            f"{totals['rows']} rows ({rate:.0f} rows/s), committed through line {max(lines)}, "
+            f"resume with --start-line {max(lines) + 1}"
+        )
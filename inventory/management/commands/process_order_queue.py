@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from inventory.queue import process_queue
+
+
+class Command(BaseCommand):
+    help = (
+        "Place orders queued with Prefer: respond-async. Entries are claimed in batches, "
+        "orders for the same products are placed together. Run several workers to "
+        "drain the queue faster, they skip each other's batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help='Entries claimed at once, ORDER_QUEUE_BATCH_SIZE by default')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty instead of polling')
+        parser.add_argument('--sleep', type=float, default=1.0, help='Seconds to wait when the queue is empty')
+
+    def handle(self, *args, **options):
+        while True:
+            for outcome in process_queue(options['batch_size']):
+                self.stdout.write(f"{outcome['completed']} orders placed, {outcome['failed']} failed")
+            if options['once']:
+                return
+            time.sleep(options['sleep'])
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from inventory.cache import product_cache
+
+
+class Command(BaseCommand):
+    help = (
+        "Report hits, misses and invalidations of the product detail cache across "
+        "every process sharing the cache, and the hit ratio."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Zero the counters after reporting them')
+
+    def handle(self, *args, **options):
+        if not product_cache.enabled:
+            self.stdout.write(self.style.WARNING("The product cache is disabled, set PRODUCT_CACHE_ENABLED with a shared cache"))
+        stats = product_cache.stats()
+        self.stdout.write(
+            f"hits {stats['hits']}, misses {stats['misses']}, invalidations {stats['invalidations']}, "
+            f"hit ratio {stats['hit_ratio']:.1%}"
+        )
+        if options['reset']:
+            product_cache.reset_stats()
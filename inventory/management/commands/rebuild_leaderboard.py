@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from inventory.leaderboard import leaderboard
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the best-seller buckets of the last week from the live and archived order "
+        "items, dropping older ones, and reload the redis sorted sets when redis backs the "
+        "leaderboard."
+    )
+
+    def handle(self, *args, **options):
+        count = leaderboard().rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {count} {settings.LEADERBOARD_BACKEND} leaderboard buckets"
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from inventory.frequency import rebuild_frequencies
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute how often every user ordered every product from the live and archived "
+        "order items. Backs the buy-again list of report/order/frequent."
+    )
+
+    def handle(self, *args, **options):
+        count = rebuild_frequencies()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {count} product order frequencies"))
@@ -0,0 +1,41 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from inventory.rollups import first_sale_date, rebuild_sales, verify_sales
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the daily sales rollups from the live and archived order items, then check "
+        "them against the items. Backfills every day with orders by default. With --verify-only "
+        "nothing is written and differences make the command fail."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='start', type=date.fromisoformat, help='First day (YYYY-MM-DD), the first order by default')
+        parser.add_argument('--to', dest='end', type=date.fromisoformat, help='Last day (YYYY-MM-DD), today by default')
+        parser.add_argument('--chunk-days', type=int, default=31, help='Days rebuilt per transaction')
+        parser.add_argument('--verify-only', action='store_true', help='Only compare the rollups with the order items')
+
+    def handle(self, *args, **options):
+        start = options['start'] or first_sale_date()
+        end = options['end'] or timezone.localdate()
+        if start is None:
+            self.stdout.write(self.style.SUCCESS("No orders, nothing to roll up"))
+            return
+        if start > end:
+            raise CommandError("--from must not be after --to")
+
+        if not options['verify_only']:
+            for first, last in rebuild_sales(start, end, options['chunk_days']):
+                self.stdout.write(f"Rebuilt {first} to {last}")
+
+        mismatches = verify_sales(start, end, options['chunk_days'])
+        for day, product, stripe, expected, actual in mismatches:
+            self.stderr.write(f"{day} product {product} stripe {stripe}: items have {expected[0]} units / {expected[1]} revenue, "
+                              f"rollup has {actual[0]} / {actual[1]}")
+        if mismatches:
+            raise CommandError(f"{len(mismatches)} rollup rows differ from the order items")
+        self.stdout.write(self.style.SUCCESS(f"Sales rollups from {start} to {end} match the order items"))
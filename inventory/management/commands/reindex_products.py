@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from inventory.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the product search index of the database in use: search vectors on "
+        "postgres, one UPDATE per chunk, or the FTS5 index on SQLite. Writes keep the "
+        "index current on their own, this is for backfills and configuration changes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Products updated per statement')
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        started = time.monotonic()
+
+        def progress(done):
+            elapsed = time.monotonic() - started or 1
+            self.stdout.write(f"{done} products reindexed ({done / elapsed:.0f}/s)")
+
+        backend.install()
+        done = backend.reindex(options['chunk_size'], progress)
+        self.stdout.write(self.style.SUCCESS(f"Reindexed {done} products with {type(backend).__name__}"))
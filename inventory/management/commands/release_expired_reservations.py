@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from inventory.transitions import release_expired_reservations
+
+
+class Command(BaseCommand):
+    help = (
+        "Make the units reserved by pending orders whose reservation has expired available "
+        "again, in batches. The orders stay pending and reserve again when completed. "
+        "Run it every few minutes, e.g. from cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help='Orders released per transaction, ORDER_STATUS_BATCH_SIZE by default')
+
+    def handle(self, *args, **options):
+        released = 0
+        for pks in release_expired_reservations(options['batch_size']):
+            released += len(pks)
+            self.stdout.write(f"{released} expired reservations released")
+        self.stdout.write(self.style.SUCCESS(f"Released {released} expired reservations"))
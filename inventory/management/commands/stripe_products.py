@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from inventory.models import Product
+from inventory.stock import rebalance_stripes
+
+
+class Command(BaseCommand):
+    help = (
+        "Spread the stock reservations of hot products over several counter rows so "
+        "concurrent orders stop queueing on one product row, or fold them back with "
+        "--stripes=0. Without --stripes, only rebalances the allotments of striped products."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('products', nargs='*', help='Product ids or names, every striped product by default')
+        parser.add_argument('--stripes', type=int, help='Counter rows per product, 0 turns striping off')
+
+    def handle(self, *args, **options):
+        products = Product.objects.all()
+        if options['products']:
+            products = products.filter(Q(pk__in=options['products']) | Q(name__in=options['products']))
+        elif options['stripes'] is None:
+            products = products.filter(stock_stripes__gt=0)
+        else:
+            raise CommandError("Name the products to stripe")
+
+        pks = list(products.values_list('pk', flat=True))
+        if options['products'] and len(pks) < len(options['products']):
+            raise CommandError("Some products were not found")
+        if options['stripes'] is not None:
+            if options['stripes'] < 0:
+                raise CommandError("--stripes must not be negative")
+            Product.objects.filter(pk__in=pks).update(stock_stripes=options['stripes'])
+
+        striped = rebalance_stripes(pks)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebalanced {len(striped)} striped products, {len(pks) - len(striped)} not striped"
+        ))
@@ -0,0 +1,58 @@
+from django.db import models
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+class ProductQuerySet(models.QuerySet):
+    """Custom queryset for the Product model."""
+
+    def with_owner(self):
+        """
+        Join the owner so serializing `owner` costs no extra query per product.
+        """
+        return self.select_related('owner')
+
+    def with_stock(self):
+        """
+        Annotate ``striped_reserved``, the units reserved on each product's
+        stock stripes, so Product.reserved_total needs no query per product.
+        """
+        stripes = self.model._meta.get_field('stripes').related_model.objects\
+            .filter(product=OuterRef('pk'))\
+            .order_by()\
+            .values('product')
+        return self.annotate(
+            striped_reserved=Coalesce(Subquery(stripes.annotate(total=Sum('reserved')).values('total')), 0)
+        )
+
+
+class OrderQuerySet(models.QuerySet):
+    """Custom queryset for the Order model."""
+
+    def with_details(self):
+        """
+        Join the owner and prefetch the items, so a list of orders serializes
+        in a fixed number of queries whatever its size. Totals are stored on
+        the order, so the items' products are never needed.
+        """
+        return self.select_related('owner').prefetch_related('items')
+
+    def refresh_totals(self):
+        """
+        Recompute total_price and item_count of every order in the queryset
+        from the prices stored on its items, in a single UPDATE.
+        """
+        items = self.model._meta.get_field('items').related_model.objects\
+            .filter(order=OuterRef('pk'))\
+            .order_by()\
+            .values('order')
+
+        def item_sum(expression):
+            return Coalesce(Subquery(items.annotate(total=Sum(expression)).values('total')), 0)
+
+        return self.update(
+            total_price=item_sum(F('quantity') * F('price')),
+            item_count=item_sum('quantity'),
+            updated_at=timezone.now(),
+        )
@@ -0,0 +1,44 @@
+from django.db import migrations
+
+# Frozen copies of the SQL in inventory.search, a migration must keep doing what it did when it was written
+CREATE_SEARCH_TRIGGER_SQL = """
+CREATE OR REPLACE FUNCTION inventory_product_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', coalesce(NEW.name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(NEW.description, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS inventory_product_search_vector_trigger ON inventory_product;
+CREATE TRIGGER inventory_product_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, description ON inventory_product
+    FOR EACH ROW EXECUTE PROCEDURE inventory_product_search_vector_update();
+"""
+
+DROP_SEARCH_TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS inventory_product_search_vector_trigger ON inventory_product;
+DROP FUNCTION IF EXISTS inventory_product_search_vector_update();
+"""
+
+
+def create_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(CREATE_SEARCH_TRIGGER_SQL)
+
+
+def drop_search_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(DROP_SEARCH_TRIGGER_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0010_orderitem_price_alter_orderitem_quantity"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_trigger, drop_search_trigger),
+    ]
@@ -0,0 +1,82 @@
+from django.db import migrations
+
+# Frozen copies of the SQL in inventory.search, a migration must keep doing what it did when it was written
+CREATE_FTS_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS inventory_product_fts_map (
+        rowid INTEGER PRIMARY KEY,
+        product_id varchar(255) NOT NULL UNIQUE
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS inventory_product_fts
+        USING fts5(name, description, tokenize='porter unicode61')
+    """,
+]
+
+CREATE_FTS_TRIGGERS_SQL = [
+    """
+    CREATE TRIGGER IF NOT EXISTS inventory_product_fts_insert AFTER INSERT ON inventory_product BEGIN
+        INSERT INTO inventory_product_fts_map (product_id) VALUES (new.id);
+        INSERT INTO inventory_product_fts (rowid, name, description)
+            VALUES (last_insert_rowid(), new.name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS inventory_product_fts_update AFTER UPDATE OF name, description ON inventory_product
+    WHEN old.name IS NOT new.name OR old.description IS NOT new.description BEGIN
+        UPDATE inventory_product_fts SET name = new.name, description = new.description
+            WHERE rowid = (SELECT rowid FROM inventory_product_fts_map WHERE product_id = new.id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS inventory_product_fts_delete AFTER DELETE ON inventory_product BEGIN
+        DELETE FROM inventory_product_fts
+            WHERE rowid = (SELECT rowid FROM inventory_product_fts_map WHERE product_id = old.id);
+        DELETE FROM inventory_product_fts_map WHERE product_id = old.id;
+    END
+    """,
+]
+
+DROP_FTS_SQL = [
+    "DROP TRIGGER IF EXISTS inventory_product_fts_insert",
+    "DROP TRIGGER IF EXISTS inventory_product_fts_update",
+    "DROP TRIGGER IF EXISTS inventory_product_fts_delete",
+    "DROP TABLE IF EXISTS inventory_product_fts",
+    "DROP TABLE IF EXISTS inventory_product_fts_map",
+]
+
+
+def create_fts_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for statement in CREATE_FTS_SQL + CREATE_FTS_TRIGGERS_SQL:
+        schema_editor.execute(statement)
+
+    # Index the products that already exist
+    schema_editor.execute(
+        "INSERT INTO inventory_product_fts_map (product_id) SELECT id FROM inventory_product"
+    )
+    schema_editor.execute(
+        "INSERT INTO inventory_product_fts (rowid, name, description) "
+        "SELECT map.rowid, product.name, product.description "
+        "FROM inventory_product_fts_map AS map JOIN inventory_product AS product ON product.id = map.product_id"
+    )
+
+
+def drop_fts_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for statement in DROP_FTS_SQL:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0011_product_search_vector_trigger"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_index, drop_fts_index),
+    ]
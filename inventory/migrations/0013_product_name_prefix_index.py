@@ -0,0 +1,41 @@
+from django.db import migrations
+
+# Frozen copies of the SQL in inventory.search, a migration must keep doing what it did when it was written
+CREATE_PG_PREFIX_INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS inventory_product_name_prefix_idx
+    ON inventory_product ((upper(name) COLLATE "C"))
+"""
+
+DROP_PG_PREFIX_INDEX_SQL = "DROP INDEX IF EXISTS inventory_product_name_prefix_idx"
+
+CREATE_SQLITE_PREFIX_INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS inventory_product_name_prefix_idx
+    ON inventory_product (name COLLATE NOCASE)
+"""
+
+DROP_SQLITE_PREFIX_INDEX_SQL = "DROP INDEX IF EXISTS inventory_product_name_prefix_idx"
+
+
+def create_prefix_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(CREATE_PG_PREFIX_INDEX_SQL)
+    elif schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute(CREATE_SQLITE_PREFIX_INDEX_SQL)
+
+
+def drop_prefix_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(DROP_PG_PREFIX_INDEX_SQL)
+    elif schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute(DROP_SQLITE_PREFIX_INDEX_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("inventory", "0012_product_fts_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_prefix_index, drop_prefix_index),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:08
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_order_totals(apps, schema_editor):
+    # Items placed before this migration stored a running order total in
+    # `price`, so existing orders keep the total the API reported for them:
+    # the quantities at the product's current price.
+    Order = apps.get_model('inventory', 'Order')
+    OrderItem = apps.get_model('inventory', 'OrderItem')
+
+    items = OrderItem.objects.filter(order=OuterRef('pk')).order_by().values('order')
+
+    def item_sum(expression):
+        return Coalesce(Subquery(items.annotate(total=Sum(expression)).values('total')), 0)
+
+    Order.objects.update(
+        total_price=item_sum(F('quantity') * F('product__price')),
+        item_count=item_sum('quantity'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0013_product_name_prefix_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='item_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='total_price',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_order_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F, Sum
+
+
+def backfill_daily_sales(apps, schema_editor):
+    # Same sums as inventory.rollups.rebuild_sales, so reports keep their history
+    ProductDailySales = apps.get_model('inventory', 'ProductDailySales')
+    totals = {}
+    for name in ('OrderItem', 'ArchivedOrderItem'):
+        rows = apps.get_model('inventory', name).objects.exclude(order__status='cancelled').order_by()\
+            .values(day=F('order__created_at__date'), pk=F('product'))\
+            .annotate(units=Sum('quantity'), revenue=Sum(F('quantity') * F('price')))
+        for row in rows:
+            amounts = totals.setdefault((row['day'], row['pk']), [0, 0])
+            amounts[0] += row['units']
+            amounts[1] += row['revenue']
+    ProductDailySales.objects.bulk_create(
+        (ProductDailySales(date=date, product_id=pk, units=units, revenue=revenue)
+         for (date, pk), (units, revenue) in totals.items()),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0020_order_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductDailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('units', models.PositiveIntegerField(default=0)),
+                ('revenue', models.PositiveBigIntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='inventory.product')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('date', 'product'), name='inventory_daily_sales_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_daily_sales, migrations.RunPython.noop),
+    ]
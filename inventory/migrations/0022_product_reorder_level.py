@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:52
+
+import django.db.models.expressions
+from django.db import migrations, models
+from django.db.models import F
+
+
+def flag_low_stock(apps, schema_editor):
+    # The report used to list quantity < 10, the default reorder level keeps that set
+    Product = apps.get_model('inventory', 'Product')
+    Product.objects.filter(quantity__lt=F('reorder_level')).update(is_low_stock=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0021_product_daily_sales'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='is_low_stock',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='reorder_level',
+            field=models.PositiveIntegerField(default=10),
+        ),
+        migrations.RunPython(flag_low_stock, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(models.OrderBy(django.db.models.expressions.CombinedExpression(models.F('reorder_level'), '-', models.F('quantity')), descending=True), models.F('id'), condition=models.Q(('is_low_stock', True)), name='inventory_low_stock_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0024_product_sales_bucket'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='queuedorder',
+            name='archived_order',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='queue_entry', to='inventory.archivedorder'),
+        ),
+    ]
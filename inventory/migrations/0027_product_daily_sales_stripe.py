@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:23
+
+import zlib
+
+from django.db import migrations, models
+from django.db.models import F, Sum
+
+
+def restripe_daily_sales(apps, schema_editor):
+    # Same sums as inventory.rollups.rebuild_sales with its 8 stripes, so orders
+    # withdrawn later find their sales on their own stripe
+    ProductDailySales = apps.get_model('inventory', 'ProductDailySales')
+    totals = {}
+    for name in ('OrderItem', 'ArchivedOrderItem'):
+        rows = apps.get_model('inventory', name).objects.exclude(order__status='cancelled').order_by()\
+            .values(day=F('order__created_at__date'), pk=F('product'), order_pk=F('order'))\
+            .annotate(units=Sum('quantity'), revenue=Sum(F('quantity') * F('price')))
+        for row in rows:
+            stripe = zlib.crc32(str(row['order_pk']).encode()) % 8
+            amounts = totals.setdefault((row['day'], row['pk'], stripe), [0, 0])
+            amounts[0] += row['units']
+            amounts[1] += row['revenue']
+    ProductDailySales.objects.all().delete()
+    ProductDailySales.objects.bulk_create(
+        (ProductDailySales(date=date, product_id=pk, stripe=stripe, units=units, revenue=revenue)
+         for (date, pk, stripe), (units, revenue) in totals.items()),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0026_order_reservation_lapsed'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='productdailysales',
+            name='inventory_daily_sales_uniq',
+        ),
+        migrations.AddField(
+            model_name='productdailysales',
+            name='stripe',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddConstraint(
+            model_name='productdailysales',
+            constraint=models.UniqueConstraint(fields=('date', 'product', 'stripe'), name='inventory_daily_sales_stripe_uniq'),
+        ),
+        migrations.RunPython(restripe_daily_sales, migrations.RunPython.noop),
+    ]
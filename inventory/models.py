@@ -1,7 +1,9 @@
 from drugstoc_inventory.model_utils import BaseModelMixin
+from inventory.managers import ProductQuerySet, OrderQuerySet
 from django.contrib.postgres.search import SearchVectorField
 from django.contrib.postgres.indexes import GinIndex
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Q
 from django.conf import settings
 
 
@@ -10,14 +12,26 @@ class Product(BaseModelMixin):
     description = models.TextField()
     owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=0)
+    # Units held by pending orders, available stock is quantity - reserved, see inventory.stock
+    reserved = models.PositiveIntegerField(default=0)
+    # Hot products spread their reservations over this many ProductStockStripe rows, 0 keeps them on this row
+    stock_stripes = models.PositiveSmallIntegerField(default=0)
     price = models.PositiveIntegerField(default=0) #suitable model field like float or decimal might be opted for
+    # Below this quantity on hand the product is low on stock, is_low_stock is kept current by inventory.low_stock
+    reorder_level = models.PositiveIntegerField(default=10)
+    is_low_stock = models.BooleanField(default=False, editable=False)
     search_vector = SearchVectorField(null=True, blank=True)
 
+    objects = ProductQuerySet.as_manager()
+
     class Meta:
         indexes = [
             models.Index(fields=['name']),
             models.Index(fields=['owner']),
             GinIndex(fields=['search_vector']),
+            # Only low-stock products, in the report's largest-shortfall-first order
+            models.Index((F('reorder_level') - F('quantity')).desc(), F('id'),
+                         condition=Q(is_low_stock=True), name='inventory_low_stock_idx'),
         ]
         permissions = [
             ("can_add_product", "Can add product"),
@@ -28,6 +42,64 @@ class Product(BaseModelMixin):
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        product = super().from_db(db, field_names, values)
+        product._loaded_stock = product.stock_state()
+        return product
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._loaded_stock = self.stock_state()
+
+    def stock_state(self):
+        """(quantity, stock_stripes) as held by this instance, None for deferred fields."""
+        return self.__dict__.get('quantity'), self.__dict__.get('stock_stripes')
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'quantity' in update_fields:
+            # Flagged in the same write, inventory.low_stock only checks after queryset updates
+            self._was_low_stock, self.is_low_stock = self.is_low_stock, self.quantity < self.reorder_level
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'is_low_stock'}
+        # post_save receivers reallocate stock stripes before the write commits, see inventory.signals
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+        self._loaded_stock = self.stock_state()
+
+    @property
+    def reserved_total(self):
+        """Units held by pending orders, including those reserved on stock stripes."""
+        if not self.stock_stripes:
+            return self.reserved
+        striped = getattr(self, 'striped_reserved', None)
+        if striped is None:
+            striped = self.stripes.aggregate(total=models.Sum('reserved'))['total'] or 0
+        return self.reserved + striped
+
+
+class ProductStockStripe(models.Model):
+    """
+        One of the counters a hot product reserves stock on, so concurrent
+        orders update different rows instead of queueing on the product row.
+        Each stripe may reserve up to its `allotment` of the available units,
+        see inventory.stock.
+    """
+    product = models.ForeignKey(Product, related_name='stripes', on_delete=models.CASCADE)
+    index = models.PositiveSmallIntegerField()
+    allotment = models.PositiveIntegerField(default=0)
+    reserved = models.PositiveIntegerField(default=0)
+    # Stripe writes leave the product row alone, so product listings take their version from here too
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'index'], name='inventory_stock_stripe_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} stripe {self.index}"
 
 
 class Order(BaseModelMixin):
@@ -36,8 +108,29 @@ class Order(BaseModelMixin):
         ('completed', 'Completed'),
         ('cancelled', 'Cancelled'),
     ]
+    # Statuses an order may move to from each status, completed and cancelled are final
+    TRANSITIONS = {
+        'pending': {'completed', 'cancelled'},
+        'completed': set(),
+        'cancelled': set(),
+    }
     owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_CHOICES[0][0])
+    # Set when the order is placed from the item prices at that time, see OrderQuerySet.refresh_totals
+    total_price = models.PositiveIntegerField(default=0)
+    item_count = models.PositiveIntegerField(default=0)
+    # Set while a pending order holds reserved stock, expired reservations are released by a sweeper
+    reserved_until = models.DateTimeField(null=True, blank=True, db_index=True)
+    # Set on a pending order whose reservation expired: its units are back in stock until it is completed
+    reservation_lapsed = models.BooleanField(default=False)
+
+    objects = OrderQuerySet.as_manager()
+
+    class Meta(BaseModelMixin.Meta):
+        indexes = [
+            # Serves the per-owner keyset pages of the order list
+            models.Index(fields=['owner', '-created_at', 'id'], name='inventory_order_owner_page_idx'),
+        ]
 
 
 class OrderItem(BaseModelMixin):
@@ -45,6 +138,8 @@ class OrderItem(BaseModelMixin):
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=0)
     price = models.PositiveIntegerField(default=0)
+    # Index of the ProductStockStripe holding the reservation when the product was striped at order time
+    stock_stripe = models.PositiveSmallIntegerField(null=True, blank=True)
 
 
     def __str__(self):
@@ -53,3 +148,158 @@ class OrderItem(BaseModelMixin):
     @property
     def total_quantity(self):
         return self.product.count()
+
+
+class IdempotencyKey(BaseModelMixin):
+    """
+        First response to a POST sent with an Idempotency-Key header, replayed
+        to retries of the same request, see inventory.idempotency.
+    """
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response = models.JSONField(null=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta(BaseModelMixin.Meta):
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'key'], name='inventory_idempotency_owner_key_uniq'),
+        ]
+
+
+class QueuedOrder(BaseModelMixin):
+    """
+        Order accepted in async mode and waiting for a worker, see inventory.queue.
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('processing', 'Processing'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_CHOICES[0][0])
+    payload = models.JSONField()
+    order = models.OneToOneField(Order, null=True, blank=True, on_delete=models.SET_NULL, related_name='queue_entry')
+    # Takes over from ``order`` once the placed order is archived, see inventory.archive
+    archived_order = models.OneToOneField('ArchivedOrder', null=True, blank=True, on_delete=models.SET_NULL,
+                                          related_name='queue_entry')
+    errors = models.JSONField(null=True, blank=True)
+
+    class Meta(BaseModelMixin.Meta):
+        indexes = [
+            # Workers claim the oldest queued entries first
+            models.Index(fields=['status', 'created_at'], name='inventory_queue_claim_idx'),
+        ]
+
+
+class ArchivedOrder(models.Model):
+    """
+        Completed or cancelled order moved out of the Order table by the
+        archive_orders command, see inventory.archive. Keeps the id and
+        timestamps of the live order so detail, history and reports read both
+        tables as one.
+    """
+    id = models.CharField(primary_key=True, max_length=255)
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    status = models.CharField(max_length=20, choices=Order.STATUS_CHOICES)
+    total_price = models.PositiveIntegerField(default=0)
+    item_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(db_index=True)
+    updated_at = models.DateTimeField()
+    active = models.BooleanField(default=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at', 'id']
+        indexes = [
+            # Same keyset pages as inventory_order_owner_page_idx, the order list merges both
+            models.Index(fields=['owner', '-created_at', 'id'], name='inventory_archive_page_idx'),
+        ]
+
+    def __str__(self):
+        return f"< ArchivedOrder({self.id}) >"
+
+
+class ArchivedOrderItem(models.Model):
+    id = models.CharField(primary_key=True, max_length=255)
+    order = models.ForeignKey(ArchivedOrder, related_name='items', on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField(default=0)
+    price = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    active = models.BooleanField(default=True)
+
+    class Meta:
+        ordering = ['-created_at', 'id']
+
+
+class ProductDailySales(models.Model):
+    """
+        Units and revenue of one product on one local day, kept current as
+        orders are placed and withdrawn, see inventory.rollups. Sales reports
+        read these instead of every order item. Orders spread over
+        ``stripe`` rows, a product's day is the sum of its stripes.
+    """
+    date = models.DateField()
+    product = models.ForeignKey(Product, related_name='daily_sales', on_delete=models.CASCADE)
+    stripe = models.PositiveSmallIntegerField(default=0)
+    units = models.PositiveIntegerField(default=0)
+    revenue = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Also serves the date range scans of the reports
+            models.UniqueConstraint(fields=['date', 'product', 'stripe'], name='inventory_daily_sales_stripe_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} on {self.date}"
+
+
+class ProductOrderFrequency(models.Model):
+    """
+        Units of one product a user ordered over all their placed orders that
+        were not withdrawn, and how many orders they were in, kept current as
+        orders are placed and withdrawn, see inventory.frequency. Buy-again
+        lists read these instead of the user's order items.
+    """
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='product_frequencies', on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, related_name='order_frequencies', on_delete=models.CASCADE)
+    units = models.PositiveIntegerField(default=0)
+    orders = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'product'], name='inventory_frequency_uniq'),
+        ]
+        indexes = [
+            # A user's most ordered products first, the top N is a range scan of N entries
+            models.Index(fields=['owner', '-units', 'product'], name='inventory_frequency_top_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} for {self.owner_id}"
+
+
+class ProductSalesBucket(models.Model):
+    """
+        Units of one product sold in one LEADERBOARD_BUCKET_SECONDS slice of
+        time, by the time the order was placed, kept current as orders are
+        placed and withdrawn, see inventory.leaderboard. Best-seller windows
+        sum their buckets.
+    """
+    bucket = models.PositiveIntegerField()
+    product = models.ForeignKey(Product, related_name='sales_buckets', on_delete=models.CASCADE)
+    units = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Also serves the bucket range scans of the leaderboard
+            models.UniqueConstraint(fields=['bucket', 'product'], name='inventory_sales_bucket_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} in bucket {self.bucket}"
@@ -0,0 +1,147 @@
+# pagination.py
+import json
+from base64 import b64decode, b64encode
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+        Cursor pagination keyed on the BaseModelMixin ordering (-created_at, id).
+
+        Each page is a range scan on the created_at index that starts right
+        after the last row of the previous page, so there is no COUNT(*) and
+        no OFFSET: page 5,000 costs the same as page 1. Cursors are opaque
+        base64 tokens carrying the (created_at, id) of the boundary row.
+    """
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.paginate_querysets([queryset], request)
+
+    def paginate_querysets(self, querysets, request):
+        """
+            Page over several querysets sharing the (created_at, id) keys as if
+            they were one, e.g. live and archived orders. Each contributes at
+            most a page of rows past the cursor and the rows are merged in page
+            order, so this costs one range scan per queryset.
+        """
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        position, reverse = self.decode_cursor(request)
+        results = []
+        for queryset in querysets:
+            results.extend(self.filter_queryset(queryset, position, reverse)[:self.page_size + 1])
+        if len(querysets) > 1:
+            # Stable sorts: id breaks created_at ties, ascending forwards and descending backwards
+            results.sort(key=lambda item: self.get_position(item)[1], reverse=reverse)
+            results.sort(key=lambda item: self.get_position(item)[0], reverse=not reverse)
+
+        results = results[:self.page_size + 1]
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        # Walking backwards we came from a row that is still ahead of us,
+        # walking forwards we came from a row that is still behind us.
+        self.has_next = position is not None if reverse else has_more
+        self.has_previous = has_more if reverse else position is not None
+        self.page = results
+        return results
+
+    def filter_queryset(self, queryset, position, reverse):
+        if reverse:
+            queryset = queryset.order_by('created_at', '-id')
+        else:
+            queryset = queryset.order_by('-created_at', 'id')
+
+        if position is None:
+            return queryset
+
+        created_at, pk = position
+        if reverse:
+            return queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__lt=pk))
+        return queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__gt=pk))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                return _positive_int(
+                    request.query_params[self.page_size_query_param],
+                    strict=True,
+                    cutoff=self.max_page_size
+                )
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, item, reverse):
+        created_at, pk = self.get_position(item)
+        payload = {'t': created_at.isoformat(), 'i': pk}
+        if reverse:
+            payload['r'] = 1
+        token = b64encode(json.dumps(payload, separators=(',', ':')).encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+
+        try:
+            payload = json.loads(b64decode(encoded.encode('ascii')).decode('ascii'))
+            created_at = parse_datetime(payload['t'])
+            pk = str(payload['i'])
+            reverse = bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, AttributeError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if created_at is None:
+            raise NotFound(self.invalid_cursor_message)
+        return (created_at, pk), reverse
+
+    def get_position(self, item):
+        if isinstance(item, dict):
+            return item['created_at'], item['id']
+        return item.created_at, item.pk
@@ -0,0 +1,159 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import serializers
+
+from .models import Order, OrderItem, Product, QueuedOrder
+from .serializers import OrderSerializer
+from .signals import orders_placed
+from .stock import reservation_expiry, reserve_stock
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_order(owner, items):
+    """
+    Queue an order whose ``items`` ([{product, quantity}]) already have a
+    valid shape. Products and stock are only checked when it is placed.
+    """
+    if settings.ORDER_QUEUE_MODE == 'eager':
+        # No worker: place the order in this process once the entry is committed
+        entry = QueuedOrder.objects.create(owner=owner, payload={'items': items}, status='processing')
+        transaction.on_commit(lambda: process_eagerly([entry.pk]))
+        return entry
+    return QueuedOrder.objects.create(owner=owner, payload={'items': items})
+
+
+def process_eagerly(pks):
+    """
+    Place the entries ``pks`` in this process. An unexpected error fails the
+    entries that were not placed, there is no worker to reclaim them.
+    """
+    try:
+        process_entries(pks)
+    except Exception as exc:
+        logger.exception(f"Placing queued orders {pks} failed: {exc}")
+        QueuedOrder.objects.filter(pk__in=pks, status='processing', order__isnull=True)\
+            .update(status='failed', errors=['The order could not be placed, please try again.'], updated_at=timezone.now())
+
+
+def claim_batch(batch_size):
+    """
+    Mark up to ``batch_size`` of the oldest queued entries as processing and
+    return their ids. Entries locked by another worker are skipped, entries
+    left processing by a worker that died are claimed again.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.ORDER_QUEUE_STALE_AFTER)
+    with transaction.atomic():
+        pks = list(
+            QueuedOrder.objects.select_for_update(skip_locked=True)
+            .filter(Q(status='queued') | Q(status='processing', updated_at__lt=stale))
+            .order_by('created_at')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        QueuedOrder.objects.filter(pk__in=pks).update(status='processing', updated_at=now)
+    return pks
+
+
+def process_entries(pks):
+    """
+    Place the claimed entries ``pks`` and return ``{'completed': n, 'failed': n}``.
+
+    Entries ordering exactly the same products are placed together: one
+    conditional stock reservation and one insert per table for the whole group
+    instead of one round of locks per order. A group the stock cannot cover
+    as a whole falls back to placing its orders one by one, oldest first.
+    """
+    entries = list(
+        QueuedOrder.objects.select_related('owner').filter(pk__in=pks, status='processing').order_by('created_at')
+    )
+    products = Product.objects.in_bulk({item['product'] for entry in entries for item in entry.payload['items']})
+    outcome = {'completed': 0, 'failed': 0}
+
+    groups = defaultdict(list)
+    for entry in entries:
+        missing = [item['product'] for item in entry.payload['items'] if item['product'] not in products]
+        if missing:
+            outcome['failed'] += fail(entry, [f"Product with ID {pk} does not exist." for pk in missing])
+            continue
+        items = [{'product': products[item['product']], 'quantity': item['quantity']} for item in entry.payload['items']]
+        groups[frozenset(OrderSerializer.get_quantities(items))].append((entry, items))
+
+    for group in groups.values():
+        if len(group) > 1:
+            try:
+                outcome['completed'] += place_group(group)
+                continue
+            except serializers.ValidationError:
+                pass
+
+        for entry, items in group:
+            try:
+                outcome['completed'] += place_group([(entry, items)])
+            except serializers.ValidationError as exc:
+                outcome['failed'] += fail(entry, exc.detail)
+    return outcome
+
+
+def place_group(group):
+    """
+    Place every (entry, items) order of ``group`` in one transaction and
+    return how many were placed. Entries another worker placed or failed
+    since they were loaded are left out.
+    """
+    with transaction.atomic():
+        # A worker that reclaimed a stale entry may be placing it too, the row
+        # locks make one of them wait and then see the entry is done
+        unplaced = set(
+            QueuedOrder.objects.select_for_update()
+            .filter(pk__in=[entry.pk for entry, _ in group], status='processing', order__isnull=True)
+            .values_list('pk', flat=True)
+        )
+        group = [(entry, items) for entry, items in group if entry.pk in unplaced]
+        if not group:
+            return 0
+
+        quantities = defaultdict(int)
+        for _, items in group:
+            for pk, quantity in OrderSerializer.get_quantities(items).items():
+                quantities[pk] += quantity
+
+        # Every order of a group is for the same products
+        stripes = reserve_stock(dict(quantities), OrderSerializer.get_stripes(group[0][1]))
+        reserved_until = reservation_expiry()
+        orders = Order.objects.bulk_create(
+            Order(owner=entry.owner, reserved_until=reserved_until, **OrderSerializer.get_totals(items))
+            for entry, items in group
+        )
+        placed = OrderItem.objects.bulk_create(
+            item for order, (_, items) in zip(orders, group) for item in OrderSerializer.build_items(order, items, stripes)
+        )
+        orders_placed.send(sender=Order, items=placed)
+
+        now = timezone.now()
+        for order, (entry, _) in zip(orders, group):
+            entry.order, entry.status, entry.errors, entry.updated_at = order, 'completed', None, now
+        QueuedOrder.objects.bulk_update([entry for entry, _ in group], ['order', 'status', 'errors', 'updated_at'])
+    return len(group)
+
+
+def fail(entry, errors):
+    """Mark ``entry`` failed unless another worker finished it meanwhile, return 1 if marked and 0 if not."""
+    return QueuedOrder.objects.filter(pk=entry.pk, status='processing', order__isnull=True)\
+        .update(status='failed', errors=errors, updated_at=timezone.now())
+
+
+def process_queue(batch_size=None):
+    """Drain the queue batch by batch and yield the outcome of every batch."""
+    batch_size = batch_size or settings.ORDER_QUEUE_BATCH_SIZE
+    while True:
+        pks = claim_batch(batch_size)
+        if not pks:
+            return
+        yield process_entries(pks)
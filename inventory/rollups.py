@@ -0,0 +1,201 @@
+import zlib
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Case, F, Min, Q, Sum, Value, When
+from django.db.models.functions import Greatest, TruncHour, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem, ProductDailySales
+
+# Sales are the items of placed orders that were not cancelled, live or
+# archived, on the local date the order was placed. ProductDailySales holds
+# them per product and day: placing an order adds its items, cancelling it
+# (or deleting it before it was cancelled) takes them away again, both in the
+# order's transaction. rebuild_sales recomputes days from the items for
+# backfills and for writes that bypass the order flows, e.g. the admin.
+#
+# Every product and day has up to ROLLUP_STRIPES rows, an order's sales go to
+# the stripe its id hashes to, so concurrent orders for a popular product
+# rarely wait on each other's row lock. Withdrawing an order takes its sales
+# back from the same stripe, and readers sum the stripes. Changing
+# ROLLUP_STRIPES moves orders to other stripes: rerun rebuild_sales_rollups.
+
+ROLLUP_STRIPES = 8
+ROLLUP_UPDATE_BATCH_SIZE = 500
+SALES_INTERVALS = ['hour', 'day', 'week', 'month']
+
+
+def rollup_stripe(order_id):
+    """The rollup stripe of an order, the same in every process."""
+    return zlib.crc32(str(order_id).encode()) % ROLLUP_STRIPES
+
+
+def sales_by_day(items):
+    """``{(date, product id, stripe): [units, revenue]}`` of order items whose ``order`` is loaded."""
+    totals = defaultdict(lambda: [0, 0])
+    for item in items:
+        amounts = totals[timezone.localdate(item.order.created_at), item.product_id, rollup_stripe(item.order_id)]
+        amounts[0] += item.quantity
+        amounts[1] += item.quantity * item.price
+    return totals
+
+
+def record_sales(items, sign=1):
+    """
+    Add the sales of ``items`` to their rollup rows, or take them away with
+    ``sign=-1``: rows missing for new sales are inserted, then one UPDATE per
+    batch increments every row by its own amounts. Decrements stop at zero,
+    e.g. for sales an outside edit never rolled up.
+    """
+    totals = list(sales_by_day(items).items())
+    if sign > 0:
+        ProductDailySales.objects.bulk_create(
+            [ProductDailySales(date=date, product_id=pk, stripe=stripe) for (date, pk, stripe), _ in totals],
+            ignore_conflicts=True,
+        )
+
+    # Each row costs 11 query parameters, a batch stays within the limits of postgres and SQLite 3.32+
+    for offset in range(0, len(totals), ROLLUP_UPDATE_BATCH_SIZE):
+        batch = totals[offset:offset + ROLLUP_UPDATE_BATCH_SIZE]
+
+        def per_row(field):
+            return Case(*[When(date=date, product_id=pk, stripe=stripe, then=Value(sign * amounts[field]))
+                          for (date, pk, stripe), amounts in batch])
+
+        rows = reduce(or_, (Q(date=date, product_id=pk, stripe=stripe) for (date, pk, stripe), _ in batch))
+        ProductDailySales.objects.filter(rows)\
+            .update(units=Greatest(F('units') + per_row(0), 0), revenue=Greatest(F('revenue') + per_row(1), 0))
+
+
+def day_bounds(start, end):
+    """Aware datetimes from the start of local day ``start`` up to the end of ``end``."""
+    return (timezone.make_aware(datetime.combine(start, time.min)),
+            timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min)))
+
+
+def raw_sales(start, end):
+    """``sales_by_day`` for the days ``start`` to ``end``, aggregated from live and archived items."""
+    since, until = day_bounds(start, end)
+    totals = {}
+    for model in (OrderItem, ArchivedOrderItem):
+        rows = model.objects.filter(order__created_at__gte=since, order__created_at__lt=until)\
+            .exclude(order__status='cancelled').order_by()\
+            .values(day=F('order__created_at__date'), pk=F('product'), order_pk=F('order'))\
+            .annotate(units=Sum('quantity'), revenue=Sum(F('quantity') * F('price')))
+        for row in rows:
+            amounts = totals.setdefault((row['day'], row['pk'], rollup_stripe(row['order_pk'])), [0, 0])
+            amounts[0] += row['units']
+            amounts[1] += row['revenue']
+    return totals
+
+
+def rolled_up_sales(start, end):
+    return {
+        (date, pk, stripe): [units, revenue] for date, pk, stripe, units, revenue in
+        ProductDailySales.objects.filter(date__range=(start, end), units__gt=0)
+        .values_list('date', 'product', 'stripe', 'units', 'revenue')
+    }
+
+
+def first_sale_date():
+    firsts = [model.objects.aggregate(first=Min('created_at'))['first'] for model in (Order, ArchivedOrder)]
+    first = min(filter(None, firsts), default=None)
+    return timezone.localdate(first) if first else None
+
+
+def date_chunks(start, end, days):
+    while start <= end:
+        yield start, min(start + timedelta(days=days - 1), end)
+        start += timedelta(days=days)
+
+
+def rebuild_sales(start, end, chunk_days=31):
+    """
+    Replace the rollups of the days ``start`` to ``end`` with sums over the
+    order items, ``chunk_days`` days per transaction, and yield each range
+    done. Rerunning it is harmless.
+    """
+    for first, last in date_chunks(start, end, chunk_days):
+        with transaction.atomic():
+            totals = raw_sales(first, last)
+            ProductDailySales.objects.filter(date__range=(first, last)).delete()
+            ProductDailySales.objects.bulk_create(
+                ProductDailySales(date=date, product_id=pk, stripe=stripe, units=units, revenue=revenue)
+                for (date, pk, stripe), (units, revenue) in totals.items()
+            )
+        yield first, last
+
+
+def verify_sales(start, end, chunk_days=31):
+    """
+    Compare the rollups of the days ``start`` to ``end`` with the order
+    items and return the differences as ``[(date, product id, stripe,
+    expected [units, revenue], rolled up [units, revenue])]``.
+    """
+    mismatches = []
+    for first, last in date_chunks(start, end, chunk_days):
+        expected, actual = raw_sales(first, last), rolled_up_sales(first, last)
+        for key in sorted(expected.keys() | actual.keys()):
+            if expected.get(key, [0, 0]) != actual.get(key, [0, 0]):
+                mismatches.append((*key, expected.get(key, [0, 0]), actual.get(key, [0, 0])))
+    return mismatches
+
+
+def bucket_starts(start, end, interval):
+    """
+    Yield the local start of every ``interval`` bucket covering the days
+    ``start`` to ``end``: aware datetimes for hours, dates otherwise. Weeks
+    start on Monday and months on the 1st, before ``start`` if need be.
+    """
+    if interval == 'hour':
+        since, until = day_bounds(start, end)
+        while since < until:
+            yield timezone.localtime(since)
+            since += timedelta(hours=1)
+        return
+    if interval == 'week':
+        start -= timedelta(days=start.weekday())
+    elif interval == 'month':
+        start = start.replace(day=1)
+    while start <= end:
+        yield start
+        if interval == 'day':
+            start += timedelta(days=1)
+        elif interval == 'week':
+            start += timedelta(weeks=1)
+        else:
+            start = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def sales_totals(start, end, interval):
+    """
+    Revenue of the days ``start`` to ``end`` per ``interval`` bucket, as
+    ``{bucket start: revenue}`` for the buckets with sales.
+
+    Days, weeks and months group the daily rollups, truncating their date in
+    the database. Hours are finer than the rollups and group the live and
+    archived items by the local hour of their order, over the created_at index.
+    """
+    if interval == 'hour':
+        since, until = day_bounds(start, end)
+        hour = TruncHour('order__created_at', tzinfo=timezone.get_current_timezone())
+        hourly = [
+            model.objects.filter(order__created_at__gte=since, order__created_at__lt=until)
+            .exclude(order__status='cancelled').order_by()
+            .values(bucket=hour).annotate(total=Sum(F('quantity') * F('price')))
+            for model in (OrderItem, ArchivedOrderItem)
+        ]
+        rows = hourly[0].union(hourly[1], all=True)
+    else:
+        bucket = {'day': F('date'), 'week': TruncWeek('date'), 'month': TruncMonth('date')}[interval]
+        rows = ProductDailySales.objects.filter(date__range=(start, end)).order_by()\
+            .values(bucket=bucket).annotate(total=Sum('revenue'))
+
+    totals = defaultdict(int)
+    for row in rows:
+        totals[row['bucket']] += row['total']
+    return totals
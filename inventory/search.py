@@ -0,0 +1,269 @@
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection, transaction
+from django.db.models import Q
+
+from .models import Product
+
+# Text search configuration shared by the indexing trigger and the queries
+SEARCH_CONFIG = 'english'
+
+# Matches on the name (weight A) rank above matches on the description (weight B)
+PRODUCT_SEARCH_VECTOR = (
+    SearchVector('name', weight='A', config=SEARCH_CONFIG)
+    + SearchVector('description', weight='B', config=SEARCH_CONFIG)
+)
+
+# Keeps search_vector current inside the INSERT/UPDATE itself, so writes pay no extra round trip
+CREATE_SEARCH_TRIGGER_SQL = f"""
+CREATE OR REPLACE FUNCTION inventory_product_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(NEW.name, '')), 'A') ||
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(NEW.description, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS inventory_product_search_vector_trigger ON inventory_product;
+CREATE TRIGGER inventory_product_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF name, description ON inventory_product
+    FOR EACH ROW EXECUTE PROCEDURE inventory_product_search_vector_update();
+"""
+
+DROP_SEARCH_TRIGGER_SQL = """
+DROP TRIGGER IF EXISTS inventory_product_search_vector_trigger ON inventory_product;
+DROP FUNCTION IF EXISTS inventory_product_search_vector_update();
+"""
+
+# Prefix lookups for autocomplete. upper(name) in the "C" collation lets a
+# plain btree serve both `LIKE 'PAR%'` and the ORDER BY, so the scan stops
+# after `limit` rows whatever the locale of the database.
+CREATE_PG_PREFIX_INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS inventory_product_name_prefix_idx
+    ON inventory_product ((upper(name) COLLATE "C"))
+"""
+
+DROP_PG_PREFIX_INDEX_SQL = "DROP INDEX IF EXISTS inventory_product_name_prefix_idx"
+
+# SQLite only applies its LIKE optimization to NOCASE indexes
+CREATE_SQLITE_PREFIX_INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS inventory_product_name_prefix_idx
+    ON inventory_product (name COLLATE NOCASE)
+"""
+
+DROP_SQLITE_PREFIX_INDEX_SQL = "DROP INDEX IF EXISTS inventory_product_name_prefix_idx"
+
+# SQLite FTS5 index. Product ids are strings and the product table's implicit
+# rowid is not stable (VACUUM and table rebuilds renumber it), so FTS rows are
+# keyed by an INTEGER PRIMARY KEY from a small map table instead.
+CREATE_FTS_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS inventory_product_fts_map (
+        rowid INTEGER PRIMARY KEY,
+        product_id varchar(255) NOT NULL UNIQUE
+    )
+    """,
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS inventory_product_fts
+        USING fts5(name, description, tokenize='porter unicode61')
+    """,
+]
+
+# Table rebuilds in later migrations drop triggers, so these are re-created after every migrate
+CREATE_FTS_TRIGGERS_SQL = [
+    """
+    CREATE TRIGGER IF NOT EXISTS inventory_product_fts_insert AFTER INSERT ON inventory_product BEGIN
+        INSERT INTO inventory_product_fts_map (product_id) VALUES (new.id);
+        INSERT INTO inventory_product_fts (rowid, name, description)
+            VALUES (last_insert_rowid(), new.name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS inventory_product_fts_update AFTER UPDATE OF name, description ON inventory_product
+    WHEN old.name IS NOT new.name OR old.description IS NOT new.description BEGIN
+        UPDATE inventory_product_fts SET name = new.name, description = new.description
+            WHERE rowid = (SELECT rowid FROM inventory_product_fts_map WHERE product_id = new.id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS inventory_product_fts_delete AFTER DELETE ON inventory_product BEGIN
+        DELETE FROM inventory_product_fts
+            WHERE rowid = (SELECT rowid FROM inventory_product_fts_map WHERE product_id = old.id);
+        DELETE FROM inventory_product_fts_map WHERE product_id = old.id;
+    END
+    """,
+]
+
+DROP_FTS_SQL = [
+    "DROP TRIGGER IF EXISTS inventory_product_fts_insert",
+    "DROP TRIGGER IF EXISTS inventory_product_fts_update",
+    "DROP TRIGGER IF EXISTS inventory_product_fts_delete",
+    "DROP TABLE IF EXISTS inventory_product_fts",
+    "DROP TABLE IF EXISTS inventory_product_fts_map",
+]
+
+
+def like_prefix(prefix):
+    """Escape LIKE wildcards in ``prefix`` and append one trailing ``%``."""
+    return prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+
+class PostgresSearchBackend:
+    """Ranked full text search on the trigger-maintained search_vector column."""
+
+    migration = '0013_product_name_prefix_index'
+
+    def search(self, query, limit):
+        search_query = SearchQuery(query, config=SEARCH_CONFIG)
+        search_rank = SearchRank('search_vector', search_query)
+
+        return Product.objects.with_owner().with_stock().filter(search_vector=search_query)\
+            .annotate(rank=search_rank)\
+            .order_by('-rank', '-created_at')[:limit]
+
+    def autocomplete(self, prefix, limit):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT id, name FROM inventory_product
+                WHERE upper(name) COLLATE "C" LIKE upper(%s)
+                ORDER BY upper(name) COLLATE "C"
+                LIMIT %s
+                """,
+                [like_prefix(prefix), limit],
+            )
+            return [{'id': pk, 'name': name} for pk, name in cursor.fetchall()]
+
+    def install(self):
+        with connection.cursor() as cursor:
+            cursor.execute(CREATE_SEARCH_TRIGGER_SQL)
+            cursor.execute(CREATE_PG_PREFIX_INDEX_SQL)
+
+    def reindex(self, chunk_size, progress):
+        done = 0
+        last_pk = ''
+        while True:
+            pks = list(
+                Product.objects.filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:chunk_size]
+            )
+            if not pks:
+                return done
+            Product.objects.filter(pk__in=pks).update(search_vector=PRODUCT_SEARCH_VECTOR)
+            done += len(pks)
+            last_pk = pks[-1]
+            progress(done)
+
+
+class SQLiteSearchBackend:
+    """BM25-ranked search on an FTS5 index that SQLite triggers keep in sync with Product."""
+
+    migration = '0013_product_name_prefix_index'
+
+    # bm25() weights per FTS column, name matches rank above description matches
+    weights = (10.0, 1.0)
+
+    def search(self, query, limit):
+        match = self.match_expression(query)
+        if not match:
+            return []
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT map.product_id
+                FROM inventory_product_fts
+                JOIN inventory_product_fts_map AS map ON map.rowid = inventory_product_fts.rowid
+                WHERE inventory_product_fts MATCH %s
+                ORDER BY bm25(inventory_product_fts, %s, %s)
+                LIMIT %s
+                """,
+                [match, *self.weights, limit],
+            )
+            pks = [row[0] for row in cursor.fetchall()]
+
+        products = Product.objects.with_owner().with_stock().in_bulk(pks)
+        return [products[pk] for pk in pks if pk in products]
+
+    def match_expression(self, query):
+        # Quote every term so user input can never be parsed as FTS5 syntax,
+        # terms are ANDed like postgres' plain search queries
+        return ' '.join(f'"{term}"' for term in re.findall(r'\w+', query))
+
+    def autocomplete(self, prefix, limit):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT id, name FROM inventory_product
+                WHERE name LIKE %s ESCAPE '\\'
+                ORDER BY name COLLATE NOCASE
+                LIMIT %s
+                """,
+                [like_prefix(prefix), limit],
+            )
+            return [{'id': pk, 'name': name} for pk, name in cursor.fetchall()]
+
+    def install(self):
+        with connection.cursor() as cursor:
+            for statement in CREATE_FTS_SQL + CREATE_FTS_TRIGGERS_SQL:
+                cursor.execute(statement)
+            # Table rebuilds also drop indexes Django does not know about
+            cursor.execute(CREATE_SQLITE_PREFIX_INDEX_SQL)
+
+    def reindex(self, chunk_size, progress):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("DELETE FROM inventory_product_fts")
+            cursor.execute("DELETE FROM inventory_product_fts_map")
+            cursor.execute("INSERT INTO inventory_product_fts_map (product_id) SELECT id FROM inventory_product")
+            cursor.execute(
+                """
+                INSERT INTO inventory_product_fts (rowid, name, description)
+                SELECT map.rowid, product.name, product.description
+                FROM inventory_product_fts_map AS map
+                JOIN inventory_product AS product ON product.id = map.product_id
+                """
+            )
+            done = cursor.rowcount
+        progress(done)
+        return done
+
+
+class BasicSearchBackend:
+    """Unranked substring search for databases without a full text index."""
+
+    migration = None
+
+    def search(self, query, limit):
+        return Product.objects.with_owner().with_stock()\
+            .filter(Q(name__icontains=query) | Q(description__icontains=query))\
+            .order_by('-created_at')[:limit]
+
+    def autocomplete(self, prefix, limit):
+        return list(Product.objects.filter(name__istartswith=prefix).order_by('name').values('id', 'name')[:limit])
+
+    def install(self):
+        pass
+
+    def reindex(self, chunk_size, progress):
+        return 0
+
+
+SEARCH_BACKENDS = {
+    'postgresql': PostgresSearchBackend,
+    'sqlite': SQLiteSearchBackend,
+}
+
+
+def get_search_backend():
+    """Pick the search backend for the database vendor in use."""
+    return SEARCH_BACKENDS.get(connection.vendor, BasicSearchBackend)()
+
+
+def search_products(query):
+    return get_search_backend().search(query, settings.PRODUCT_SEARCH_LIMIT)
+
+
+def autocomplete_products(prefix, limit):
+    return get_search_backend().autocomplete(prefix, limit)
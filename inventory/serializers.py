@@ -1,7 +1,9 @@
 # serializers.py
 import logging
 from rest_framework import serializers
-from .models import Product, Order, OrderItem
+from .models import Product, Order, OrderItem, QueuedOrder, ArchivedOrder, ArchivedOrderItem, ProductOrderFrequency
+from .signals import orders_placed
+from .stock import reservation_expiry, reserve_stock
 from django.db import transaction
 from django.db.models import Sum
 
@@ -13,13 +15,16 @@ class ProductSerializer(serializers.ModelSerializer):
     owner = serializers.SerializerMethodField()
     name = serializers.CharField(required=False)
     description = serializers.CharField(required=False)
+    # Includes units reserved on stock stripes of hot products
+    reserved = serializers.IntegerField(source='reserved_total', read_only=True)
 
     def get_owner(self, obj):
         return obj.owner.name
         
     class Meta:
         model = Product
-        fields = ['id', 'name', 'description', 'quantity', 'price', 'created_at', 'updated_at', 'owner']
+        fields = ['id', 'name', 'description', 'quantity', 'reserved', 'reorder_level', 'is_low_stock', 'price',
+                  'created_at', 'updated_at', 'owner']
 
 class OrderItemSerializer(serializers.ModelSerializer):
     product = serializers.PrimaryKeyRelatedField(queryset=Product.objects.all())
@@ -29,64 +34,178 @@ class OrderItemSerializer(serializers.ModelSerializer):
         fields = ['id', 'product', 'quantity', 'price']
 
 
+class DeferredProductField(serializers.PrimaryKeyRelatedField):
+    """
+        Accepts a product id without querying, OrderSerializer resolves every
+        item's product in one query instead of one per item.
+    """
+    def to_internal_value(self, data):
+        if isinstance(data, bool) or not isinstance(data, (str, int)):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        return str(data)
+
+
+class OrderLineSerializer(OrderItemSerializer):
+    product = DeferredProductField(queryset=Product.objects.all())
+
+
 class OrderSerializer(serializers.ModelSerializer):
     owner = serializers.SerializerMethodField()
-    items = OrderItemSerializer(many=True)
-    total_price = serializers.SerializerMethodField()
+    items = OrderLineSerializer(many=True)
 
     def get_owner(self, obj):
         return obj.owner.name
 
-    def get_total_price(self, obj):
-        total_price = sum(item.quantity * item.product.price for item in obj.items.all())
-        return total_price
-
     class Meta:
         model = Order
-        fields = ['id', 'owner', 'status', 'items', 'total_price', 'created_at', 'updated_at']
+        fields = ['id', 'owner', 'status', 'items', 'total_price', 'item_count', 'reserved_until',
+                  'created_at', 'updated_at']
+        read_only_fields = ['total_price', 'item_count', 'reserved_until']
+
+    def validate_items(self, items):
+        products = Product.objects.in_bulk({item['product'] for item in items})
+
+        errors = [
+            {} if item['product'] in products
+            else {'product': [f"Invalid pk \"{item['product']}\" - object does not exist."]}
+            for item in items
+        ]
+        if any(errors):
+            raise serializers.ValidationError(errors)
+
+        for item in items:
+            item['product'] = products[item['product']]
+        return items
 
     #rollback if any transaction fails
     @transaction.atomic
     def create(self, validated_data):
         items_data = validated_data.pop('items')
-        order = Order.objects.create(**validated_data)
+        # Totals are fixed at the prices of the moment the order is placed
+        order = Order.objects.create(**validated_data, **self.get_totals(items_data),
+                                     reserved_until=reservation_expiry())
 
-        total_order_price = self.process_order_items(order, items_data)
-        
-        order.save()
-        return order
+        items = self.process_order_items(order, items_data)
+        orders_placed.send(sender=Order, items=items)
+
+        # Reload with owner, items and products in a fixed number of queries for the response
+        return Order.objects.with_details().get(pk=order.pk)
 
     def process_order_items(self, order, items_data):
-        total_order_price = 0
+        # Reserve every product at once with a conditional increment of its reserved counter
+        stripes = reserve_stock(self.get_quantities(items_data), self.get_stripes(items_data))
+
+        return OrderItem.objects.bulk_create(self.build_items(order, items_data, stripes))
+
+    @staticmethod
+    def get_totals(items_data):
+        return {
+            'total_price': sum(item['quantity'] * item['product'].price for item in items_data),
+            'item_count': sum(item['quantity'] for item in items_data),
+        }
 
+    @staticmethod
+    def get_quantities(items_data):
+        quantities = {}
         for item_data in items_data:
-            product_id = item_data['product'].id
-            order_quantity = item_data['quantity']
+            product_id = item_data['product'].pk
+            quantities[product_id] = quantities.get(product_id, 0) + item_data['quantity']
+        return quantities
+
+    @staticmethod
+    def get_stripes(items_data):
+        return {item['product'].pk: item['product'].stock_stripes for item in items_data if item['product'].stock_stripes}
+
+    @staticmethod
+    def build_items(order, items_data, stripes=None):
+        stripes = stripes or {}
+        return [
+            OrderItem(
+                order=order,
+                product=item_data['product'],
+                quantity=item_data['quantity'],
+                price=item_data['product'].price,
+                stock_stripe=stripes.get(item_data['product'].pk),
+            )
+            for item_data in items_data
+        ]
+
+
+class QueuedOrderRequestSerializer(serializers.Serializer):
+    """
+        Shape-only validation of an async order, products and stock are
+        checked when a worker places it.
+    """
+    items = OrderLineSerializer(many=True)
+
+    def to_payload(self):
+        return [{'product': item['product'], 'quantity': item.get('quantity', 0)} for item in self.validated_data['items']]
+
+
+class QueuedOrderSerializer(serializers.ModelSerializer):
+    order = serializers.SerializerMethodField()
+
+    def get_order(self, obj):
+        return obj.order_id or obj.archived_order_id
 
-            # Retrieve the product object
-            try:
-                product_obj = Product.objects.get(id=product_id)
-            except Product.DoesNotExist:
-                raise serializers.ValidationError(f"Product with ID {product_id} does not exist.")
+    class Meta:
+        model = QueuedOrder
+        fields = ['id', 'status', 'order', 'errors', 'created_at', 'updated_at']
 
-            if product_obj.quantity < order_quantity:
-                raise serializers.ValidationError(f"Insufficient stock for product {product_obj.name}.")
 
-            unit_price = product_obj.price
-            item_price = order_quantity * unit_price
-            total_order_price += item_price
+class ArchivedOrderItemSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ArchivedOrderItem
+        fields = ['id', 'product', 'quantity', 'price']
 
-            OrderItem.objects.create(order=order, product=product_obj, quantity=order_quantity, price=total_order_price)
 
-            product_obj.quantity -= order_quantity
-            product_obj.save()
+class ArchivedOrderSerializer(serializers.ModelSerializer):
+    """
+        Same shape as OrderSerializer, clients cannot tell an archived order from a live one.
+    """
+    owner = serializers.SerializerMethodField()
+    items = ArchivedOrderItemSerializer(many=True)
+    # Archived orders are completed or cancelled, none holds a reservation
+    reserved_until = serializers.SerializerMethodField()
+
+    def get_owner(self, obj):
+        return obj.owner.name
+
+    def get_reserved_until(self, obj):
+        return None
+
+    class Meta:
+        model = ArchivedOrder
+        fields = OrderSerializer.Meta.fields
 
 
 class LowStockProductSerializer(serializers.ModelSerializer):
+    # Units missing to get back to the reorder level
+    shortfall = serializers.IntegerField(read_only=True)
+
     class Meta:
         model = Product
-        fields = ['id', 'name', 'quantity', 'description', 'created_at', 'updated_at']
+        fields = ['id', 'name', 'quantity', 'reorder_level', 'shortfall', 'description', 'created_at', 'updated_at']
+
+class FrequentProductSerializer(serializers.ModelSerializer):
+    product_name = serializers.CharField(source='product.name')
+    total_quantity = serializers.IntegerField(source='units')
+    order_count = serializers.IntegerField(source='orders')
+
+    class Meta:
+        model = ProductOrderFrequency
+        fields = ['product', 'product_name', 'total_quantity', 'order_count']
+
+class TopSellerSerializer(serializers.Serializer):
+    product = serializers.CharField()
+    product_name = serializers.CharField()
+    units = serializers.IntegerField()
 
 class SalesReportSerializer(serializers.Serializer):
     date = serializers.DateField()
-    total_sales = serializers.IntegerField()
\ No newline at end of file
+    total_sales = serializers.IntegerField()
+
+
+class HourlySalesReportSerializer(serializers.Serializer):
+    hour = serializers.DateTimeField()
+    total_sales = serializers.IntegerField()
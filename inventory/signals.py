@@ -1,14 +1,104 @@
-from django.db.models.signals import post_save
-from django.dispatch import receiver
-from django.contrib.postgres.search import SearchVector
-from django.db.models import Value
-from .models import Product
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import Signal, receiver
+import logging
+from .cache import product_cache
+from .frequency import record_frequencies
+from .leaderboard import record_leaderboard_sales
+from .low_stock import low_stock_changed, refresh_low_stock, report_crossings
+from .models import Product, Order, OrderItem
+from .rollups import record_sales
+from .stock import rebalance_stripes
+
+# Sent inside the order's transaction with ``items``, the OrderItem (or
+# ArchivedOrderItem) rows concerned with their ``order`` loaded. Withdrawn
+# orders stop counting as sales: cancelled, or deleted before being cancelled.
+orders_placed = Signal()
+orders_withdrawn = Signal()
+
+logger = logging.getLogger(__name__)
+
+# Product.search_vector is kept current by a database trigger on postgres,
+# see inventory.search and the reindex_products command.
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_cache(sender, instance, **kwargs):
+    product_cache.invalidate(instance.pk)
+
 
 @receiver(post_save, sender=Product)
-def update_search_vector(sender, instance, **kwargs):
+def track_low_stock(sender, instance, update_fields=None, **kwargs):
+    # Product.save() set is_low_stock from the quantity and reorder level it wrote
+    was_low = instance.__dict__.pop('_was_low_stock', None)
+    if was_low is None:
+        # Saved without quantity, only the stored quantity can tell
+        if 'reorder_level' in (update_fields or ()):
+            refresh_low_stock([instance.pk])
+    elif instance.is_low_stock and not was_low:
+        report_crossings([instance.pk], [])
+    elif was_low and not instance.is_low_stock:
+        report_crossings([], [instance.pk])
+
+
+@receiver(low_stock_changed)
+def log_low_stock(sender, entered, exited, **kwargs):
+    for pk in entered:
+        logger.warning(f"Product {pk} fell below its reorder level")
+    for pk in exited:
+        logger.info(f"Product {pk} is back at its reorder level")
+
+
+@receiver(post_save, sender=Product)
+def rebalance_stock_stripes(sender, instance, created, **kwargs):
+    # A striped product whose quantity or stripe count changed redistributes its allotments
+    # in the write's transaction, so stripes never hand out units a lower quantity no longer has.
+    # Unstriping folds the stripes back (only a product loaded while striped can have any).
+    loaded = getattr(instance, '_loaded_stock', None)
+    if loaded == instance.stock_state():
+        return
+    if loaded is None or loaded[1] is None:
+        was_striped = not created and instance.stripes.exists()
+    else:
+        was_striped = bool(loaded[1])
+    if instance.stock_stripes or was_striped:
+        rebalance_stripes([instance.pk])
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def refresh_order_totals(sender, instance, origin=None, **kwargs):
+    # Items removed by deleting their order or product (cascades) leave the
+    # totals as they were when the order was placed
+    if origin is not None and not isinstance(origin, OrderItem) and getattr(origin, 'model', None) is not OrderItem:
+        return
+    Order.objects.filter(pk=instance.order_id).refresh_totals()
+
+
+@receiver(orders_placed)
+def add_sales(sender, items, **kwargs):
+    record_sales(items)
+
+
+@receiver(orders_withdrawn)
+def remove_sales(sender, items, **kwargs):
+    record_sales(items, sign=-1)
+
+
+@receiver(orders_placed)
+def add_order_frequencies(sender, items, **kwargs):
+    record_frequencies(items)
+
+
+@receiver(orders_withdrawn)
+def remove_order_frequencies(sender, items, **kwargs):
+    record_frequencies(items, sign=-1)
+
+
+@receiver(orders_placed)
+def add_leaderboard_sales(sender, items, **kwargs):
+    record_leaderboard_sales(items)
+
 
-    # Concatenate fields and define the output_field explicitly
-    search_vector = SearchVector('title', 'description')
-    
-    # Perform the update on the new news search vector
-    Product.objects.filter(pk=instance.pk).update(search_vector=search_vector)
+@receiver(orders_withdrawn)
+def remove_leaderboard_sales(sender, items, **kwargs):
+    record_leaderboard_sales(items, sign=-1)
@@ -0,0 +1,238 @@
+# stock.py
+import random
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+from rest_framework import serializers
+
+from .cache import product_cache
+from .low_stock import refresh_low_stock
+from .models import OrderItem, Product, ProductStockStripe
+
+# Stock moves in two steps. Placing an order reserves units, which only
+# raises Product.reserved, so they stop being available (quantity - reserved)
+# to other orders. Completing the order takes them out of quantity and
+# reserved together, cancelling it or letting the reservation expire hands
+# them back by lowering reserved. An order whose reservation expired
+# (reservation_lapsed) holds nothing and reserves again when it is completed.
+# Orders placed before reservations existed (reserved_until is null and not
+# lapsed) took their units out of quantity directly.
+#
+# Hot products can be striped (Product.stock_stripes > 0): their
+# reservations go to one of several ProductStockStripe rows instead of the
+# product row, each stripe reserving at most its allotment of the available
+# units. quantity stays the on-hand total on the product row, reserved is the
+# product's own counter plus the stripes', see Product.reserved_total.
+
+
+def per_product(pks_and_quantities):
+    """
+    Case expression mapping each product id to its quantity, so one UPDATE can
+    apply a different amount to every row.
+    """
+    return Case(*[When(pk=pk, then=Value(quantity)) for pk, quantity in pks_and_quantities.items()])
+
+
+def reservation_expiry():
+    """When a reservation made now lapses unless its order is completed."""
+    return timezone.now() + timedelta(seconds=settings.ORDER_RESERVATION_TTL)
+
+
+def reserve_stock(quantities, striped=None):
+    """
+    Reserve ``quantities`` ({product id: units}) for a pending order and
+    return ``{product id: stripe index}`` for the products reserved on a stripe.
+
+    The reservation is one conditional statement on the maintained counter,
+    ``UPDATE ... SET reserved = reserved + n WHERE quantity >= reserved + n``,
+    and the order only succeeds if it touched every product. There is no read
+    before the write and no sum over other orders' reservations, so the row
+    lock is held for the shortest possible time and stock can never be
+    oversold. Orders for several products first lock them in primary key
+    order so concurrent orders cannot deadlock.
+
+    ``striped`` ({product id: stock_stripes}) names the striped products
+    among them, those reserve on a random stripe and never lock the product row.
+    Must run inside a transaction, which the caller rolls back on failure.
+    """
+    striped = {pk: count for pk, count in (striped or {}).items() if count and pk in quantities}
+    plain = {pk: quantity for pk, quantity in quantities.items() if pk not in striped}
+
+    if len(plain) > 1:
+        list(Product.objects.select_for_update().filter(pk__in=plain).order_by('pk').values_list('pk', flat=True))
+
+    if plain:
+        amounts = per_product(plain)
+        updated = Product.objects.filter(pk__in=plain, quantity__gte=F('reserved') + amounts).update(
+            reserved=F('reserved') + amounts,
+            updated_at=timezone.now(),
+        )
+        if updated != len(plain):
+            raise_stock_error(plain)
+
+    stripes = {pk: reserve_on_stripe(pk, quantities[pk], striped[pk]) for pk in sorted(striped)}
+    product_cache.invalidate_many(quantities)
+    return {pk: index for pk, index in stripes.items() if index is not None}
+
+
+def reserve_on_stripe(pk, quantity, count):
+    """
+    Reserve ``quantity`` of a striped product and return the stripe index, or
+    None if the product turned out not to be striped and the reservation went
+    to its own row.
+    """
+    def try_stripe(index):
+        return ProductStockStripe.objects.filter(
+            product_id=pk, index=index, allotment__gte=F('reserved') + quantity,
+        ).update(reserved=F('reserved') + quantity, updated_at=timezone.now())
+
+    # A random stripe nearly always has room, one statement on one stripe row
+    index = random.randrange(count)
+    if try_stripe(index):
+        return index
+
+    # Retired stripes (index >= count) only wind down what they hold
+    candidates = list(
+        ProductStockStripe.objects.filter(product_id=pk, index__lt=count, allotment__gte=F('reserved') + quantity)
+        .values_list('index', flat=True)
+    )
+    random.shuffle(candidates)
+    for index in candidates:
+        if try_stripe(index):
+            return index
+
+    # No single stripe has room: move the unreserved units around and try the roomiest stripe
+    counts = rebalance_stripes([pk])
+    if pk not in counts:
+        reserve_stock({pk: quantity})
+        return None
+    index = ProductStockStripe.objects.filter(product_id=pk, index__lt=counts[pk])\
+        .order_by(F('reserved') - F('allotment')).values_list('index', flat=True).first()
+    if index is not None and try_stripe(index):
+        return index
+    raise_stock_error({pk: quantity})
+
+
+def rebalance_stripes(pks):
+    """
+    Spread the unreserved units of the products ``pks`` evenly over their
+    stripes, creating or retiring stripes to match Product.stock_stripes.
+    Unstriped products fold their stripes' reservations back into their own
+    counter. Returns ``{product id: stock_stripes}`` of the striped products.
+    """
+    striped = {}
+    with transaction.atomic():
+        for product in Product.objects.select_for_update().filter(pk__in=pks).order_by('pk'):
+            stripes = {stripe.index: stripe for stripe in
+                       ProductStockStripe.objects.select_for_update().filter(product=product).order_by('index')}
+            count = product.stock_stripes
+            if not count:
+                if stripes:
+                    unstripe(product, stripes.values())
+                continue
+
+            striped[product.pk] = count
+            new = [ProductStockStripe(product=product, index=index) for index in range(count) if index not in stripes]
+            ProductStockStripe.objects.bulk_create(new)
+            stripes.update({stripe.index: stripe for stripe in new})
+
+            # Retired stripes keep what they reserved until those orders settle
+            retired = [stripe for index, stripe in stripes.items() if index >= count]
+            ProductStockStripe.objects.filter(pk__in=[stripe.pk for stripe in retired if not stripe.reserved]).delete()
+            for stripe in retired:
+                stripe.allotment = stripe.reserved
+            now = timezone.now()
+            for stripe in stripes.values():
+                stripe.updated_at = now
+
+            free = max(product.quantity - product.reserved - sum(stripe.reserved for stripe in stripes.values()), 0)
+            for index in range(count):
+                stripes[index].allotment = stripes[index].reserved + free // count + (1 if index < free % count else 0)
+            ProductStockStripe.objects.bulk_update(
+                [stripe for stripe in stripes.values() if stripe.index < count or stripe.reserved], ['allotment', 'updated_at']
+            )
+    return striped
+
+
+def unstripe(product, stripes):
+    reserved = sum(stripe.reserved for stripe in stripes)
+    Product.objects.filter(pk=product.pk).update(reserved=F('reserved') + reserved, updated_at=timezone.now())
+    OrderItem.objects.filter(product=product, stock_stripe__isnull=False).update(stock_stripe=None)
+    ProductStockStripe.objects.filter(product=product).delete()
+    product_cache.invalidate(product.pk)
+
+
+def per_stripe(stripes_and_quantities):
+    """Case expression mapping each (product id, stripe index) to its quantity."""
+    return Case(*[When(product_id=pk, index=index, then=Value(quantity))
+                  for (pk, index), quantity in stripes_and_quantities.items()])
+
+
+def update_stripes(quantities, **changes):
+    """``update_stock`` for ``quantities`` of {(product id, stripe index): units}."""
+    if not quantities:
+        return
+    amounts = per_stripe(quantities)
+    ProductStockStripe.objects.filter(reduce(or_, (Q(product_id=pk, index=index) for pk, index in quantities)))\
+        .update(**{field: F(field) + sign * amounts for field, sign in changes.items()}, updated_at=timezone.now())
+    product_cache.invalidate_many({pk for pk, index in quantities})
+
+
+def update_stock(quantities, **changes):
+    """
+    Apply ``changes`` ({field: sign}) of ``quantities`` to every product in
+    one UPDATE, e.g. ``quantity=-1, reserved=-1`` ships reserved units.
+    """
+    if not quantities:
+        return
+    amounts = per_product(quantities)
+    Product.objects.filter(pk__in=quantities).update(
+        **{field: F(field) + sign * amounts for field, sign in changes.items()},
+        updated_at=timezone.now(),
+    )
+    if 'quantity' in changes:
+        refresh_low_stock(list(quantities))
+    product_cache.invalidate_many(quantities)
+
+
+def ship_reserved_stock(quantities, striped=None):
+    """
+    Take the reserved units of completed orders out of stock, ``striped``
+    ({(product id, stripe index): units}) are those reserved on stripes.
+    """
+    shipped = dict(quantities)
+    for (pk, index), quantity in (striped or {}).items():
+        shipped[pk] = shipped.get(pk, 0) + quantity
+    # Reservations on the product row leave with the units, stripes shrink by what they held
+    update_stock(quantities, reserved=-1)
+    update_stock(shipped, quantity=-1)
+    update_stripes(striped or {}, allotment=-1, reserved=-1)
+
+
+def release_reserved_stock(quantities, striped=None):
+    """Make the reserved units of cancelled or expired orders available again."""
+    update_stock(quantities, reserved=-1)
+    update_stripes(striped or {}, reserved=-1)
+
+
+def release_stock(quantities):
+    """Put the units of a cancelled order placed before reservations back into stock."""
+    update_stock(quantities, quantity=1)
+
+
+def raise_stock_error(quantities):
+    stock = {pk: (name, quantity - reserved - striped) for pk, name, quantity, reserved, striped in
+             Product.objects.filter(pk__in=quantities).with_stock()
+             .values_list('pk', 'name', 'quantity', 'reserved', 'striped_reserved')}
+    for pk, quantity in quantities.items():
+        if pk not in stock:
+            raise serializers.ValidationError(f"Product with ID {pk} does not exist.")
+        name, available = stock[pk]
+        if available < quantity:
+            raise serializers.ValidationError(f"Insufficient stock for product {name}.")
+    raise serializers.ValidationError("Stock changed while placing the order, please retry.")
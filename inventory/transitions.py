@@ -0,0 +1,130 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from rest_framework import serializers
+
+from .bulk import batched
+from .models import Order, OrderItem, Product
+from .signals import orders_withdrawn
+from .stock import release_reserved_stock, release_stock, reserve_stock, ship_reserved_stock
+
+
+def allowed_sources(target):
+    """Statuses an order may be moved to ``target`` from."""
+    return [source for source, targets in Order.TRANSITIONS.items() if target in targets]
+
+
+def ordered_quantities(pks):
+    """
+    Units ordered over the orders ``pks``, as ``({product id: units},
+    {(product id, stripe index): units})`` for units reserved on the product
+    row and on stock stripes.
+    """
+    if not pks:
+        return {}, {}
+    quantities, striped = {}, {}
+    for product, stripe, total in OrderItem.objects.filter(order__in=pks).order_by()\
+            .values('product', 'stock_stripe').annotate(total=Sum('quantity'))\
+            .values_list('product', 'stock_stripe', 'total'):
+        if stripe is None:
+            quantities[product] = total
+        else:
+            striped[product, stripe] = total
+    return quantities, striped
+
+
+def reserve_again(pk):
+    """
+    Reserve the units of the order ``pk`` whose reservation lapsed once more
+    and return them as ``(quantities, striped)`` like ordered_quantities.
+    Raises ValidationError when the stock no longer covers them.
+    """
+    quantities, striped = ordered_quantities([pk])
+    units = dict(quantities)
+    for (product, index), quantity in striped.items():
+        units[product] = units.get(product, 0) + quantity
+    stripes = reserve_stock(units, dict(Product.objects.filter(pk__in=units).values_list('pk', 'stock_stripes')))
+    return ({product: quantity for product, quantity in units.items() if product not in stripes},
+            {(product, index): units[product] for product, index in stripes.items()})
+
+
+def transition_orders(pks, target, batch_size=None):
+    """
+    Move the orders ``pks`` to the ``target`` status where Order.TRANSITIONS
+    allows it and return ``{'updated': [ids], 'errors': [{id, error}]}``.
+
+    Each batch runs in its own transaction: the orders are locked in primary
+    key order, one UPDATE moves every allowed order, and their stock moves
+    with one aggregated increment per product. Completing ships the reserved
+    units, cancelling releases them, see inventory.stock. Completing an
+    order whose reservation lapsed reserves its units again first and fails
+    that order alone when the stock is gone.
+    """
+    batch_size = batch_size or settings.ORDER_STATUS_BATCH_SIZE
+    sources = allowed_sources(target)
+    result = {'updated': [], 'errors': []}
+
+    for batch in batched(dict.fromkeys(pks), batch_size):
+        with transaction.atomic():
+            current = {
+                pk: (order_status, reserved_until, lapsed) for pk, order_status, reserved_until, lapsed in
+                Order.objects.select_for_update().filter(pk__in=batch).order_by('pk')
+                .values_list('pk', 'status', 'reserved_until', 'reservation_lapsed')
+            }
+            allowed, reserved_again = [], []
+            for pk in batch:
+                if pk not in current:
+                    result['errors'].append({'id': pk, 'error': 'Order not found'})
+                elif current[pk][0] not in sources:
+                    result['errors'].append({'id': pk, 'error': f"Cannot change status from {current[pk][0]} to {target}"})
+                elif target == 'completed' and current[pk][2]:
+                    try:
+                        with transaction.atomic():
+                            reserved_again.append(reserve_again(pk))
+                        allowed.append(pk)
+                    except serializers.ValidationError as exc:
+                        result['errors'].append({'id': pk, 'error': str(exc.detail[0])})
+                else:
+                    allowed.append(pk)
+
+            if not allowed:
+                continue
+            Order.objects.filter(pk__in=allowed).update(status=target, reserved_until=None, reservation_lapsed=False,
+                                                        updated_at=timezone.now())
+
+            reserved = [pk for pk in allowed if current[pk][1] is not None]
+            if target == 'completed':
+                ship_reserved_stock(*ordered_quantities(reserved))
+                for quantities, striped in reserved_again:
+                    ship_reserved_stock(quantities, striped)
+            elif target == 'cancelled':
+                orders_withdrawn.send(sender=Order, items=OrderItem.objects.select_related('order').filter(order__in=allowed))
+                release_reserved_stock(*ordered_quantities(reserved))
+                # Orders placed before reservations already took their units out of quantity,
+                # lapsed orders gave theirs back when the reservation expired
+                release_stock(ordered_quantities([pk for pk in allowed if current[pk][1] is None and not current[pk][2]])[0])
+            result['updated'].extend(allowed)
+    return result
+
+
+def release_expired_reservations(batch_size=None, now=None):
+    """
+    Hand back the reserved units of pending orders whose reservation has
+    lapsed, oldest first, batch by batch along the reserved_until index. The
+    orders stay pending, see transition_orders. Yields the ids released by
+    each batch.
+    """
+    batch_size = batch_size or settings.ORDER_STATUS_BATCH_SIZE
+    now = now or timezone.now()
+    while True:
+        with transaction.atomic():
+            pks = list(
+                Order.objects.select_for_update(skip_locked=True).filter(status='pending', reserved_until__lt=now)
+                .order_by('reserved_until').values_list('pk', flat=True)[:batch_size]
+            )
+            if not pks:
+                return
+            release_reserved_stock(*ordered_quantities(pks))
+            Order.objects.filter(pk__in=pks).update(reserved_until=None, reservation_lapsed=True, updated_at=timezone.now())
+        yield pks
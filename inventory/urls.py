@@ -1,21 +1,29 @@
 # urls.py
 from django.urls import path
 from .views import (InventoryProductList, InventoryProductCreate,
-     InventoryProductDetail,OrderListCreate, OrderDetail, OrderStatusUpdate,
-     LowStockReportView, SalesReportView, ProductSearchView, FrequentOrderedProductView)
+     InventoryProductDetail, InventoryProductBulkUpsert, InventoryProductExport, OrderListCreate, OrderDetail, OrderStatusUpdate, OrderBulkStatusUpdate, QueuedOrderStatus,
+     LowStockReportView, SalesReportView, TopSellersView, ProductSearchView,
+     ProductAutocompleteView, FrequentOrderedProductView, BuyAgainProductsView)
 
 app_name = 'inventory'
 
 urlpatterns = [
     path('products/', InventoryProductList.as_view(), name='product_list'),
     path('products/add/', InventoryProductCreate.as_view(), name='product_add'), #test required to distinguish url not only with slash
+    path('products/bulk/', InventoryProductBulkUpsert.as_view(), name='product_bulk_upsert'),
+    path('products/export/<str:file_format>/', InventoryProductExport.as_view(), name='product_export'),
     path('products/<str:pk>/', InventoryProductDetail.as_view(), name='product_detail'),
     path('orders/', OrderListCreate.as_view(), name='order_list_create'),
+    path('orders/status/', OrderBulkStatusUpdate.as_view(), name='order_bulk_status_update'),
+    path('orders/queue/<str:pk>/', QueuedOrderStatus.as_view(), name='order_queue_status'),
     path('orders/<str:pk>/', OrderDetail.as_view(), name='order_detail'),
     path('orders/<str:pk>/status/', OrderStatusUpdate.as_view(), name='order_status_update'),
     path('report/stock/', LowStockReportView.as_view(), name='low-stock-report'),
+    path('report/sales/', SalesReportView.as_view(), name='sales-report-range'),
     path('report/sales/<str:period>/', SalesReportView.as_view(), name='sales-report'),
+    path('report/top-sellers/<str:window>/', TopSellersView.as_view(), name='top-sellers'),
     path('report/order/frequent', FrequentOrderedProductView.as_view(), name='frequent-ordered-product'),
-    #Search will only functional with postgres database connection
-    path('products/search', ProductSearchView.as_view(), name='products-search')
+    path('report/order/buy-again', BuyAgainProductsView.as_view(), name='buy-again-products'),
+    path('products/search', ProductSearchView.as_view(), name='products-search'),
+    path('products/autocomplete', ProductAutocompleteView.as_view(), name='products-autocomplete'),
 ]
\ No newline at end of file
@@ -1,40 +1,86 @@
 # views.py
 import logging
-from django.contrib.postgres.search import SearchQuery, SearchRank
 from django_filters import rest_framework as filters
 from django.db import transaction
 from rest_framework import status, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from django.conf import settings
 from django.shortcuts import get_object_or_404
-from django.http import Http404
+from django.urls import reverse
+from django.http import Http404, StreamingHttpResponse
+from django.utils import timezone
 from rest_framework.pagination import PageNumberPagination
-from django.db.models import Sum, F
-from datetime import datetime, timedelta
-from .models import Product, Order, OrderItem
+from .pagination import KeysetPagination
+from .cache import product_cache
+from .bulk import upsert_products
+from .export import CONTENT_TYPES, export_products
+from .frequency import frequent_products
+from .leaderboard import LEADERBOARD_WINDOWS, top_sellers
+from .search import autocomplete_products, search_products
+from .conditional import conditional_get, make_etag
+from .idempotency import idempotent
+from .queue import enqueue_order
+from .rollups import SALES_INTERVALS, bucket_starts, sales_totals
+from .signals import orders_withdrawn
+from .transitions import transition_orders
+from django.db.models import F, Max, Count, Subquery
+from django.utils.dateparse import parse_date, parse_datetime
+from datetime import timedelta
+from itertools import islice
+from .models import Product, ProductStockStripe, Order, OrderItem, QueuedOrder, ArchivedOrder
 from users.permissions import IsAdminOrReadOnly
-from .serializers import ProductSerializer, OrderSerializer, LowStockProductSerializer, SalesReportSerializer
-from django.db import transaction
+from .serializers import (ProductSerializer, OrderSerializer, LowStockProductSerializer, SalesReportSerializer,
+                          QueuedOrderRequestSerializer, QueuedOrderSerializer, ArchivedOrderSerializer,
+                          HourlySalesReportSerializer, FrequentProductSerializer, TopSellerSerializer)
 from users.authentication import CustomJWTAuthentication
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+
+def parse_limit(request, default, maximum):
+    """
+        The ``limit`` query parameter, ``default`` when missing and capped at
+        ``maximum``. Raises ValueError unless it is a positive integer.
+    """
+    limit = min(int(request.query_params.get('limit', default)), maximum)
+    if limit < 1:
+        raise ValueError('Invalid limit specified.')
+    return limit
+
+
 class InventoryProductList(APIView):
     permission_classes = [permissions.IsAuthenticated]
     authentication_classes = [CustomJWTAuthentication]
 
     def get(self, request):
         logger.info(f"User {request.user.id} requested product list")
-        products = Product.objects.all()
-        
-        # Apply pagination
-        paginator = PageNumberPagination()
+        products = Product.objects.with_owner().with_stock()
+
+        # Any write bumps MAX(updated_at) and any delete changes the count,
+        # reservations on stock stripes only bump the stripes' updated_at
+        last_stripe_write = ProductStockStripe.objects.order_by('-updated_at').values('updated_at')[:1]
+        version = Product.objects.aggregate(last_modified=Max('updated_at'), count=Count('id'),
+                                            stripes_modified=Max(Subquery(last_stripe_write)))
+        last_modified = max(filter(None, [version['last_modified'], version['stripes_modified']]), default=None)
+        etag = make_etag('products', version['count'], last_modified,
+                         request.get_full_path(), request.accepted_renderer.format)
+        return conditional_get(request, etag, last_modified, lambda: self.list(request, products))
+
+    def list(self, request, products):
+        # Apply pagination, cursor mode skips the COUNT(*) and OFFSET scan of page numbers
+        paginator = self.get_paginator(request)
         paginated_products = paginator.paginate_queryset(products, request)
         
         serializer = ProductSerializer(paginated_products, many=True)
         return paginator.get_paginated_response(serializer.data)
 
+    def get_paginator(self, request):
+        if request.query_params.get('pagination') == 'cursor' or KeysetPagination.cursor_query_param in request.query_params:
+            return KeysetPagination()
+        return PageNumberPagination()
+
 class InventoryProductCreate(APIView):
     permission_classes = [permissions.IsAuthenticated, IsAdminOrReadOnly]
     authentication_classes = [CustomJWTAuthentication]
@@ -49,18 +95,65 @@ class InventoryProductCreate(APIView):
         logger.warning(f"User {request.user.id} failed to create product: {serializer.errors}")
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+class InventoryProductBulkUpsert(APIView):
+    """
+        Create or update a list of products keyed on their unique name
+    """
+    permission_classes = [permissions.IsAuthenticated, IsAdminOrReadOnly]
+    authentication_classes = [CustomJWTAuthentication]
+
+    def post(self, request):
+        rows = request.data
+        if not isinstance(rows, list) or not rows:
+            return Response({'error': 'Provide a non-empty list of products.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > settings.PRODUCT_BULK_MAX_ROWS:
+            return Response({'error': f'At most {settings.PRODUCT_BULK_MAX_ROWS} products per request.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        logger.info(f"User {request.user.id} is attempting to upsert {len(rows)} products")
+        summary = {'created': [], 'updated': [], 'errors': []}
+        for result in upsert_products(enumerate(rows), owner=request.user):
+            for key in summary:
+                summary[key].extend(result[key])
+
+        logger.info(f"User {request.user.id} upserted products: {len(summary['created'])} created, "
+                    f"{len(summary['updated'])} updated, {len(summary['errors'])} failed")
+        return Response(summary)
+
+class InventoryProductExport(APIView):
+    """
+        Stream the whole catalog as CSV or NDJSON without loading it into memory
+    """
+    permission_classes = [permissions.IsAuthenticated, IsAdminOrReadOnly]
+    authentication_classes = [CustomJWTAuthentication]
+
+    def get(self, request, file_format):
+        if file_format not in CONTENT_TYPES:
+            return Response({'error': 'Invalid export format specified.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        logger.info(f"User {request.user.id} requested a {file_format} product export")
+        response = StreamingHttpResponse(export_products(file_format), content_type=CONTENT_TYPES[file_format])
+        filename = f"products-{timezone.localdate():%Y%m%d}.{file_format}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
 class InventoryProductDetail(APIView):
     permission_classes = [permissions.IsAuthenticated, IsAdminOrReadOnly]
     authentication_classes = [CustomJWTAuthentication]
 
     def get_object(self, pk):
-        return get_object_or_404(Product, pk=pk)
+        return get_object_or_404(Product.objects.with_owner().with_stock(), pk=pk)
 
     def get(self, request, pk):
         logger.info(f"User {request.user.id} requested details for product {pk}")
-        product = self.get_object(pk)
-        serializer = ProductSerializer(product)
-        return Response(serializer.data)
+        data, hit = product_cache.get_or_load(pk, self.serialize_product)
+        etag = make_etag('product', *sorted(data.items()), request.accepted_renderer.format)
+        response = conditional_get(request, etag, parse_datetime(data['updated_at']), lambda: Response(data))
+        response['X-Cache'] = 'HIT' if hit else 'MISS'
+        return response
+
+    def serialize_product(self, pk):
+        return dict(ProductSerializer(self.get_object(pk)).data)
 
     def put(self, request, pk):
         logger.info(f"User {request.user.id} is attempting to update product {pk}")
@@ -91,6 +184,11 @@ class OrderFilter(filters.FilterSet):
         fields = ['status', 'created_at']
 
 
+class ArchivedOrderFilter(OrderFilter):
+    class Meta(OrderFilter.Meta):
+        model = ArchivedOrder
+
+
 
 class OrderListCreate(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -98,18 +196,46 @@ class OrderListCreate(APIView):
 
     def get(self, request):
         logger.info(f"User {request.user.id} requested their order list")
-        orders = Order.objects.filter(owner=request.user)
+        orders = Order.objects.with_details().filter(owner=request.user)
+        archived = ArchivedOrder.objects.select_related('owner').prefetch_related('items').filter(owner=request.user)
         
         filterset = OrderFilter(request.GET, queryset=orders)
+        archived_filterset = ArchivedOrderFilter(request.GET, queryset=archived)
         if not filterset.is_valid():
             return Response(filterset.errors, status=status.HTTP_400_BAD_REQUEST)
         
-        orders = filterset.qs
-        serializer = OrderSerializer(orders, many=True)
-        return Response(serializer.data)
+        # The history covers live and archived orders alike
+        orders, archived = filterset.qs, archived_filterset.qs
+        # Validators cover the rows of the requested page only, the same range scans as the page itself
+        paginator = KeysetPagination()
+        page = paginator.paginate_querysets([queryset.values('id', 'created_at', 'updated_at')
+                                             for queryset in (orders, archived)], request)
+        last_modified = max((row['updated_at'] for row in page), default=None)
+        etag = make_etag('orders', request.user.id, *[(row['id'], row['updated_at']) for row in page],
+                         paginator.has_next, paginator.has_previous,
+                         request.get_full_path(), request.accepted_renderer.format)
+        return conditional_get(request, etag, last_modified, lambda: self.list(request, orders, archived))
+
+    def list(self, request, orders, archived):
+        # Keyset pages on (created_at, id) cost the same however many orders the user has
+        paginator = KeysetPagination()
+        paginated_orders = paginator.paginate_querysets([orders, archived], request)
+
+        data = [
+            (ArchivedOrderSerializer if isinstance(order, ArchivedOrder) else OrderSerializer)(order).data
+            for order in paginated_orders
+        ]
+        return paginator.get_paginated_response(data)
 
     def post(self, request):
         logger.info(f"User {request.user.id} is attempting to create a new order")
+        # Retries sent with the same Idempotency-Key replay the first response
+        return idempotent(request, lambda: self.create(request))
+
+    def create(self, request):
+        if self.prefers_async(request):
+            return self.enqueue(request)
+
         serializer = OrderSerializer(data=request.data)
         if serializer.is_valid():
             
@@ -120,6 +246,39 @@ class OrderListCreate(APIView):
         logger.warning(f"User {request.user.id} failed to create order: {serializer.errors}")
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    def prefers_async(self, request):
+        preferences = request.headers.get('Prefer', '')
+        return 'respond-async' in [preference.strip() for preference in preferences.split(',')]
+
+    def enqueue(self, request):
+        serializer = QueuedOrderRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            logger.warning(f"User {request.user.id} failed to queue order: {serializer.errors}")
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        entry = enqueue_order(request.user, serializer.to_payload())
+        logger.info(f"User {request.user.id} queued order {entry.id}")
+
+        status_url = request.build_absolute_uri(reverse('inventory:order_queue_status', args=[entry.id]))
+        response = Response({'id': entry.id, 'status': entry.status, 'status_url': status_url},
+                            status=status.HTTP_202_ACCEPTED)
+        response['Location'] = status_url
+        response['Preference-Applied'] = 'respond-async'
+        return response
+
+class QueuedOrderStatus(APIView):
+    """
+        Progress of an order queued with Prefer: respond-async, `order` is set once it is placed
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    authentication_classes = [CustomJWTAuthentication]
+
+    def get(self, request, pk):
+        entry = QueuedOrder.objects.filter(pk=pk, owner=request.user).first()
+        if entry is None:
+            return Response({'error': 'Queued order not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(QueuedOrderSerializer(entry).data)
+
 class OrderDetail(APIView):
     """
         View to get order detail by owner
@@ -129,24 +288,51 @@ class OrderDetail(APIView):
 
     def get_object(self, pk):
         try:
-            return Order.objects.get(pk=pk, owner=self.request.user)
+            return Order.objects.with_details().get(pk=pk, owner=self.request.user)
         except Order.DoesNotExist:
             logger.error(f"User {self.request.user.id} attempted to access non-existent order {pk}")
             return None
 
+    def get_archived_object(self, pk):
+        return ArchivedOrder.objects.select_related('owner').prefetch_related('items')\
+            .filter(pk=pk, owner=self.request.user).first()
+
     def get(self, request, pk):
         logger.info(f"User {request.user.id} requested details for order {pk}")
-        order = self.get_object(pk)
-        serializer = OrderSerializer(order)
-        return Response(serializer.data)
+        last_modified = Order.objects.filter(pk=pk, owner=request.user).values_list('updated_at', flat=True).first()
+        serialize = lambda: OrderSerializer(self.get_object(pk)).data
+        if last_modified is None:
+            # Old completed and cancelled orders live in the archive, with the same id and timestamps
+            last_modified = ArchivedOrder.objects.filter(pk=pk, owner=request.user)\
+                .values_list('updated_at', flat=True).first()
+            serialize = lambda: ArchivedOrderSerializer(self.get_archived_object(pk)).data
+        if last_modified is None:
+            return Response(OrderSerializer(self.get_object(pk)).data)
+
+        etag = make_etag('order', pk, last_modified, request.accepted_renderer.format)
+        return conditional_get(request, etag, last_modified, lambda: Response(serialize()))
 
     def delete(self, request, pk):
         logger.info(f"User {request.user.id} is attempting to delete order {pk}")
         order = self.get_object(pk)
         if order:
-            order.delete()
+            with transaction.atomic():
+                # A pending order gives its reservation back before it goes
+                if order.reserved_until is not None:
+                    transition_orders([order.pk], 'cancelled')
+                elif order.status != 'cancelled':
+                    orders_withdrawn.send(sender=Order, items=order.items.all())
+                order.delete()
             logger.info(f"User {request.user.id} successfully deleted order {pk}")
             return Response(status=status.HTTP_204_NO_CONTENT)
+        archived = self.get_archived_object(pk)
+        if archived:
+            with transaction.atomic():
+                if archived.status != 'cancelled':
+                    orders_withdrawn.send(sender=ArchivedOrder, items=archived.items.all())
+                archived.delete()
+            logger.info(f"User {request.user.id} successfully deleted archived order {pk}")
+            return Response(status=status.HTTP_204_NO_CONTENT)
         logger.warning(f"User {request.user.id} attempted to delete non-existent order {pk}")
         return Response({'error': 'Order not found'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -169,9 +355,12 @@ class OrderStatusUpdate(APIView):
             if not order_status:
                 return Response({'error': 'Invalid order status'}, status=status.HTTP_400_BAD_REQUEST)
 
-            updated_order = self.update_order_status(order, order_status)
-            if not updated_order:
-                return Response({'error': 'Failed to update status'}, status=status.HTTP_400_BAD_REQUEST)
+            # Same state machine and restocking as the bulk endpoint
+            result = transition_orders([order.pk], order_status)
+            if result['errors']:
+                logger.warning(f"User {request.user.id} failed to update status of order {pk}: {result['errors'][0]['error']}")
+                return Response({'error': result['errors'][0]['error']}, status=status.HTTP_400_BAD_REQUEST)
+            updated_order = self.get_order_object(pk)
 
             logger.info(f"User {request.user.id} successfully updated status of order {pk} to {order_status}")
             serializer = OrderSerializer(updated_order)
@@ -179,7 +368,7 @@ class OrderStatusUpdate(APIView):
 
     def get_order_object(self, pk):
         try:
-            return Order.objects.get(pk=pk)
+            return Order.objects.with_details().get(pk=pk)
         except Order.DoesNotExist:
             logger.error(f"User {self.request.user.id} attempted to update non-existent order {pk}")
             return None
@@ -191,14 +380,31 @@ class OrderStatusUpdate(APIView):
             return None
         return status
 
-    def update_order_status(self, order, status):
-        order.status = status
-        try:
-            order.save()
-            return order
-        except Exception as e:
-            logger.error(f"Failed to update status for order {order.id}: {str(e)}")
-            return None
+
+class OrderBulkStatusUpdate(APIView):
+    """
+        Move many orders to one status by Admin, e.g. closing the day's orders
+    """
+    permission_classes = [permissions.IsAuthenticated, IsAdminOrReadOnly]
+    authentication_classes = [CustomJWTAuthentication]
+
+    def post(self, request):
+        ids = request.data.get('ids')
+        order_status = request.data.get('status')
+        if not isinstance(ids, list) or not ids or not all(isinstance(pk, str) for pk in ids):
+            return Response({'error': 'Provide a non-empty list of order ids.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(ids) > settings.ORDER_STATUS_MAX_ORDERS:
+            return Response({'error': f'At most {settings.ORDER_STATUS_MAX_ORDERS} orders per request.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if order_status not in [choice[0] for choice in Order.STATUS_CHOICES]:
+            logger.warning(f"User {request.user.id} provided invalid status {order_status}")
+            return Response({'error': 'Invalid order status'}, status=status.HTTP_400_BAD_REQUEST)
+
+        logger.info(f"User {request.user.id} is attempting to move {len(ids)} orders to {order_status}")
+        result = transition_orders(ids, order_status)
+        logger.info(f"User {request.user.id} moved {len(result['updated'])} orders to {order_status}, "
+                    f"{len(result['errors'])} failed")
+        return Response(result)
 
 
 class LowStockReportView(APIView):
@@ -208,43 +414,90 @@ class LowStockReportView(APIView):
     permission_classes = [permissions.IsAuthenticated, IsAdminOrReadOnly]
     authentication_classes = [CustomJWTAuthentication]
     def get(self, request):
-        low_stock_products = Product.objects.filter(quantity__lt=10)
-        serializer = LowStockProductSerializer(low_stock_products, many=True)
-        return Response(serializer.data)
+        # Largest shortfall first, read off the partial index over the maintained is_low_stock flag
+        low_stock_products = Product.objects.filter(is_low_stock=True)\
+            .annotate(shortfall=F('reorder_level') - F('quantity'))\
+            .order_by('-shortfall', 'id')\
+            .only(*[field for field in LowStockProductSerializer.Meta.fields if field != 'shortfall'])
+
+        paginator = PageNumberPagination()
+        page = paginator.paginate_queryset(low_stock_products, request)
+        serializer = LowStockProductSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
 class SalesReportView(APIView):
     """
         Should be accessed by an admin but GET is part of SAFE METHODS for all
+
+        report/sales/?from=&to=&interval= returns every hour, day, week or
+        month bucket of a local date range, empty ones as 0.
+        report/sales/<period>/ keeps its trailing day/week/month window of
+        daily rows, listing only days with sales.
     """
     permission_classes = [permissions.IsAuthenticated, IsAdminOrReadOnly]
     authentication_classes = [CustomJWTAuthentication]
-    def get(self, request, period='day'):
-        now = datetime.now()
-
-        start_project = None
-
-        #match case would have been better but its only supported by python3.8+
-
-        if period == 'day':
-            start_date = now - timedelta(days=1)
-        elif period ==  'week':
-            start_date = now - timedelta(weeks=1)
-        elif period == 'month':
-            start_date = now - timedelta(days=30)
+    windows = {'day': timedelta(days=1), 'week': timedelta(weeks=1), 'month': timedelta(days=30)}
+
+    def get(self, request, period=None):
+        today = timezone.localdate()
+        if period is None:
+            try:
+                start, end, interval = self.get_range(request.query_params, today)
+            except ValueError as exc:
+                return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        elif period in self.windows:
+            start, end, interval = today - self.windows[period], today, 'day'
         else:
             return Response({'error': 'Invalid period specified.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        sales_data = OrderItem.objects.filter(
-            order__created_at__gte=start_date
-        ).values(
-            date=F('order__created_at__date')
-        ).annotate(
-            total_sales=Sum(F('quantity') * F('price'))
-        )
+        buckets = list(islice(bucket_starts(start, end, interval), settings.SALES_REPORT_MAX_BUCKETS + 1))
+        if len(buckets) > settings.SALES_REPORT_MAX_BUCKETS:
+            return Response({'error': f'At most {settings.SALES_REPORT_MAX_BUCKETS} {interval} buckets per report.'},
+                            status=status.HTTP_400_BAD_REQUEST)
 
-        serializer = SalesReportSerializer(sales_data, many=True)
+        totals = sales_totals(start, end, interval)
+        if period is not None:
+            buckets = [bucket for bucket in buckets if bucket in totals]
+
+        key, serializer_class = ('hour', HourlySalesReportSerializer) if interval == 'hour' else ('date', SalesReportSerializer)
+        serializer = serializer_class([{key: bucket, 'total_sales': totals.get(bucket, 0)} for bucket in buckets], many=True)
         return Response(serializer.data)
 
+    def get_range(self, params, today):
+        interval = params.get('interval', 'day')
+        if interval not in SALES_INTERVALS:
+            raise ValueError(f"Invalid interval, use one of {', '.join(SALES_INTERVALS)}.")
+        try:
+            end = parse_date(params['to']) if 'to' in params else today
+            start = parse_date(params['from']) if 'from' in params else end - self.windows['month']
+        except ValueError:
+            start = end = None
+        if start is None or end is None:
+            raise ValueError('Invalid date, use YYYY-MM-DD.')
+        if start > end:
+            raise ValueError('from must not be after to.')
+        return start, end, interval
+
+
+class TopSellersView(APIView):
+    """
+        Best selling products of the last hour, day or week by units sold,
+        read from the leaderboard kept as orders are placed and cancelled
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    authentication_classes = [CustomJWTAuthentication]
+
+    def get(self, request, window):
+        if window not in LEADERBOARD_WINDOWS:
+            return Response({'error': f"Invalid window, use one of {', '.join(LEADERBOARD_WINDOWS)}."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = parse_limit(request, settings.LEADERBOARD_LIMIT, settings.LEADERBOARD_MAX_LIMIT)
+        except ValueError:
+            return Response({"error": "Invalid limit specified."}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(TopSellerSerializer(top_sellers(window, limit), many=True).data)
+
 
 
 class ProductSearchView(APIView):
@@ -252,7 +505,8 @@ class ProductSearchView(APIView):
     authentication_classes = [CustomJWTAuthentication]
 
     """
-        This will only functional with postgres database connection
+        Uses the search backend for the database in use: postgres full text
+        search or an SQLite FTS5 index
     """
 
     def get(self, request):
@@ -261,46 +515,62 @@ class ProductSearchView(APIView):
             logger.warning("Search query not provided.")
             return Response({"error": "Please provide a search query!"}, status=status.HTTP_400_BAD_REQUEST)
 
-        search_query = SearchQuery(query)
-        search_rank = SearchRank('search_vector', search_query)
-
-        results = Product.objects.filter(search_vector=search_query)\
-            .annotate(rank=search_rank)\
-            .order_by('-rank', '-created_at')
+        results = search_products(query)
 
         serializer = ProductSerializer(results, many=True)
         logger.info(f"Search results returned for query: {query}.")
         return Response(serializer.data)
 
-    
-from django.db.models import Sum
+
+class ProductAutocompleteView(APIView):
+    """
+        Top product id/name pairs whose name starts with the typed prefix,
+        served from a prefix index so it can be called on every keystroke
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    authentication_classes = [CustomJWTAuthentication]
+
+    def get(self, request):
+        prefix = request.query_params.get('q', '').strip()
+        if not prefix:
+            return Response({"error": "Please provide a search prefix!"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            limit = parse_limit(request, settings.PRODUCT_AUTOCOMPLETE_LIMIT, settings.PRODUCT_AUTOCOMPLETE_MAX_LIMIT)
+        except ValueError:
+            return Response({"error": "Invalid limit specified."}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(autocomplete_products(prefix, limit))
+
+
 
 class FrequentOrderedProductView(APIView):
+    """
+        The product the user ordered the most units of, read from per-user
+        counters kept as orders are placed and cancelled
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    authentication_classes = [CustomJWTAuthentication]
+
+    def get(self, request, *args, **kwargs):
+        frequencies = frequent_products(request.user, 1)
+        if not frequencies:
+            return Response({"detail": "No frequent ordered product found."}, status=404)
+        return Response(FrequentProductSerializer(frequencies[0]).data)
+
 
+class BuyAgainProductsView(APIView):
+    """
+        The products the user ordered the most units of, most first, from
+        the same counters as FrequentOrderedProductView
+    """
     permission_classes = [permissions.IsAuthenticated]
+    authentication_classes = [CustomJWTAuthentication]
 
     def get(self, request, *args, **kwargs):
-        user = request.user
-        #returns the first instance of most frequent 9by quantity summation) ordered item product in the past
-        with transaction.atomic():
-            most_frequent_product = (
-                OrderItem.objects
-                    .filter(order__owner=user)
-                    .values('product')
-                    .annotate(total_quantity=Sum('quantity'))
-                    .order_by('total_quantity') #highest quantity down to least
-                    .first()
-            ) 
-            if most_frequent_product:
-                product = Product.objects.get(id=most_frequent_product['product'])
-                serializer = ProductSerializer(product)
-                return Response(
-                    {
-                        "product_name": serializer.data.get('name'),
-                        "total_quantity": serializer.data.get('quantity')
-                    }
-                )
-            else:
-                return Response({"detail": "No frequent ordered product found."}, status=404)
-
-        
\ No newline at end of file
+        try:
+            limit = parse_limit(request, settings.FREQUENT_PRODUCTS_LIMIT, settings.FREQUENT_PRODUCTS_MAX_LIMIT)
+        except ValueError:
+            return Response({"error": "Invalid limit specified."}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(FrequentProductSerializer(frequent_products(request.user, limit), many=True).data)
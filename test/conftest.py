@@ -0,0 +1,68 @@
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+from users.models import User
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+@pytest.fixture
+def admin_user(db):
+    user = User.objects.create_user(email='admin@gmail.com', username='admin', password='admin123', is_staff=True)
+    user.metadata = {'is_admin': True}
+    user.save()
+    return user
+
+@pytest.fixture
+def regular_user(db):
+    user = User.objects.create_user(email='user@test.com', username='user', password='user123')
+    user.metadata = {'is_admin': False}
+    user.save()
+    return user
+
+@pytest.fixture
+def get_token(api_client):
+    def _get_token(user, password):
+        response = api_client.post('/api/users/login/', {'email': user.email, 'password': password}, format='json')
+        assert response.status_code == status.HTTP_200_OK, f"Login failed: {response.data}"
+        return response.data['access']
+    return _get_token
+
+# Each authenticated client is its own APIClient, so a test can act as both users
+@pytest.fixture
+def admin_client(admin_user, get_token):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION='Bearer ' + get_token(admin_user, 'admin123'))
+    return client
+
+@pytest.fixture
+def user_client(regular_user, get_token):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION='Bearer ' + get_token(regular_user, 'user123'))
+    return client
+
+@pytest.fixture
+def query_budget():
+    """
+    Call ``request`` once after ``seed(n)`` for every ``n`` in ``rows`` and fail
+    when the query count grows with the number of rows or exceeds ``budget``.
+    """
+    def _query_budget(request, seed, budget, rows=(1, 10)):
+        counts = []
+        for count in rows:
+            seed(count)
+            # Every measurement starts cold, cached paths have their own tests
+            cache.clear()
+            with CaptureQueriesContext(connection) as context:
+                response = request()
+            assert response.status_code < 400, response.data
+            counts.append(len(context))
+        assert len(set(counts)) == 1, f"Query count grows with rows: {dict(zip(rows, counts))}"
+        assert counts[0] <= budget, f"{counts[0]} queries exceed the budget of {budget}"
+        return counts[0]
+    return _query_budget
@@ -0,0 +1,112 @@
+import pytest
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework import status
+from inventory.archive import archive_orders
+from inventory.transitions import transition_orders
+from inventory.models import Product, Order, OrderItem, ArchivedOrder, ArchivedOrderItem, QueuedOrder
+
+
+@pytest.fixture
+def product(admin_user):
+    return Product.objects.create(owner=admin_user, name='Archive Product', description='Tablets', quantity=100, price=5)
+
+
+def make_order(owner, product, status='completed', days_ago=100, quantity=2):
+    order = Order.objects.create(owner=owner, status=status, total_price=quantity * product.price, item_count=quantity)
+    OrderItem.objects.create(order=order, product=product, quantity=quantity, price=product.price)
+    Order.objects.filter(pk=order.pk).update(created_at=timezone.now() - timedelta(days=days_ago))
+    order.refresh_from_db()
+    return order
+
+
+@pytest.mark.django_db
+def test_archive_moves_only_old_final_orders(regular_user, product):
+    completed = make_order(regular_user, product)
+    cancelled = make_order(regular_user, product, status='cancelled')
+    pending = make_order(regular_user, product, status='pending')
+    recent = make_order(regular_user, product, days_ago=1)
+
+    stdout = StringIO()
+    call_command('archive_orders', '--older-than', '30', '--pause', '0', stdout=stdout)
+
+    assert 'Archived 2 orders' in stdout.getvalue()
+    assert set(ArchivedOrder.objects.values_list('pk', flat=True)) == {completed.pk, cancelled.pk}
+    assert set(Order.objects.values_list('pk', flat=True)) == {pending.pk, recent.pk}
+    assert ArchivedOrderItem.objects.count() == 2 and OrderItem.objects.count() == 2
+    archived = ArchivedOrder.objects.get(pk=completed.pk)
+    assert (archived.created_at, archived.updated_at, archived.total_price) == \
+        (completed.created_at, completed.updated_at, completed.total_price)
+
+
+@pytest.mark.django_db
+def test_archive_runs_in_resumable_batches(regular_user, product):
+    orders = [make_order(regular_user, product, days_ago=100 - i) for i in range(5)]
+    cutoff = timezone.now() - timedelta(days=30)
+
+    # Stopping after the first batch leaves the rest to the next run
+    assert next(archive_orders(cutoff, batch_size=2, pause=0)) == 2
+    assert set(ArchivedOrder.objects.values_list('pk', flat=True)) == {orders[0].pk, orders[1].pk}
+
+    assert list(archive_orders(cutoff, batch_size=2, pause=0)) == [2, 1]
+    assert not Order.objects.exists()
+    assert ArchivedOrder.objects.count() == 5
+
+
+@pytest.mark.django_db
+def test_archived_orders_stay_visible(user_client, regular_user, product):
+    archived = make_order(regular_user, product, days_ago=100)
+    live = make_order(regular_user, product, status='pending', days_ago=50)
+    oldest = make_order(regular_user, product, days_ago=200)
+    before = user_client.get(f'/api/inventory/orders/{archived.pk}/')
+    list(archive_orders(timezone.now() - timedelta(days=30), pause=0))
+
+    detail = user_client.get(f'/api/inventory/orders/{archived.pk}/')
+    assert detail.status_code == status.HTTP_200_OK
+    assert detail.data == before.data
+    assert detail['ETag'] == before['ETag']
+
+    ids, url = [], '/api/inventory/orders/?page_size=1'
+    while url:
+        page = user_client.get(url).data
+        ids += [order['id'] for order in page['results']]
+        url = page['next']
+    assert ids == [live.pk, archived.pk, oldest.pk]
+
+    assert user_client.get('/api/inventory/orders/?status=completed').data['results'][0]['id'] == archived.pk
+
+
+@pytest.mark.django_db
+def test_sales_stay_correct_after_archiving(admin_client, product):
+    for quantity in (3, 4):
+        order = admin_client.post('/api/inventory/orders/', {'items': [{'product': product.id, 'quantity': quantity}]},
+                                  format='json').data['id']
+        transition_orders([order], 'completed')
+    list(archive_orders(timezone.now(), pause=0))
+    assert ArchivedOrder.objects.count() == 2
+
+    response = admin_client.get('/api/inventory/report/sales/day/')
+    assert [row['total_sales'] for row in response.data] == [35]
+    call_command('rebuild_sales_rollups', '--verify-only', stdout=StringIO())
+
+
+@pytest.mark.django_db
+def test_delete_archived_order(user_client, regular_user, product):
+    order = make_order(regular_user, product)
+    list(archive_orders(timezone.now(), pause=0))
+
+    assert user_client.delete(f'/api/inventory/orders/{order.pk}/').status_code == status.HTTP_204_NO_CONTENT
+    assert not ArchivedOrder.objects.exists() and not ArchivedOrderItem.objects.exists()
+
+
+@pytest.mark.django_db
+def test_queued_order_keeps_its_archived_order(user_client, regular_user, product):
+    order = make_order(regular_user, product)
+    entry = QueuedOrder.objects.create(owner=regular_user, status='completed', payload={'items': []}, order=order)
+    list(archive_orders(timezone.now(), pause=0))
+
+    response = user_client.get(f'/api/inventory/orders/queue/{entry.pk}/')
+    assert response.data['order'] == order.pk
+    assert user_client.get(f'/api/inventory/orders/{response.data["order"]}/').status_code == status.HTTP_200_OK
@@ -0,0 +1,66 @@
+import pytest
+from rest_framework import status
+from inventory.models import Product
+
+
+@pytest.mark.django_db
+def test_bulk_upsert_creates_and_updates(admin_client, admin_user):
+    existing = Product.objects.create(owner=admin_user, name='Vitamin C', description='Keep me', quantity=1, price=50)
+
+    response = admin_client.post('/api/inventory/products/bulk/', [
+        {'name': 'Vitamin C', 'quantity': 80, 'price': 55},
+        {'name': 'Zinc', 'description': 'Tablets', 'quantity': 20, 'price': 70},
+    ], format='json')
+
+    assert response.status_code == status.HTTP_200_OK
+    assert [row['id'] for row in response.data['updated']] == [existing.id]
+    assert [row['name'] for row in response.data['created']] == ['Zinc']
+    assert response.data['errors'] == []
+
+    existing.refresh_from_db()
+    assert (existing.quantity, existing.price, existing.description) == (80, 55, 'Keep me')
+    zinc = Product.objects.get(name='Zinc')
+    assert zinc.owner == admin_user
+    assert zinc.id == response.data['created'][0]['id']
+
+
+@pytest.mark.django_db
+def test_bulk_upsert_reports_row_errors_without_aborting(admin_client):
+    response = admin_client.post('/api/inventory/products/bulk/', [
+        {'name': 'Folic Acid', 'quantity': 10, 'price': 30},
+        {'quantity': 5, 'price': 10},
+        {'name': 'Iron', 'quantity': -1, 'price': 10},
+        {'name': 'Folic Acid', 'quantity': 11, 'price': 30},
+    ], format='json')
+
+    assert response.status_code == status.HTTP_200_OK
+    assert [row['index'] for row in response.data['errors']] == [1, 2, 3]
+    assert 'name' in response.data['errors'][0]['errors']
+    assert 'quantity' in response.data['errors'][1]['errors']
+    assert Product.objects.get(name='Folic Acid').quantity == 10
+
+
+@pytest.mark.django_db
+def test_bulk_upsert_statement_count_is_per_batch(admin_client, settings, django_assert_max_num_queries):
+    settings.PRODUCT_BULK_BATCH_SIZE = 50
+    rows = [{'name': f'SKU {i}', 'description': 'Generic', 'quantity': i, 'price': 10} for i in range(200)]
+
+    # auth and admin check, then per batch: savepoint, existing lookup, upsert, low-stock check, release,
+    # and flagging the first batch's products (quantity 0 to 9) low on stock
+    with django_assert_max_num_queries(3 + 4 * 5 + 1):
+        response = admin_client.post('/api/inventory/products/bulk/', rows, format='json')
+
+    assert len(response.data['created']) == 200
+    assert Product.objects.count() == 200
+
+
+@pytest.mark.django_db
+def test_bulk_upsert_requires_admin(user_client):
+    response = user_client.post('/api/inventory/products/bulk/', [{'name': 'Zinc', 'quantity': 1, 'price': 1}], format='json')
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+
+@pytest.mark.django_db
+def test_bulk_upsert_rejects_non_list(admin_client):
+    response = admin_client.post('/api/inventory/products/bulk/', {'name': 'Zinc'}, format='json')
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,92 @@
+import pytest
+from io import StringIO
+from django.core.management import call_command
+from django.core.cache import cache
+from rest_framework import status
+from inventory.cache import product_cache
+from inventory.models import Product
+
+
+@pytest.fixture(autouse=True)
+def clear_cache(settings):
+    settings.PRODUCT_CACHE_ENABLED = True
+    cache.clear()
+
+@pytest.fixture
+def product(admin_user):
+    return Product.objects.create(owner=admin_user, name='Amoxicillin', description='Capsules', quantity=40, price=250)
+
+
+@pytest.mark.django_db
+def test_product_detail_is_read_through(admin_client, product, django_assert_num_queries):
+    first = admin_client.get(f'/api/inventory/products/{product.pk}/')
+    assert first.status_code == status.HTTP_200_OK
+    assert first['X-Cache'] == 'MISS'
+
+    # Only the authentication queries remain on a hit
+    with django_assert_num_queries(2):
+        second = admin_client.get(f'/api/inventory/products/{product.pk}/')
+    assert second['X-Cache'] == 'HIT'
+    assert second.data == first.data
+    assert product_cache.stats()['hits'] == 1
+    assert product_cache.stats()['misses'] == 1
+
+
+@pytest.mark.django_db
+def test_product_save_invalidates_cache(admin_client, product):
+    admin_client.get(f'/api/inventory/products/{product.pk}/')
+
+    product.quantity = 12
+    product.save()
+
+    response = admin_client.get(f'/api/inventory/products/{product.pk}/')
+    assert response['X-Cache'] == 'MISS'
+    assert response.data['quantity'] == 12
+
+
+@pytest.mark.django_db
+def test_product_update_through_api_invalidates_cache(admin_client, product):
+    admin_client.get(f'/api/inventory/products/{product.pk}/')
+    admin_client.put(f'/api/inventory/products/{product.pk}/', {'price': 300}, format='json')
+
+    response = admin_client.get(f'/api/inventory/products/{product.pk}/')
+    assert response.data['price'] == 300
+
+
+@pytest.mark.django_db
+def test_product_delete_invalidates_cache(admin_client, product):
+    admin_client.get(f'/api/inventory/products/{product.pk}/')
+    product.delete()
+
+    response = admin_client.get(f'/api/inventory/products/{product.pk}/')
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_missing_product_is_not_cached(admin_client):
+    response = admin_client.get('/api/inventory/products/missing/')
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert product_cache.stats()['misses'] == 1
+
+
+@pytest.mark.django_db
+def test_stats_are_reported_by_command(admin_client, product):
+    for _ in range(3):
+        admin_client.get(f'/api/inventory/products/{product.pk}/')
+
+    stdout = StringIO()
+    call_command('product_cache_stats', '--reset', stdout=stdout)
+    assert 'hits 2, misses 1' in stdout.getvalue() and 'hit ratio 66.7%' in stdout.getvalue()
+    assert product_cache.stats()['hits'] == 0
+
+
+@pytest.mark.django_db
+def test_disabled_cache_reads_the_database(admin_client, product, settings):
+    settings.PRODUCT_CACHE_ENABLED = False
+    admin_client.get(f'/api/inventory/products/{product.pk}/')
+    Product.objects.filter(pk=product.pk).update(price=300)
+
+    response = admin_client.get(f'/api/inventory/products/{product.pk}/')
+    assert response['X-Cache'] == 'MISS'
+    assert response.data['price'] == 300
+    assert product_cache.stats()['hits'] == 0
@@ -0,0 +1,129 @@
+import json
+import pytest
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connection
+from datetime import timedelta
+from django.utils import timezone
+from inventory.models import Product, Order, OrderItem, IdempotencyKey
+
+
+def run(*args):
+    stdout, stderr = StringIO(), StringIO()
+    call_command(*args, stdout=stdout, stderr=stderr)
+    return stdout.getvalue(), stderr.getvalue()
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    path = tmp_path / 'products.csv'
+    path.write_text(
+        'name,description,quantity,price\n'
+        'Aspirin,Tablets,10,20\n'
+        'Cetirizine,,5,40\n'
+        ',Nameless,1,1\n'
+        'Loratadine,Tablets,7,35\n'
+    )
+    return path
+
+
+@pytest.mark.django_db
+def test_import_products_csv(admin_user, csv_file):
+    stdout, stderr = run('import_products', str(csv_file), '--owner', admin_user.email, '--batch-size', '2')
+
+    assert set(Product.objects.values_list('name', flat=True)) == {'Aspirin', 'Cetirizine', 'Loratadine'}
+    assert Product.objects.get(name='Cetirizine').description == ''
+    assert 'line 4' in stderr
+    assert '3 created, 0 updated, 1 failed' in stdout
+
+
+@pytest.mark.django_db
+def test_import_products_resume_and_update(admin_user, csv_file):
+    Product.objects.create(owner=admin_user, name='Loratadine', description='Old', quantity=1, price=1)
+
+    stdout, stderr = run('import_products', str(csv_file), '--owner', admin_user.email, '--start-line', '5')
+
+    assert list(Product.objects.values_list('name', 'quantity')) == [('Loratadine', 7)]
+    assert '0 created, 1 updated, 0 failed' in stdout
+
+
+@pytest.mark.django_db
+def test_import_products_ndjson_dry_run(admin_user, tmp_path):
+    path = tmp_path / 'products.ndjson'
+    path.write_text('\n'.join([
+        json.dumps({'name': 'Omeprazole', 'description': 'Capsules', 'quantity': 3, 'price': 90}),
+        '{not json',
+        '',
+    ]))
+
+    stdout, stderr = run('import_products', str(path), '--owner', admin_user.email, '--dry-run')
+
+    assert not Product.objects.exists()
+    assert 'line 2' in stderr
+    assert 'Validated 2 rows' in stdout
+
+
+@pytest.mark.django_db
+def test_export_products_round_trips_through_import(admin_user, tmp_path):
+    Product.objects.create(owner=admin_user, name='Metformin', description='Tablets', quantity=12, price=80)
+    path = tmp_path / 'export.csv'
+
+    run('export_products', '--format', 'csv', '--output', str(path))
+    Product.objects.all().delete()
+    run('import_products', str(path), '--owner', admin_user.email)
+
+    assert list(Product.objects.values_list('name', 'quantity', 'price')) == [('Metformin', 12, 80)]
+
+
+def benchmark(*args):
+    return run('benchmark_orders', '--database', str(connection.settings_dict['NAME']), *args)
+
+
+@pytest.mark.django_db
+def test_benchmark_orders_stops_at_zero_stock():
+    stdout, _ = benchmark('--processes', '1', '--orders', '15', '--stock', '10')
+
+    assert 'placed 10, rejected for stock 5' in stdout
+    assert 'final available stock 0, expected 0' in stdout
+    assert 'Stock is consistent' in stdout
+    assert not Product.objects.exists()
+    assert not get_user_model().objects.filter(email='benchmark@drugstoc.local').exists()
+
+
+@pytest.mark.django_db
+def test_benchmark_orders_needs_debug_or_database_name(settings):
+    with pytest.raises(CommandError, match='--database='):
+        run('benchmark_orders', '--processes', '1', '--orders', '1')
+    with pytest.raises(CommandError):
+        run('benchmark_orders', '--processes', '1', '--orders', '1', '--database', 'production')
+    assert not Product.objects.exists()
+
+    settings.DEBUG = True
+    assert 'Stock is consistent' in run('benchmark_orders', '--processes', '1', '--orders', '1')[0]
+
+
+@pytest.mark.django_db
+def test_benchmark_orders_keeps_an_existing_user():
+    owner = get_user_model().objects.create_user(username='benchmark', email='benchmark@drugstoc.local', password='x')
+    product = Product.objects.create(owner=owner, name='Own Product', description='Tablets', quantity=5, price=1)
+    order = Order.objects.create(owner=owner, total_price=1, item_count=1)
+    OrderItem.objects.create(order=order, product=product, quantity=1, price=1)
+
+    benchmark('--processes', '1', '--orders', '3', '--stock', '10')
+
+    assert list(Order.objects.filter(owner=owner).values_list('pk', flat=True)) == [order.pk]
+    assert list(Product.objects.values_list('pk', flat=True)) == [product.pk]
+    assert get_user_model().objects.filter(pk=owner.pk).exists()
+
+
+@pytest.mark.django_db
+def test_purge_idempotency_keys(admin_user):
+    now = timezone.now()
+    IdempotencyKey.objects.create(owner=admin_user, key='old', request_hash='x', expires_at=now - timedelta(hours=1))
+    IdempotencyKey.objects.create(owner=admin_user, key='new', request_hash='x', expires_at=now + timedelta(hours=1))
+
+    stdout, _ = run('purge_idempotency_keys', '--batch-size', '1')
+
+    assert 'Deleted 1 expired' in stdout
+    assert list(IdempotencyKey.objects.values_list('key', flat=True)) == ['new']
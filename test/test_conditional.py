@@ -0,0 +1,124 @@
+import pytest
+from datetime import timedelta
+from django.core.cache import cache
+from rest_framework import status
+from inventory.models import Product, Order, OrderItem
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+@pytest.fixture
+def product(admin_user):
+    return Product.objects.create(owner=admin_user, name='Ibuprofen', description='Tablets', quantity=30, price=120)
+
+@pytest.fixture
+def order(admin_user, product):
+    order = Order.objects.create(owner=admin_user)
+    OrderItem.objects.create(order=order, product=product, quantity=2, price=product.price)
+    return order
+
+
+def assert_revalidates(client, url):
+    response = client.get(url)
+    assert response.status_code == status.HTTP_200_OK
+    assert response['ETag']
+    assert response['Last-Modified']
+    assert 'private' in response['Cache-Control']
+    assert 'Authorization' in response['Vary']
+
+    not_modified = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+    assert not_modified.status_code == status.HTTP_304_NOT_MODIFIED
+    assert not_modified.content == b''
+    assert not_modified['ETag'] == response['ETag']
+    return response['ETag']
+
+
+@pytest.mark.django_db
+def test_product_list_conditional_get(admin_client, product):
+    etag = assert_revalidates(admin_client, '/api/inventory/products/')
+
+    product.quantity = 29
+    product.save()
+    response = admin_client.get('/api/inventory/products/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert response['ETag'] != etag
+
+
+@pytest.mark.django_db
+def test_product_list_etag_follows_reservations(admin_client, product):
+    etag = admin_client.get('/api/inventory/products/')['ETag']
+    admin_client.post('/api/inventory/orders/', {'items': [{'product': product.id, 'quantity': 1}]}, format='json')
+
+    response = admin_client.get('/api/inventory/products/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+def test_product_list_etag_follows_bulk_creates(admin_client, product):
+    etag = admin_client.get('/api/inventory/products/')['ETag']
+    admin_client.post('/api/inventory/products/bulk/', [{'name': 'Naproxen', 'description': 'Tablets', 'quantity': 5,
+                                                         'price': 90}], format='json')
+
+    response = admin_client.get('/api/inventory/products/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+def test_product_list_etag_depends_on_page(admin_client, product):
+    first = admin_client.get('/api/inventory/products/')
+    response = admin_client.get('/api/inventory/products/?pagination=cursor', HTTP_IF_NONE_MATCH=first['ETag'])
+    assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+def test_product_detail_conditional_get(admin_client, product):
+    url = f'/api/inventory/products/{product.pk}/'
+    etag = assert_revalidates(admin_client, url)
+
+    product.price = 150
+    product.save()
+    response = admin_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['price'] == 150
+
+
+@pytest.mark.django_db
+def test_order_list_conditional_get(admin_client, order):
+    etag = assert_revalidates(admin_client, '/api/inventory/orders/')
+
+    order.status = 'completed'
+    order.save()
+    response = admin_client.get('/api/inventory/orders/', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+def test_order_list_etag_covers_its_page_only(admin_client, admin_user):
+    older, newer = [Order.objects.create(owner=admin_user) for _ in range(2)]
+    Order.objects.filter(pk=older.pk).update(created_at=older.created_at - timedelta(days=1))
+    etag = admin_client.get('/api/inventory/orders/?page_size=1')['ETag']
+
+    older.status = 'completed'
+    older.save()
+    response = admin_client.get('/api/inventory/orders/?page_size=1', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    newer.status = 'completed'
+    newer.save()
+    response = admin_client.get('/api/inventory/orders/?page_size=1', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+def test_order_detail_conditional_get(admin_client, order):
+    assert_revalidates(admin_client, f'/api/inventory/orders/{order.pk}/')
+
+
+@pytest.mark.django_db
+def test_order_detail_etag_is_per_owner(admin_client, regular_user, product):
+    # Another user's order is never answered with validators
+    order = Order.objects.create(owner=regular_user)
+    response = admin_client.get(f'/api/inventory/orders/{order.pk}/')
+    assert 'ETag' not in response
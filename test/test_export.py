@@ -0,0 +1,42 @@
+import csv
+import json
+import pytest
+from io import StringIO
+from rest_framework import status
+from inventory.models import Product
+
+
+@pytest.fixture
+def products(admin_user):
+    return [
+        Product.objects.create(owner=admin_user, name=f'Export {i}', description='Line, with "quotes"', quantity=i, price=10 * i)
+        for i in range(3)
+    ]
+
+
+@pytest.mark.django_db
+def test_export_products_csv(admin_client, products):
+    response = admin_client.get('/api/inventory/products/export/csv/')
+    assert response.status_code == status.HTTP_200_OK
+    assert response.streaming
+    assert response['Content-Type'] == 'text/csv'
+
+    rows = list(csv.DictReader(StringIO(b''.join(response.streaming_content).decode())))
+    assert sorted(row['name'] for row in rows) == ['Export 0', 'Export 1', 'Export 2']
+    assert rows[0]['description'] == 'Line, with "quotes"'
+    assert rows[0]['owner'] == products[0].owner.name
+
+
+@pytest.mark.django_db
+def test_export_products_ndjson(admin_client, products):
+    response = admin_client.get('/api/inventory/products/export/ndjson/')
+    lines = b''.join(response.streaming_content).decode().splitlines()
+    rows = [json.loads(line) for line in lines]
+    assert {row['id'] for row in rows} == {product.id for product in products}
+    assert rows[0]['created_at'].endswith('+01:00')
+
+
+@pytest.mark.django_db
+def test_export_products_invalid_format(admin_client):
+    response = admin_client.get('/api/inventory/products/export/xml/')
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,96 @@
+import pytest
+from io import StringIO
+from django.core.management import call_command
+from rest_framework import status
+from inventory.frequency import record_frequencies
+from inventory.models import Product, Order, OrderItem, ProductOrderFrequency
+from inventory.transitions import transition_orders
+
+
+@pytest.fixture
+def products(admin_user):
+    return [
+        Product.objects.create(owner=admin_user, name=f'Frequent Product {i}', description='Tablets', quantity=100, price=10)
+        for i in range(3)
+    ]
+
+
+def place(client, lines):
+    return client.post('/api/inventory/orders/', {
+        'items': [{'product': product.id, 'quantity': quantity} for product, quantity in lines]
+    }, format='json')
+
+
+def frequent(client, **params):
+    return client.get('/api/inventory/report/order/buy-again', params)
+
+
+def counters():
+    return {(row.product_id, row.units, row.orders) for row in ProductOrderFrequency.objects.all()}
+
+
+@pytest.mark.django_db
+def test_most_ordered_products_come_first(user_client, products):
+    first, second, third = products
+    place(user_client, [(first, 1), (second, 5)])
+    place(user_client, [(first, 2), (third, 1)])
+    place(user_client, [(first, 1)])
+
+    response = frequent(user_client)
+    assert response.status_code == status.HTTP_200_OK
+    assert [(row['product'], row['total_quantity'], row['order_count']) for row in response.data] == [
+        (second.id, 5, 1), (first.id, 4, 3), (third.id, 1, 1),
+    ]
+    assert [row['product'] for row in frequent(user_client, limit=2).data] == [second.id, first.id]
+    assert frequent(user_client, limit=0).status_code == status.HTTP_400_BAD_REQUEST
+    assert user_client.get('/api/inventory/report/order/frequent').data['product'] == second.id
+
+
+@pytest.mark.django_db
+def test_counters_are_per_user(user_client, admin_client, products):
+    first, second, _ = products
+    place(user_client, [(first, 2)])
+    place(admin_client, [(second, 3)])
+
+    assert [row['product'] for row in frequent(user_client).data] == [first.id]
+    assert [row['product'] for row in frequent(admin_client).data] == [second.id]
+
+
+@pytest.mark.django_db
+def test_cancelled_and_deleted_orders_leave_counters(user_client, products):
+    first, second, _ = products
+    cancelled = place(user_client, [(first, 2), (second, 1)]).data['id']
+    deleted = place(user_client, [(second, 4)]).data['id']
+    place(user_client, [(first, 1)])
+
+    transition_orders([cancelled], 'cancelled')
+    transition_orders([deleted], 'completed')
+    assert user_client.delete(f'/api/inventory/orders/{deleted}/').status_code == status.HTTP_204_NO_CONTENT
+
+    assert counters() == {(first.id, 1, 1), (second.id, 0, 0)}
+    assert [row['product'] for row in frequent(user_client).data] == [first.id]
+
+
+@pytest.mark.django_db
+def test_withdrawing_orders_never_counted_stops_at_zero(user_client, regular_user, products):
+    first, _, _ = products
+    place(user_client, [(first, 1)])
+    # Placed before the counters existed
+    order = Order.objects.create(owner=regular_user)
+    OrderItem.objects.create(order=order, product=first, quantity=3, price=10)
+
+    record_frequencies(OrderItem.objects.select_related('order').filter(order=order), sign=-1)
+    assert counters() == {(first.id, 0, 0)}
+
+
+@pytest.mark.django_db
+def test_rebuild_matches_counters(user_client, products):
+    first, second, _ = products
+    place(user_client, [(first, 2), (second, 1)])
+    cancelled = place(user_client, [(second, 3)]).data['id']
+    transition_orders([cancelled], 'cancelled')
+    maintained = {row for row in counters() if row[1]}
+
+    ProductOrderFrequency.objects.all().delete()
+    call_command('rebuild_order_frequencies', stdout=StringIO())
+    assert counters() == maintained
@@ -0,0 +1,109 @@
+import pytest
+from datetime import timedelta
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+from inventory.models import Product, Order, IdempotencyKey
+
+
+@pytest.fixture
+def product(admin_user):
+    return Product.objects.create(owner=admin_user, name='Amoxicillin', description='Capsules', quantity=10, price=50)
+
+
+def place(client, product, key, quantity=2):
+    return client.post('/api/inventory/orders/', {'items': [{'product': product.id, 'quantity': quantity}]},
+                       format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+
+@pytest.fixture(params=['database', 'cache'])
+def store(request, settings):
+    settings.IDEMPOTENCY_STORE = request.param
+    cache.clear()
+    return request.param
+
+
+@pytest.mark.django_db
+def test_retry_replays_first_response(user_client, product, store):
+    first = place(user_client, product, 'retry-1')
+    retry = place(user_client, product, 'retry-1')
+
+    assert first.status_code == retry.status_code == status.HTTP_201_CREATED
+    assert retry.data['id'] == first.data['id']
+    assert retry['Idempotent-Replayed'] == 'true'
+    assert Order.objects.count() == 1
+    product.refresh_from_db()
+    assert (product.quantity, product.reserved) == (10, 2)
+
+
+@pytest.mark.django_db
+def test_key_reused_for_other_request(user_client, product, store):
+    place(user_client, product, 'retry-2')
+    response = place(user_client, product, 'retry-2', quantity=3)
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert Order.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_keys_are_per_user(user_client, admin_user, get_token, product, store):
+    admin_client = APIClient()
+    admin_client.credentials(HTTP_AUTHORIZATION='Bearer ' + get_token(admin_user, 'admin123'))
+
+    place(user_client, product, 'shared')
+    place(admin_client, product, 'shared')
+    assert Order.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_cache_store_rejects_request_in_flight(user_client, regular_user, product, settings):
+    settings.IDEMPOTENCY_STORE = 'cache'
+    cache.clear()
+    cache.add(f'inventory:idempotency:{regular_user.pk}:in-flight:lock', 'other', timeout=60)
+
+    response = place(user_client, product, 'in-flight')
+    assert response.status_code == status.HTTP_409_CONFLICT
+    assert not Order.objects.exists()
+
+
+@pytest.mark.django_db
+def test_cache_store_rereads_after_taking_the_lock(user_client, product, settings, monkeypatch):
+    settings.IDEMPOTENCY_STORE = 'cache'
+    cache.clear()
+    add = cache.add
+    first = []
+
+    def add_after_first_request(*args, **kwargs):
+        # The retry missed the stored response, the first request now completes before it takes the lock
+        monkeypatch.setattr(cache, 'add', add)
+        first.append(place(user_client, product, 'interleaved'))
+        return add(*args, **kwargs)
+
+    monkeypatch.setattr(cache, 'add', add_after_first_request)
+    retry = place(user_client, product, 'interleaved')
+
+    assert first[0].status_code == retry.status_code == status.HTTP_201_CREATED
+    assert retry['Idempotent-Replayed'] == 'true'
+    assert retry.data['id'] == first[0].data['id']
+    assert Order.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_expired_key_runs_again(user_client, product):
+    place(user_client, product, 'retry-3')
+    IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+    response = place(user_client, product, 'retry-3')
+    assert 'Idempotent-Replayed' not in response
+    assert Order.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_failed_request_is_not_stored(user_client, product):
+    response = place(user_client, product, 'retry-4', quantity=50)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert not IdempotencyKey.objects.exists()
+
+    response = place(user_client, product, 'retry-4', quantity=5)
+    assert response.status_code == status.HTTP_201_CREATED
@@ -0,0 +1,249 @@
+import pytest
+from datetime import timedelta
+from types import SimpleNamespace
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework import status
+from inventory.leaderboard import RedisLeaderboard, bucket_of, oldest_bucket, record_leaderboard_sales
+from inventory.models import Product, Order, OrderItem, ProductSalesBucket
+from inventory.transitions import transition_orders
+
+
+@pytest.fixture(autouse=True)
+def database_leaderboard(settings):
+    settings.LEADERBOARD_BACKEND = 'database'
+    settings.LEADERBOARD_CACHE_TIMEOUT = 0
+    cache.clear()
+
+@pytest.fixture
+def products(admin_user):
+    return [
+        Product.objects.create(owner=admin_user, name=f'Best Seller {i}', description='Tablets', quantity=100, price=10)
+        for i in range(3)
+    ]
+
+
+def place(client, lines):
+    response = client.post('/api/inventory/orders/', {
+        'items': [{'product': product.id, 'quantity': quantity} for product, quantity in lines]
+    }, format='json')
+    assert response.status_code == status.HTTP_201_CREATED
+    return response.data['id']
+
+
+def top(client, window, **params):
+    response = client.get(f'/api/inventory/report/top-sellers/{window}/', params)
+    assert response.status_code == status.HTTP_200_OK
+    return [(row['product'], row['units']) for row in response.data]
+
+
+@pytest.mark.django_db
+def test_top_sellers_rank_units_sold(user_client, products, django_capture_on_commit_callbacks):
+    first, second, third = products
+    with django_capture_on_commit_callbacks(execute=True):
+        place(user_client, [(first, 2), (second, 5)])
+        place(user_client, [(first, 1), (third, 1)])
+
+    assert top(user_client, 'hour') == [(second.id, 5), (first.id, 3), (third.id, 1)]
+    assert top(user_client, 'week', limit=2) == [(second.id, 5), (first.id, 3)]
+
+
+@pytest.mark.django_db
+def test_windows_only_count_their_buckets(user_client, products):
+    first, second, _ = products
+    place(user_client, [(first, 1)])
+    old = place(user_client, [(second, 4)])
+    # Backdate the second order to two hours ago and count it again
+    Order.objects.filter(pk=old).update(created_at=timezone.now() - timedelta(hours=2))
+    call_command('rebuild_leaderboard', stdout=StringIO())
+
+    assert top(user_client, 'hour') == [(first.id, 1)]
+    assert top(user_client, 'day') == [(second.id, 4), (first.id, 1)]
+
+
+@pytest.mark.django_db
+def test_cancelled_orders_leave_the_leaderboard(user_client, products, django_capture_on_commit_callbacks):
+    first, second, _ = products
+    with django_capture_on_commit_callbacks(execute=True):
+        cancelled = place(user_client, [(first, 3)])
+        place(user_client, [(second, 1)])
+        transition_orders([cancelled], 'cancelled')
+
+    assert top(user_client, 'day') == [(second.id, 1)]
+    maintained = set(ProductSalesBucket.objects.values_list('bucket', 'product', 'units'))
+    call_command('rebuild_leaderboard', stdout=StringIO())
+    assert set(ProductSalesBucket.objects.filter(units__gt=0).values_list('bucket', 'product', 'units')) == \
+        {row for row in maintained if row[2]}
+
+
+@pytest.mark.django_db
+def test_buckets_outside_the_longest_window_are_pruned(user_client, products, django_capture_on_commit_callbacks):
+    first, second, _ = products
+    ProductSalesBucket.objects.create(bucket=oldest_bucket() - 1, product=second, units=7)
+    ProductSalesBucket.objects.create(bucket=oldest_bucket(), product=second, units=2)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        place(user_client, [(first, 1)])
+
+    assert not ProductSalesBucket.objects.filter(bucket__lt=oldest_bucket()).exists()
+    assert top(user_client, 'week') == [(second.id, 2), (first.id, 1)]
+
+
+@pytest.mark.django_db
+def test_withdrawing_orders_never_counted_stops_at_zero(user_client, regular_user, products,
+                                                        django_capture_on_commit_callbacks):
+    first, _, _ = products
+    with django_capture_on_commit_callbacks(execute=True):
+        place(user_client, [(first, 1)])
+    # Placed before the leaderboard existed
+    order = Order.objects.create(owner=regular_user)
+    OrderItem.objects.create(order=order, product=first, quantity=3, price=10)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        record_leaderboard_sales(OrderItem.objects.select_related('order').filter(order=order), sign=-1)
+    assert list(ProductSalesBucket.objects.values_list('product', 'units')) == [(first.id, 0)]
+
+
+@pytest.mark.django_db
+def test_buckets_are_written_after_the_order_commits(user_client, products, django_capture_on_commit_callbacks):
+    first, _, _ = products
+    with django_capture_on_commit_callbacks() as callbacks:
+        place(user_client, [(first, 2)])
+    assert not ProductSalesBucket.objects.exists()
+
+    for callback in callbacks:
+        callback()
+    assert list(ProductSalesBucket.objects.values_list('product', 'units')) == [(first.id, 2)]
+
+
+@pytest.mark.django_db
+def test_invalid_window_and_limit(user_client):
+    assert user_client.get('/api/inventory/report/top-sellers/year/').status_code == status.HTTP_400_BAD_REQUEST
+    assert user_client.get('/api/inventory/report/top-sellers/day/', {'limit': 'x'}).status_code == \
+        status.HTTP_400_BAD_REQUEST
+
+
+@pytest.fixture
+def fake_redis(settings, monkeypatch):
+    fakeredis = pytest.importorskip('fakeredis')
+    # The record and advance scripts need fakeredis' Lua support
+    pytest.importorskip('lupa')
+    redis = fakeredis.FakeRedis(server=fakeredis.FakeServer())
+    monkeypatch.setattr('inventory.leaderboard.get_redis_connection', lambda alias: redis)
+    settings.LEADERBOARD_BACKEND = 'redis'
+    return redis
+
+@pytest.fixture
+def clock(monkeypatch, settings):
+    """Move the leaderboard's now by whole buckets."""
+    start = timezone.now()
+    def move(buckets):
+        moment = start + timedelta(seconds=buckets * settings.LEADERBOARD_BUCKET_SECONDS)
+        monkeypatch.setattr('inventory.leaderboard.timezone', SimpleNamespace(now=lambda: moment))
+        return bucket_of(moment)
+    return move
+
+
+def ranking(board, window):
+    return board.top(window, 10)
+
+
+@pytest.mark.django_db
+def test_redis_records_orders_once_they_commit(user_client, products, fake_redis, django_capture_on_commit_callbacks):
+    first, second, _ = products
+    with django_capture_on_commit_callbacks(execute=True):
+        place(user_client, [(first, 2), (second, 5)])
+        place(user_client, [(first, 1)])
+
+    assert top(user_client, 'hour') == [(second.id, 5), (first.id, 3)]
+    bucket = fake_redis.zrange(f'inventory:leaderboard:bucket:{bucket_of(timezone.now())}', 0, -1, withscores=True)
+    assert sorted(bucket) == sorted([(first.id.encode(), 3.0), (second.id.encode(), 5.0)])
+    # The database buckets are written too and back reads when redis fails
+    assert set(ProductSalesBucket.objects.values_list('product', 'units')) == {(first.id, 3), (second.id, 5)}
+
+
+@pytest.mark.django_db
+def test_redis_windows_advance_and_withdrawals_skip_buckets_they_left(products, fake_redis, clock):
+    first, second, _ = products
+    board = RedisLeaderboard()
+
+    start = clock(0)
+    board.push({(start, first.id): 5, (start, second.id): 2}, 1)
+    assert ranking(board, 'hour') == [(first.id, 5), (second.id, 2)]
+
+    # One bucket on the hour total only subtracts the (empty) bucket that left it
+    later = clock(1)
+    board.push({(later, second.id): 4}, 1)
+    assert ranking(board, 'hour') == [(second.id, 6), (first.id, 5)]
+
+    # Twelve buckets on, the first bucket left the hour but not the day
+    clock(12)
+    assert ranking(board, 'hour') == [(second.id, 4)]
+    assert ranking(board, 'day') == [(second.id, 6), (first.id, 5)]
+
+    # Withdrawing from that bucket leaves the hour total alone
+    board.push({(start, second.id): 2}, -1)
+    assert ranking(board, 'hour') == [(second.id, 4)]
+    assert ranking(board, 'day') == [(first.id, 5), (second.id, 4)]
+
+
+@pytest.mark.django_db
+def test_redis_total_further_behind_than_its_window_is_summed_again(products, fake_redis, clock):
+    first, second, _ = products
+    board = RedisLeaderboard()
+
+    start = clock(0)
+    board.push({(start, first.id): 3}, 1)
+    assert ranking(board, 'hour') == [(first.id, 3)]
+
+    later = clock(20)
+    board.push({(later, second.id): 1}, 1)
+    assert ranking(board, 'hour') == [(second.id, 1)]
+    assert ranking(board, 'day') == [(first.id, 3), (second.id, 1)]
+
+
+@pytest.mark.django_db
+def test_redis_rebuild_reloads_the_sorted_sets(user_client, products, fake_redis, django_capture_on_commit_callbacks):
+    first, second, _ = products
+    with django_capture_on_commit_callbacks(execute=True):
+        place(user_client, [(first, 2)])
+        cancelled = place(user_client, [(second, 6)])
+        transition_orders([cancelled], 'cancelled')
+    assert top(user_client, 'day') == [(first.id, 2)]
+
+    # An outage lost the sets
+    fake_redis.flushall()
+    assert top(user_client, 'day') == []
+    call_command('rebuild_leaderboard', stdout=StringIO())
+    assert top(user_client, 'day') == [(first.id, 2)]
+    assert top(user_client, 'hour') == [(first.id, 2)]
+
+
+@pytest.mark.django_db
+def test_redis_errors_fall_back_to_the_database(user_client, products, fake_redis, monkeypatch,
+                                                django_capture_on_commit_callbacks):
+    from redis.exceptions import ConnectionError
+    first, _, _ = products
+    with django_capture_on_commit_callbacks(execute=True):
+        place(user_client, [(first, 2)])
+
+    def down(*args, **kwargs):
+        raise ConnectionError('redis is down')
+    monkeypatch.setattr(fake_redis, 'zrevrange', down)
+    assert top(user_client, 'hour') == [(first.id, 2)]
+
+
+@pytest.mark.django_db
+def test_redis_withdrawals_take_at_most_what_a_bucket_holds(products, fake_redis, clock):
+    first, second, _ = products
+    board = RedisLeaderboard()
+
+    start = clock(0)
+    board.push({(start, first.id): 1, (start, second.id): 2}, 1)
+    assert ranking(board, 'hour') == [(second.id, 2), (first.id, 1)]
+
+    board.push({(start, first.id): 3}, -1)
+    board.push({(start, first.id): 4}, 1)
+    assert ranking(board, 'hour') == [(first.id, 4), (second.id, 2)]
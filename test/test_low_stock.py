@@ -0,0 +1,83 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from inventory.low_stock import low_stock_changed
+from inventory.models import Product
+from inventory.transitions import transition_orders
+
+
+@pytest.fixture
+def products(admin_user):
+    def create(name, quantity, reorder_level):
+        return Product.objects.create(owner=admin_user, name=name, description='Generic', quantity=quantity,
+                                      reorder_level=reorder_level, price=5)
+    return {
+        'paracetamol': create('Paracetamol', 150, 200),
+        'imatinib': create('Imatinib', 3, 2),
+        'amoxicillin': create('Amoxicillin', 4, 10),
+    }
+
+
+@pytest.fixture
+def crossings():
+    events = []
+    def record(sender, entered, exited, **kwargs):
+        events.append((sorted(entered), sorted(exited)))
+    low_stock_changed.connect(record)
+    yield events
+    low_stock_changed.disconnect(record)
+
+
+def flags():
+    return dict(Product.objects.values_list('name', 'is_low_stock'))
+
+
+@pytest.mark.django_db
+def test_flag_follows_each_products_reorder_level(products):
+    assert flags() == {'Paracetamol': True, 'Imatinib': False, 'Amoxicillin': True}
+
+    imatinib = products['imatinib']
+    imatinib.reorder_level = 5
+    imatinib.save()
+    assert flags()['Imatinib'] is True
+
+
+@pytest.mark.django_db
+def test_report_sorts_by_shortfall_and_paginates(admin_client, products):
+    response = admin_client.get('/api/inventory/report/stock/')
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['count'] == 2
+    assert [(row['name'], row['shortfall']) for row in response.data['results']] == [('Paracetamol', 50),
+                                                                                    ('Amoxicillin', 6)]
+
+
+@pytest.mark.django_db
+def test_stock_changes_enter_and_exit_the_low_stock_set(user_client, products, crossings,
+                                                        django_capture_on_commit_callbacks):
+    imatinib = products['imatinib']
+    with django_capture_on_commit_callbacks(execute=True):
+        order = user_client.post('/api/inventory/orders/', {'items': [{'product': imatinib.id, 'quantity': 2}]},
+                                 format='json').data['id']
+        transition_orders([order], 'completed')
+    assert flags()['Imatinib'] is True
+    assert crossings == [([imatinib.id], [])]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        imatinib.refresh_from_db()
+        imatinib.quantity = 20
+        imatinib.save()
+    assert flags()['Imatinib'] is False
+    assert crossings[-1] == ([], [imatinib.id])
+
+
+@pytest.mark.django_db
+def test_save_flags_without_extra_queries(products, crossings, django_capture_on_commit_callbacks):
+    amoxicillin = Product.objects.get(pk=products['amoxicillin'].pk)
+    amoxicillin.quantity = 40
+    with django_capture_on_commit_callbacks(execute=True), CaptureQueriesContext(connection) as context:
+        amoxicillin.save()
+
+    assert not [query for query in context.captured_queries if query['sql'].startswith('SELECT')]
+    assert flags()['Amoxicillin'] is False
+    assert crossings == [([], [amoxicillin.pk])]
@@ -0,0 +1,74 @@
+import pytest
+from datetime import timedelta
+from django.utils import timezone
+from rest_framework import status
+from inventory.models import Product, Order
+
+
+@pytest.fixture
+def products(admin_user):
+    # Several rows share a created_at to exercise the id tie-breaker
+    now = timezone.now()
+    rows = []
+    for i in range(7):
+        product = Product.objects.create(owner=admin_user, name=f'Product {i}', description='Description', quantity=i, price=10)
+        rows.append(product)
+    for i, product in enumerate(rows):
+        Product.objects.filter(pk=product.pk).update(created_at=now - timedelta(minutes=i // 2))
+    return Product.objects.order_by('-created_at', 'id')
+
+
+@pytest.mark.django_db
+def test_product_list_defaults_to_page_numbers(admin_client, products):
+    response = admin_client.get('/api/inventory/products/')
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['count'] == 7
+
+
+@pytest.mark.django_db
+def test_product_list_cursor_walks_every_row_once(admin_client, products):
+    seen = []
+    url = '/api/inventory/products/?pagination=cursor&page_size=3'
+    while url:
+        response = admin_client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert 'count' not in response.data
+        seen.extend(item['id'] for item in response.data['results'])
+        url = response.data['next']
+
+    assert seen == [product.id for product in products]
+
+
+@pytest.mark.django_db
+def test_product_list_cursor_previous_link(admin_client, products):
+    first = admin_client.get('/api/inventory/products/?pagination=cursor&page_size=3')
+    assert first.data['previous'] is None
+
+    second = admin_client.get(first.data['next'])
+    back = admin_client.get(second.data['previous'])
+    assert [item['id'] for item in back.data['results']] == [item['id'] for item in first.data['results']]
+
+
+@pytest.mark.django_db
+def test_product_list_invalid_cursor(admin_client, products):
+    response = admin_client.get('/api/inventory/products/?cursor=not-a-cursor')
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_order_list_cursor_keeps_filters(admin_client, admin_user):
+    now = timezone.now()
+    for i in range(5):
+        order = Order.objects.create(owner=admin_user, status='completed' if i % 2 else 'pending')
+        Order.objects.filter(pk=order.pk).update(created_at=now - timedelta(minutes=i // 2))
+    pending = Order.objects.filter(status='pending').order_by('-created_at', 'id')
+
+    seen = []
+    url = '/api/inventory/orders/?status=pending&page_size=2'
+    while url:
+        response = admin_client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        seen.extend(item['id'] for item in response.data['results'])
+        url = response.data['next']
+
+    assert seen == [order.id for order in pending]
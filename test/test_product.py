@@ -119,7 +119,7 @@ def test_low_stock_report(api_client, admin_user, product_data, get_token):
     # Request the low stock report
     response = api_client.get('/api/inventory/report/stock/')
     assert response.status_code == status.HTTP_200_OK
-    assert response.data[0]['quantity'] < 10  # Assuming low stock threshold is less than 10
+    assert response.data['results'][0]['quantity'] < 10  # Assuming low stock threshold is less than 10
 
 
 
@@ -218,18 +218,17 @@ def test_most_frequently_ordered_product(api_client, regular_user, product_data,
     # Create products
     product1 = Product.objects.create(owner=regular_user, **product_data)
 
-    # Create orders with order items
-    order1 = Order.objects.create(owner=regular_user)
-    order2 = Order.objects.create(owner=regular_user)
+    # Place orders through the API, which keeps the per-user counters
+    for quantity in (2, 3):
+        response = api_client.post('/api/inventory/orders/', {'items': [{'product': product1.id, 'quantity': quantity}]}, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
 
-    item1 = OrderItem.objects.create(order=order1, product=product1, quantity=3, price=product1.price)
-    item2 = OrderItem.objects.create(order=order2, product=product1, quantity=4, price=product1.price)
-
-    # Call the endpoint to get the most frequently ordered product
+    # Call the endpoint to get the most frequently ordered products
     response = api_client.get('/api/inventory/report/order/frequent')
     assert response.status_code == status.HTTP_200_OK
     assert response.data['product_name'] == product1.name
-    assert response.data['total_quantity'] > item1.quantity
+    assert response.data['total_quantity'] == 5
+    assert response.data['order_count'] == 2
 
 @pytest.mark.django_db
 def test_no_orders_for_user(api_client, regular_user, get_token):
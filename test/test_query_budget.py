@@ -0,0 +1,150 @@
+import pytest
+from itertools import count
+from inventory.frequency import rebuild_frequencies
+from inventory.leaderboard import leaderboard
+from inventory.models import Product, Order, OrderItem
+
+
+_sequence = count()
+
+def make_products(owner, n, **fields):
+    fields.setdefault('quantity', 5)
+    return [
+        Product.objects.create(owner=owner, name=f'Budget Product {next(_sequence)}', description='Paracetamol tablets', price=10, **fields)
+        for _ in range(n)
+    ]
+
+def make_orders(owner, n):
+    product, = make_products(owner, 1, quantity=100)
+    for _ in range(n):
+        order = Order.objects.create(owner=owner)
+        OrderItem.objects.create(order=order, product=product, quantity=1, price=product.price)
+        OrderItem.objects.create(order=order, product=make_products(owner, 1)[0], quantity=2, price=product.price)
+    return order
+
+
+@pytest.mark.django_db
+def test_product_list_query_budget(admin_client, admin_user, query_budget):
+    query_budget(
+        lambda: admin_client.get('/api/inventory/products/'),
+        lambda n: make_products(admin_user, n),
+        budget=5,
+    )
+
+@pytest.mark.django_db
+def test_product_list_cursor_query_budget(admin_client, admin_user, query_budget):
+    query_budget(
+        lambda: admin_client.get('/api/inventory/products/?pagination=cursor'),
+        lambda n: make_products(admin_user, n),
+        budget=4,
+    )
+
+@pytest.mark.django_db
+def test_product_detail_query_budget(admin_client, admin_user, query_budget):
+    product, = make_products(admin_user, 1)
+    query_budget(
+        lambda: admin_client.get(f'/api/inventory/products/{product.pk}/'),
+        lambda n: make_products(admin_user, n),
+        budget=3,
+    )
+
+@pytest.mark.django_db
+def test_product_search_query_budget(admin_client, admin_user, query_budget):
+    query_budget(
+        lambda: admin_client.get('/api/inventory/products/search?q=paracetamol'),
+        lambda n: make_products(admin_user, n),
+        budget=4,
+    )
+
+@pytest.mark.django_db
+def test_low_stock_report_query_budget(admin_client, admin_user, query_budget):
+    query_budget(
+        lambda: admin_client.get('/api/inventory/report/stock/'),
+        lambda n: make_products(admin_user, n, quantity=1),
+        # Count and page of the flagged products
+        budget=4,
+    )
+
+@pytest.mark.django_db
+def test_sales_report_query_budget(admin_client, admin_user, query_budget):
+    query_budget(
+        lambda: admin_client.get('/api/inventory/report/sales/day/'),
+        lambda n: make_orders(admin_user, n),
+        budget=3,
+    )
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('interval', ['hour', 'day', 'week', 'month'])
+def test_sales_range_report_query_budget(admin_client, admin_user, query_budget, interval):
+    query_budget(
+        lambda: admin_client.get('/api/inventory/report/sales/', {'interval': interval, 'from': '2024-01-01', 'to': '2024-01-31'}),
+        lambda n: make_orders(admin_user, n),
+        budget=3,
+    )
+
+@pytest.mark.django_db
+def test_top_sellers_query_budget(admin_client, admin_user, query_budget, settings):
+    settings.LEADERBOARD_BACKEND = 'database'
+    settings.LEADERBOARD_CACHE_TIMEOUT = 0
+    query_budget(
+        lambda: admin_client.get('/api/inventory/report/top-sellers/week/'),
+        lambda n: (make_orders(admin_user, n), leaderboard().rebuild()),
+        # Summing the week's buckets and loading the product names
+        budget=4,
+    )
+
+@pytest.mark.django_db
+def test_order_list_query_budget(admin_client, admin_user, query_budget):
+    query_budget(
+        lambda: admin_client.get('/api/inventory/orders/'),
+        lambda n: make_orders(admin_user, n),
+        # Validators and page of the live orders plus the same two for the archive
+        budget=7,
+    )
+
+@pytest.mark.django_db
+def test_order_detail_query_budget(admin_client, admin_user, query_budget):
+    order = make_orders(admin_user, 1)
+    query_budget(
+        lambda: admin_client.get(f'/api/inventory/orders/{order.pk}/'),
+        lambda n: OrderItem.objects.bulk_create(
+            OrderItem(order=order, product=product, quantity=1, price=product.price)
+            for product in make_products(admin_user, n)
+        ),
+        budget=5,
+    )
+
+@pytest.mark.django_db
+def test_frequent_ordered_product_query_budget(user_client, regular_user, query_budget):
+    query_budget(
+        lambda: user_client.get('/api/inventory/report/order/frequent'),
+        lambda n: (make_orders(regular_user, n), rebuild_frequencies()),
+        budget=3,
+    )
+
+@pytest.mark.django_db
+def test_order_create_query_budget(user_client, admin_user, query_budget):
+    products = []
+    query_budget(
+        lambda: user_client.post('/api/inventory/orders/', {
+            'items': [{'product': product.id, 'quantity': 1} for product in products]
+        }, format='json'),
+        lambda n: products.extend(make_products(admin_user, n)),
+        # Includes inserting and incrementing the day's sales rollup rows and the
+        # owner's product frequency rows, leaderboard buckets are written after commit
+        budget=15,
+        # Products accumulate across rows, 100 lines keep the items insert within SQLite's 999 parameters
+        rows=(2, 10, 88),
+    )
+
+@pytest.mark.django_db
+def test_bulk_order_cancel_query_budget(admin_client, admin_user, query_budget):
+    ids = []
+    query_budget(
+        lambda: admin_client.post('/api/inventory/orders/status/', {'ids': ids, 'status': 'cancelled'}, format='json'),
+        lambda n: ids.extend(make_orders(admin_user, 1).pk for _ in range(n)),
+        # Includes reading the items, decrementing their sales rollup and product frequency
+        # rows, and checking the released products against their reorder levels
+        budget=13,
+        rows=(1, 10, 100),
+    )
@@ -0,0 +1,124 @@
+import pytest
+from io import StringIO
+from django.core.management import call_command
+from django.db import DatabaseError
+from rest_framework import status
+from inventory.models import Product, Order, QueuedOrder
+from inventory.queue import claim_batch, place_group, process_entries
+
+
+@pytest.fixture
+def products(admin_user):
+    return [
+        Product.objects.create(owner=admin_user, name=f'Queue Product {i}', description='Tablets', quantity=5, price=10)
+        for i in range(2)
+    ]
+
+
+def place_async(client, items):
+    return client.post('/api/inventory/orders/', {'items': items}, format='json', HTTP_PREFER='respond-async')
+
+
+@pytest.mark.django_db
+def test_async_order_returns_202_and_status_url(user_client, products):
+    response = place_async(user_client, [{'product': products[0].id, 'quantity': 2}])
+
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    assert response['Location'] == response.data['status_url']
+    assert response.data['status'] == 'queued'
+    assert not Order.objects.exists()
+
+    call_command('process_order_queue', '--once', stdout=StringIO())
+
+    entry = user_client.get(response.data['status_url']).data
+    assert entry['status'] == 'completed'
+    assert Order.objects.get(pk=entry['order']).total_price == 20
+    products[0].refresh_from_db()
+    assert (products[0].quantity, products[0].reserved) == (5, 2)
+
+
+@pytest.mark.django_db
+def test_async_order_validates_shape_only(user_client, products):
+    assert place_async(user_client, [{'product': ['not', 'an', 'id'], 'quantity': 1}]).status_code == status.HTTP_400_BAD_REQUEST
+
+    response = place_async(user_client, [{'product': 'missing', 'quantity': 1}])
+    assert response.status_code == status.HTTP_202_ACCEPTED
+
+    call_command('process_order_queue', '--once', stdout=StringIO())
+    entry = QueuedOrder.objects.get(pk=response.data['id'])
+    assert entry.status == 'failed'
+    assert entry.errors == ['Product with ID missing does not exist.']
+
+
+@pytest.mark.django_db
+def test_batch_groups_orders_and_falls_back_when_stock_runs_out(regular_user, products):
+    first, second = products
+    for quantity in (2, 2, 2):
+        QueuedOrder.objects.create(owner=regular_user, payload={'items': [{'product': first.id, 'quantity': quantity}]})
+    QueuedOrder.objects.create(owner=regular_user, payload={'items': [
+        {'product': second.id, 'quantity': 1}, {'product': first.id, 'quantity': 1},
+    ]})
+
+    outcome = process_entries(claim_batch(10))
+
+    assert outcome == {'completed': 3, 'failed': 1}
+    first.refresh_from_db()
+    second.refresh_from_db()
+    assert (first.reserved, second.reserved) == (5, 1)
+    assert list(QueuedOrder.objects.order_by('created_at').values_list('status', flat=True)) == \
+        ['completed', 'completed', 'failed', 'completed']
+
+
+@pytest.mark.django_db
+def test_claimed_entries_are_not_claimed_twice(regular_user, products):
+    QueuedOrder.objects.create(owner=regular_user, payload={'items': [{'product': products[0].id, 'quantity': 1}]})
+
+    assert len(claim_batch(10)) == 1
+    assert claim_batch(10) == []
+
+
+@pytest.mark.django_db
+def test_reclaimed_entry_is_placed_once(regular_user, products):
+    entry = QueuedOrder.objects.create(owner=regular_user, payload={'items': [{'product': products[0].id, 'quantity': 1}]})
+    claim_batch(10)
+    # A slow worker loaded the entry, then a worker that reclaimed it as stale placed it
+    slow = QueuedOrder.objects.get(pk=entry.pk)
+    assert process_entries([entry.pk]) == {'completed': 1, 'failed': 0}
+
+    assert place_group([(slow, [{'product': products[0], 'quantity': 1}])]) == 0
+    assert Order.objects.count() == 1
+    products[0].refresh_from_db()
+    assert products[0].reserved == 1
+
+
+@pytest.mark.django_db
+def test_eager_mode_places_order_in_process(user_client, products, settings, django_capture_on_commit_callbacks):
+    settings.ORDER_QUEUE_MODE = 'eager'
+    with django_capture_on_commit_callbacks(execute=True):
+        response = place_async(user_client, [{'product': products[1].id, 'quantity': 1}])
+
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    assert user_client.get(response.data['status_url']).data['status'] == 'completed'
+
+
+@pytest.mark.django_db
+def test_eager_mode_fails_entry_on_error(user_client, products, settings, django_capture_on_commit_callbacks,
+                                         monkeypatch):
+    settings.ORDER_QUEUE_MODE = 'eager'
+    def broken(*args, **kwargs):
+        raise DatabaseError('connection lost')
+    monkeypatch.setattr('inventory.queue.reserve_stock', broken)
+    with django_capture_on_commit_callbacks(execute=True):
+        response = place_async(user_client, [{'product': products[1].id, 'quantity': 1}])
+
+    entry = user_client.get(response.data['status_url']).data
+    assert entry['status'] == 'failed'
+    assert entry['errors'] == ['The order could not be placed, please try again.']
+    assert not Order.objects.exists()
+
+
+@pytest.mark.django_db
+def test_queued_order_status_is_private(admin_client, regular_user, products):
+    entry = QueuedOrder.objects.create(owner=regular_user, payload={'items': []})
+    response = admin_client.get(f'/api/inventory/orders/queue/{entry.id}/')
+    assert response.status_code == status.HTTP_404_NOT_FOUND
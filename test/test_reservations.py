@@ -0,0 +1,98 @@
+import pytest
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework import status
+from inventory.models import Product, Order
+from inventory.transitions import transition_orders
+
+
+@pytest.fixture
+def product(admin_user):
+    return Product.objects.create(owner=admin_user, name='Ibuprofen', description='Tablets', quantity=10, price=20)
+
+
+def place(client, product, quantity):
+    return client.post('/api/inventory/orders/', {'items': [{'product': product.id, 'quantity': quantity}]}, format='json')
+
+
+def stock(product):
+    product.refresh_from_db()
+    return product.quantity, product.reserved
+
+
+@pytest.mark.django_db
+def test_pending_orders_reserve_available_stock(user_client, product):
+    response = place(user_client, product, 6)
+    assert response.status_code == status.HTTP_201_CREATED
+    assert Order.objects.get(pk=response.data['id']).reserved_until > timezone.now()
+    assert stock(product) == (10, 6)
+
+    response = place(user_client, product, 5)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert stock(product) == (10, 6)
+
+
+@pytest.mark.django_db
+def test_completing_ships_and_cancelling_releases(user_client, product):
+    shipped = place(user_client, product, 3).data['id']
+    cancelled = place(user_client, product, 4).data['id']
+
+    transition_orders([shipped], 'completed')
+    assert stock(product) == (7, 4)
+    transition_orders([cancelled], 'cancelled')
+    assert stock(product) == (7, 0)
+    assert not Order.objects.filter(reserved_until__isnull=False).exists()
+
+
+@pytest.mark.django_db
+def test_sweeper_releases_expired_reservations(user_client, product):
+    expired = place(user_client, product, 2).data['id']
+    active = place(user_client, product, 3).data['id']
+    Order.objects.filter(pk=expired).update(reserved_until=timezone.now() - timedelta(minutes=1))
+
+    stdout = StringIO()
+    call_command('release_expired_reservations', '--batch-size', '1', stdout=stdout)
+
+    assert 'Released 1 expired reservations' in stdout.getvalue()
+    assert dict(Order.objects.values_list('pk', 'status')) == {expired: 'pending', active: 'pending'}
+    assert Order.objects.get(pk=expired).reserved_until is None
+    assert stock(product) == (10, 3)
+
+
+def lapse(order):
+    Order.objects.filter(pk=order).update(reserved_until=timezone.now() - timedelta(minutes=1))
+    call_command('release_expired_reservations', stdout=StringIO())
+
+
+@pytest.mark.django_db
+def test_completing_a_lapsed_order_reserves_again(user_client, product):
+    order = place(user_client, product, 4).data['id']
+    lapse(order)
+    assert stock(product) == (10, 0)
+
+    assert transition_orders([order], 'completed') == {'updated': [order], 'errors': []}
+    assert stock(product) == (6, 0)
+
+
+@pytest.mark.django_db
+def test_completing_a_lapsed_order_fails_when_stock_is_gone(user_client, product):
+    lapsed = place(user_client, product, 4).data['id']
+    lapse(lapsed)
+    place(user_client, product, 8)
+
+    result = transition_orders([lapsed], 'completed')
+    assert result == {'updated': [], 'errors': [{'id': lapsed, 'error': 'Insufficient stock for product Ibuprofen.'}]}
+    assert Order.objects.get(pk=lapsed).status == 'pending'
+    assert stock(product) == (10, 8)
+
+    transition_orders([lapsed], 'cancelled')
+    assert stock(product) == (10, 8)
+
+
+@pytest.mark.django_db
+def test_deleting_pending_order_releases_reservation(user_client, product):
+    order = place(user_client, product, 5).data['id']
+    assert user_client.delete(f'/api/inventory/orders/{order}/').status_code == status.HTTP_204_NO_CONTENT
+    assert stock(product) == (10, 0)
@@ -0,0 +1,147 @@
+import pytest
+from importlib import import_module
+from io import StringIO
+from django.apps import apps
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Sum
+from django.utils import timezone
+from rest_framework import status
+from inventory.models import Product, Order, OrderItem, ProductDailySales
+from inventory.rollups import rollup_stripe
+from inventory.transitions import transition_orders
+
+
+@pytest.fixture
+def products(admin_user):
+    return [
+        Product.objects.create(owner=admin_user, name=f'Rollup Product {i}', description='Tablets', quantity=50, price=10 * (i + 1))
+        for i in range(2)
+    ]
+
+
+def place(client, lines, **headers):
+    return client.post('/api/inventory/orders/', {
+        'items': [{'product': product.id, 'quantity': quantity} for product, quantity in lines]
+    }, format='json', **headers)
+
+
+def rollups():
+    # A product's day summed over its stripes
+    rows = ProductDailySales.objects.filter(date=timezone.localdate()).values('product')\
+        .annotate(total_units=Sum('units'), total_revenue=Sum('revenue'))
+    return {(row['product'], row['total_units'], row['total_revenue']) for row in rows}
+
+
+@pytest.mark.django_db
+def test_placing_orders_increments_rollups(user_client, products):
+    first, second = products
+    assert place(user_client, [(first, 2), (second, 1)]).status_code == status.HTTP_201_CREATED
+    assert place(user_client, [(first, 3)]).status_code == status.HTTP_201_CREATED
+
+    assert rollups() == {(first.id, 5, 50), (second.id, 1, 20)}
+    report = user_client.get('/api/inventory/report/sales/day/').data
+    assert report == [{'date': str(timezone.localdate()), 'total_sales': 70}]
+
+
+@pytest.mark.django_db
+def test_orders_roll_up_on_their_own_stripe(user_client, products):
+    first, _ = products
+    placed = [place(user_client, [(first, quantity)]).data['id'] for quantity in (1, 2, 4, 8)]
+
+    stripes = {}
+    for pk, quantity in zip(placed, (1, 2, 4, 8)):
+        stripes[rollup_stripe(pk)] = stripes.get(rollup_stripe(pk), 0) + quantity
+    assert dict(ProductDailySales.objects.filter(product=first).values_list('stripe', 'units')) == stripes
+
+    # Withdrawing takes the sales back from the order's stripe only
+    transition_orders([placed[3]], 'cancelled')
+    stripes[rollup_stripe(placed[3])] -= 8
+    assert dict(ProductDailySales.objects.filter(product=first).values_list('stripe', 'units')) == stripes
+    assert rollups() == {(first.id, 7, 70)}
+    call_command('rebuild_sales_rollups', '--verify-only', stdout=StringIO(), stderr=StringIO())
+
+
+@pytest.mark.django_db
+def test_cancelled_and_deleted_orders_leave_rollups(user_client, products):
+    first, second = products
+    cancelled = place(user_client, [(first, 2)]).data['id']
+    completed = place(user_client, [(second, 1)]).data['id']
+    kept = place(user_client, [(first, 1)]).data['id']
+
+    transition_orders([cancelled], 'cancelled')
+    transition_orders([completed], 'completed')
+    assert user_client.delete(f'/api/inventory/orders/{completed}/').status_code == status.HTTP_204_NO_CONTENT
+
+    assert rollups() == {(first.id, 1, 10), (second.id, 0, 0)}
+    assert [row['total_sales'] for row in user_client.get('/api/inventory/report/sales/day/').data] == [10]
+    assert Order.objects.get(pk=kept).status == 'pending'
+
+
+@pytest.mark.django_db
+def test_queued_orders_increment_rollups(user_client, products, settings, django_capture_on_commit_callbacks):
+    settings.ORDER_QUEUE_MODE = 'eager'
+    with django_capture_on_commit_callbacks(execute=True):
+        for _ in range(2):
+            place(user_client, [(products[1], 2)], HTTP_PREFER='respond-async')
+
+    assert rollups() == {(products[1].id, 4, 80)}
+
+
+@pytest.mark.django_db
+def test_rebuild_backfills_and_verifies(admin_user, products):
+    # Orders written around the order flows, e.g. before the rollups existed
+    for status_, quantity in (('completed', 2), ('pending', 3), ('cancelled', 4)):
+        order = Order.objects.create(owner=admin_user, status=status_)
+        OrderItem.objects.create(order=order, product=products[0], quantity=quantity, price=10)
+
+    with pytest.raises(CommandError, match='rollup rows differ'):
+        call_command('rebuild_sales_rollups', '--verify-only', stdout=StringIO(), stderr=StringIO())
+
+    stdout = StringIO()
+    call_command('rebuild_sales_rollups', stdout=stdout)
+    assert 'match the order items' in stdout.getvalue()
+    assert rollups() == {(products[0].id, 5, 50)}
+
+    # Rerunning gives the same rows
+    call_command('rebuild_sales_rollups', '--from', str(timezone.localdate()), stdout=StringIO())
+    assert rollups() == {(products[0].id, 5, 50)}
+
+
+@pytest.mark.django_db
+def test_withdrawing_sales_never_rolled_up_stops_at_zero(user_client, regular_user, products, monkeypatch):
+    # One stripe, so the withdrawal meets the other order's sales
+    monkeypatch.setattr('inventory.rollups.ROLLUP_STRIPES', 1)
+    first, _ = products
+    place(user_client, [(first, 1)])
+    # Placed before the rollups existed, so its sales were never added
+    order = Order.objects.create(owner=regular_user)
+    OrderItem.objects.create(order=order, product=first, quantity=3, price=10)
+
+    transition_orders([order.pk], 'cancelled')
+    assert rollups() == {(first.id, 0, 0)}
+
+
+@pytest.mark.django_db
+def test_migration_backfills_rollups(admin_user, products):
+    for status_, quantity in (('completed', 2), ('cancelled', 4)):
+        order = Order.objects.create(owner=admin_user, status=status_)
+        OrderItem.objects.create(order=order, product=products[0], quantity=quantity, price=10)
+
+    import_module('inventory.migrations.0021_product_daily_sales').backfill_daily_sales(apps, None)
+    assert rollups() == {(products[0].id, 2, 20)}
+
+
+@pytest.mark.django_db
+def test_migration_restripes_rollups(admin_user, products):
+    orders = []
+    for quantity in (1, 2, 4):
+        orders.append(Order.objects.create(owner=admin_user))
+        OrderItem.objects.create(order=orders[-1], product=products[0], quantity=quantity, price=10)
+    ProductDailySales.objects.create(date=timezone.localdate(), product=products[0], units=7, revenue=70)
+
+    import_module('inventory.migrations.0027_product_daily_sales_stripe').restripe_daily_sales(apps, None)
+    stripes = {}
+    for order, quantity in zip(orders, (1, 2, 4)):
+        stripes[rollup_stripe(order.pk)] = stripes.get(rollup_stripe(order.pk), 0) + quantity
+    assert dict(ProductDailySales.objects.values_list('stripe', 'units')) == stripes
@@ -0,0 +1,86 @@
+import pytest
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from django.utils import timezone
+from rest_framework import status
+from inventory.models import Product, Order, OrderItem, ProductDailySales
+
+URL = '/api/inventory/report/sales/'
+
+
+@pytest.fixture
+def product(admin_user):
+    return Product.objects.create(owner=admin_user, name='Report Product', description='Tablets', quantity=50, price=10)
+
+
+def rollup(product, day, revenue):
+    ProductDailySales.objects.create(product=product, date=date.fromisoformat(day), units=1, revenue=revenue)
+
+
+def order_at(owner, product, created_at, quantity=1, status='completed'):
+    order = Order.objects.create(owner=owner, status=status)
+    OrderItem.objects.create(order=order, product=product, quantity=quantity, price=product.price)
+    Order.objects.filter(pk=order.pk).update(created_at=created_at)
+
+
+@pytest.mark.django_db
+def test_daily_buckets_are_zero_filled(admin_client, product):
+    assert admin_client.post('/api/inventory/orders/', {'items': [{'product': product.id, 'quantity': 3}]},
+                             format='json').status_code == status.HTTP_201_CREATED
+    today = timezone.localdate()
+
+    response = admin_client.get(URL, {'from': str(today - timedelta(days=2)), 'to': str(today)})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data == [
+        {'date': str(today - timedelta(days=2)), 'total_sales': 0},
+        {'date': str(today - timedelta(days=1)), 'total_sales': 0},
+        {'date': str(today), 'total_sales': 30},
+    ]
+
+
+@pytest.mark.django_db
+def test_week_and_month_buckets(admin_client, product):
+    for day, revenue in (('2024-01-31', 5), ('2024-02-01', 7), ('2024-02-05', 11), ('2024-03-01', 13)):
+        rollup(product, day, revenue)
+
+    weeks = admin_client.get(URL, {'from': '2024-01-31', 'to': '2024-02-11', 'interval': 'week'}).data
+    assert weeks == [{'date': '2024-01-29', 'total_sales': 12}, {'date': '2024-02-05', 'total_sales': 11}]
+
+    months = admin_client.get(URL, {'from': '2024-01-01', 'to': '2024-03-31', 'interval': 'month'}).data
+    assert [row['total_sales'] for row in months] == [5, 18, 13]
+    assert [row['date'] for row in months] == ['2024-01-01', '2024-02-01', '2024-03-01']
+
+
+@pytest.mark.django_db
+def test_hourly_buckets_follow_local_time(admin_client, admin_user, product):
+    # Lagos is UTC+1: 22:30 UTC is 23:30 on the 10th, 23:30 UTC is already the 11th
+    order_at(admin_user, product, datetime(2024, 3, 10, 22, 30, tzinfo=dt_timezone.utc), quantity=2)
+    order_at(admin_user, product, datetime(2024, 3, 10, 22, 45, tzinfo=dt_timezone.utc), quantity=5, status='cancelled')
+    order_at(admin_user, product, datetime(2024, 3, 10, 23, 30, tzinfo=dt_timezone.utc), quantity=4)
+
+    hours = admin_client.get(URL, {'from': '2024-03-10', 'to': '2024-03-10', 'interval': 'hour'}).data
+
+    assert len(hours) == 24
+    assert hours[0] == {'hour': '2024-03-10T00:00:00+01:00', 'total_sales': 0}
+    assert hours[-1] == {'hour': '2024-03-10T23:00:00+01:00', 'total_sales': 20}
+    assert sum(row['total_sales'] for row in hours) == 20
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('params, error', [
+    ({'interval': 'year'}, 'Invalid interval'),
+    ({'from': '2024-13-01'}, 'Invalid date'),
+    ({'from': 'yesterday'}, 'Invalid date'),
+    ({'from': '2024-02-01', 'to': '2024-01-01'}, 'from must not be after to'),
+    ({'from': '2024-01-01', 'to': '2024-03-01', 'interval': 'hour'}, 'At most 1000 hour buckets'),
+])
+def test_invalid_ranges(admin_client, params, error):
+    response = admin_client.get(URL, params)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert error in response.data['error']
+
+
+@pytest.mark.django_db
+def test_period_reports_list_days_with_sales(admin_client, product):
+    rollup(product, str(timezone.localdate()), 9)
+    assert admin_client.get(f'{URL}week/').data == [{'date': str(timezone.localdate()), 'total_sales': 9}]
@@ -0,0 +1,100 @@
+import pytest
+from io import StringIO
+from django.core.management import call_command
+from rest_framework import status
+from inventory.models import Product
+
+
+@pytest.fixture
+def products(admin_user):
+    return {
+        'description_match': Product.objects.create(owner=admin_user, name='Panadol Extra', description='Paracetamol and caffeine', quantity=5, price=10),
+        'name_match': Product.objects.create(owner=admin_user, name='Paracetamol 500mg', description='Pain relief', quantity=5, price=10),
+        'other': Product.objects.create(owner=admin_user, name='Amoxicillin', description='Antibiotic capsules', quantity=5, price=10),
+    }
+
+
+@pytest.mark.django_db
+def test_search_ranks_name_matches_first(admin_client, products):
+    response = admin_client.get('/api/inventory/products/search?q=paracetamol')
+    assert response.status_code == status.HTTP_200_OK
+    assert [row['id'] for row in response.data] == [products['name_match'].id, products['description_match'].id]
+    assert response.data[0]['owner'] == products['name_match'].owner.name
+
+
+@pytest.mark.django_db
+def test_search_follows_product_changes(admin_client, products):
+    product = products['other']
+    product.name = 'Augmentin'
+    product.save()
+    products['name_match'].delete()
+
+    assert [row['id'] for row in admin_client.get('/api/inventory/products/search?q=augmentin').data] == [product.id]
+    assert admin_client.get('/api/inventory/products/search?q=amoxicillin').data == []
+    assert [row['id'] for row in admin_client.get('/api/inventory/products/search?q=paracetamol').data] == [products['description_match'].id]
+
+
+@pytest.mark.django_db
+def test_search_treats_query_as_plain_terms(admin_client, products):
+    response = admin_client.get('/api/inventory/products/search?q=pain" relief*(')
+    assert response.status_code == status.HTTP_200_OK
+    assert [row['id'] for row in response.data] == [products['name_match'].id]
+
+
+@pytest.mark.django_db
+def test_search_sees_bulk_upserts(admin_client, products):
+    admin_client.post('/api/inventory/products/bulk/', [
+        {'name': 'Amoxicillin', 'description': 'Broad spectrum penicillin', 'quantity': 1, 'price': 1},
+    ], format='json')
+
+    response = admin_client.get('/api/inventory/products/search?q=penicillin')
+    assert [row['id'] for row in response.data] == [products['other'].id]
+
+
+@pytest.mark.django_db
+def test_reindex_products_rebuilds_index(admin_client, products):
+    stdout = StringIO()
+    call_command('reindex_products', stdout=stdout)
+    assert 'Reindexed 3 products' in stdout.getvalue()
+
+    response = admin_client.get('/api/inventory/products/search?q=antibiotic')
+    assert [row['id'] for row in response.data] == [products['other'].id]
+
+
+@pytest.fixture
+def names(admin_user):
+    for name in ['Paracetamol 500mg', 'paracetamol syrup', 'Paraffin Gauze', 'Panadol', '100% Zinc', '100 Vitamin D']:
+        Product.objects.create(owner=admin_user, name=name, description='', quantity=1, price=1)
+
+
+@pytest.mark.django_db
+def test_autocomplete_matches_prefix_case_insensitively(admin_client, names):
+    response = admin_client.get('/api/inventory/products/autocomplete?q=PARA')
+    assert response.status_code == status.HTTP_200_OK
+    assert [row['name'] for row in response.data] == ['Paracetamol 500mg', 'paracetamol syrup', 'Paraffin Gauze']
+    assert set(response.data[0]) == {'id', 'name'}
+
+
+@pytest.mark.django_db
+def test_autocomplete_limit_and_wildcards(admin_client, names):
+    assert len(admin_client.get('/api/inventory/products/autocomplete?q=pa&limit=2').data) == 2
+    assert [row['name'] for row in admin_client.get('/api/inventory/products/autocomplete?q=100%25').data] == ['100% Zinc']
+    assert admin_client.get('/api/inventory/products/autocomplete?q=pa&limit=0').status_code == status.HTTP_400_BAD_REQUEST
+    assert admin_client.get('/api/inventory/products/autocomplete').status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_autocomplete_uses_prefix_index(names):
+    from django.db import connection
+    if connection.vendor != 'sqlite':
+        pytest.skip('query plan assertion is written for SQLite')
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "EXPLAIN QUERY PLAN SELECT id, name FROM inventory_product WHERE name LIKE %s ESCAPE '\\' "
+            "ORDER BY name COLLATE NOCASE LIMIT 10",
+            ['para%'],
+        )
+        plan = ' '.join(str(row) for row in cursor.fetchall())
+    assert 'inventory_product_name_prefix_idx' in plan
+    assert 'TEMP B-TREE' not in plan
@@ -113,3 +113,74 @@ def test_order_serializer_partial_update():
     updated_order = serializer.save()
     assert updated_order.status == 'completed'
     assert updated_order.items.count() == 1
+
+
+@pytest.mark.django_db
+def test_order_serializer_allocates_stock_in_bulk():
+    user = User.objects.create_user(username='testuser6', email='admin6@mail.com', password='password')
+    first = Product.objects.create(name='Test Product5', description='Test Description', quantity=10, price=10, owner=user)
+    second = Product.objects.create(name='Test Product6', description='Test Description', quantity=10, price=25, owner=user)
+
+    data = {
+        'items': [
+            {'product': first.id, 'quantity': 2},
+            {'product': second.id, 'quantity': 3},
+            {'product': first.id, 'quantity': 4},
+        ]
+    }
+
+    serializer = OrderSerializer(data=data)
+    assert serializer.is_valid()
+    order = serializer.save(owner=user)
+
+    first.refresh_from_db()
+    second.refresh_from_db()
+    assert (first.reserved, second.reserved) == (6, 3)
+    assert sorted(order.items.values_list('quantity', 'price')) == [(2, 10), (3, 25), (4, 10)]
+    assert serializer.data['total_price'] == 2 * 10 + 3 * 25 + 4 * 10
+
+
+@pytest.mark.django_db
+def test_order_serializer_insufficient_stock_across_lines():
+    user = User.objects.create_user(username='testuser7', email='admin7@mail.com', password='password')
+    product = Product.objects.create(name='Test Product7', description='Test Description', quantity=5, price=10, owner=user)
+
+    serializer = OrderSerializer(data={'items': [{'product': product.id, 'quantity': 3}, {'product': product.id, 'quantity': 3}]})
+    assert serializer.is_valid()
+    with pytest.raises(ValidationError):
+        serializer.save(owner=user)
+
+    product.refresh_from_db()
+    assert product.quantity == 5
+    assert not Order.objects.exists()
+
+
+@pytest.mark.django_db
+def test_order_total_keeps_price_at_order_time():
+    user = User.objects.create_user(username='testuser8', email='admin8@mail.com', password='password')
+    product = Product.objects.create(name='Test Product8', description='Test Description', quantity=10, price=10, owner=user)
+
+    serializer = OrderSerializer(data={'items': [{'product': product.id, 'quantity': 3}]})
+    assert serializer.is_valid()
+    order = serializer.save(owner=user)
+    Product.objects.filter(pk=product.pk).update(price=99)
+
+    order = Order.objects.with_details().get(pk=order.pk)
+    assert (order.total_price, order.item_count) == (30, 3)
+    assert OrderSerializer(order).data['total_price'] == 30
+
+
+@pytest.mark.django_db
+def test_order_totals_follow_item_changes():
+    user = User.objects.create_user(username='testuser9', email='admin9@mail.com', password='password')
+    product = Product.objects.create(name='Test Product9', description='Test Description', quantity=10, price=10, owner=user)
+    order = Order.objects.create(owner=user)
+
+    item = OrderItem.objects.create(order=order, product=product, quantity=2, price=10)
+    OrderItem.objects.create(order=order, product=product, quantity=1, price=15)
+    order.refresh_from_db()
+    assert (order.total_price, order.item_count) == (35, 3)
+
+    item.delete()
+    order.refresh_from_db()
+    assert (order.total_price, order.item_count) == (15, 1)
@@ -0,0 +1,114 @@
+import pytest
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from inventory.models import Product, ProductStockStripe, Order, OrderItem
+from inventory.transitions import transition_orders
+
+
+@pytest.fixture
+def hot_product(admin_user):
+    product = Product.objects.create(owner=admin_user, name='Paracetamol', description='Tablets', quantity=10, price=5)
+    call_command('stripe_products', product.id, '--stripes', '3', stdout=StringIO())
+    return product
+
+
+def place(client, product, quantity):
+    return client.post('/api/inventory/orders/', {'items': [{'product': product.id, 'quantity': quantity}]}, format='json')
+
+
+def stripes(product):
+    return list(ProductStockStripe.objects.filter(product=product).order_by('index').values_list('allotment', 'reserved'))
+
+
+@pytest.mark.django_db
+def test_stripes_split_available_stock(hot_product):
+    assert stripes(hot_product) == [(4, 0), (3, 0), (3, 0)]
+
+
+@pytest.mark.django_db
+def test_reservations_go_to_stripes_and_reads_sum_them(user_client, hot_product):
+    for quantity in (3, 3, 2):
+        assert place(user_client, hot_product, quantity).status_code == status.HTTP_201_CREATED
+
+    hot_product.refresh_from_db()
+    assert (hot_product.quantity, hot_product.reserved) == (10, 0)
+    assert sum(reserved for _, reserved in stripes(hot_product)) == 8
+    assert all(reserved <= allotment for allotment, reserved in stripes(hot_product))
+    assert user_client.get(f'/api/inventory/products/{hot_product.id}/').data['reserved'] == 8
+    assert user_client.get('/api/inventory/products/').data['results'][0]['reserved'] == 8
+
+    response = place(user_client, hot_product, 3)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert 'Insufficient stock' in str(response.data)
+
+
+@pytest.mark.django_db
+def test_completing_and_cancelling_striped_orders(user_client, hot_product):
+    shipped = place(user_client, hot_product, 4).data['id']
+    cancelled = place(user_client, hot_product, 2).data['id']
+    assert OrderItem.objects.filter(stock_stripe__isnull=False).count() == 2
+
+    transition_orders([shipped], 'completed')
+    transition_orders([cancelled], 'cancelled')
+
+    hot_product.refresh_from_db()
+    assert hot_product.quantity == 6
+    assert sum(reserved for _, reserved in stripes(hot_product)) == 0
+    assert sum(allotment for allotment, _ in stripes(hot_product)) == 6
+
+
+@pytest.mark.django_db
+def test_completing_a_lapsed_striped_order(user_client, hot_product):
+    order = place(user_client, hot_product, 4).data['id']
+    Order.objects.filter(pk=order).update(reserved_until=timezone.now() - timedelta(minutes=1))
+    call_command('release_expired_reservations', stdout=StringIO())
+    assert sum(reserved for _, reserved in stripes(hot_product)) == 0
+
+    assert transition_orders([order], 'completed')['updated'] == [order]
+    hot_product.refresh_from_db()
+    assert (hot_product.quantity, hot_product.reserved_total) == (6, 0)
+    assert sum(allotment for allotment, _ in stripes(hot_product)) == 6
+
+
+@pytest.mark.django_db
+def test_unstriping_folds_reservations_back(user_client, hot_product):
+    order = place(user_client, hot_product, 4).data['id']
+    call_command('stripe_products', hot_product.id, '--stripes', '0', stdout=StringIO())
+
+    hot_product.refresh_from_db()
+    assert (hot_product.reserved, hot_product.reserved_total) == (4, 4)
+    assert not ProductStockStripe.objects.exists()
+
+    transition_orders([order], 'cancelled')
+    hot_product.refresh_from_db()
+    assert (hot_product.quantity, hot_product.reserved) == (10, 0)
+
+
+@pytest.mark.django_db
+def test_quantity_change_rebalances_stripes(hot_product, django_capture_on_commit_callbacks):
+    hot_product.refresh_from_db()
+    with django_capture_on_commit_callbacks(execute=True):
+        hot_product.quantity = 20
+        hot_product.save()
+    assert stripes(hot_product) == [(7, 0), (7, 0), (6, 0)]
+
+
+@pytest.mark.django_db
+def test_quantity_decrease_rebalances_before_commit(user_client, hot_product):
+    hot_product.refresh_from_db()
+    hot_product.quantity = 3
+    hot_product.save()
+    assert sum(allotment for allotment, _ in stripes(hot_product)) == 3
+    assert place(user_client, hot_product, 4).status_code == status.HTTP_400_BAD_REQUEST
+
+    # Saves that leave the stock alone skip the rebalance
+    hot_product.refresh_from_db()
+    hot_product.price = 7
+    with CaptureQueriesContext(connection) as context:
+        hot_product.save()
+    assert not [query for query in context.captured_queries if 'productstockstripe' in query['sql']]
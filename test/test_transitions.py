@@ -0,0 +1,79 @@
+import pytest
+from rest_framework import status
+from inventory.models import Product, Order, OrderItem
+from inventory.transitions import transition_orders
+
+
+@pytest.fixture
+def stock(admin_user):
+    return [
+        Product.objects.create(owner=admin_user, name=f'Transition Product {i}', description='Tablets', quantity=10, price=5)
+        for i in range(2)
+    ]
+
+
+def make_order(owner, lines, status='pending'):
+    order = Order.objects.create(owner=owner, status=status)
+    OrderItem.objects.bulk_create(
+        OrderItem(order=order, product=product, quantity=quantity, price=product.price) for product, quantity in lines
+    )
+    return order
+
+
+@pytest.mark.django_db
+def test_bulk_cancel_restocks_per_product(admin_client, regular_user, stock):
+    first, second = stock
+    orders = [
+        make_order(regular_user, [(first, 2), (second, 1)]),
+        make_order(regular_user, [(first, 3)]),
+        make_order(regular_user, [(second, 4)], status='completed'),
+    ]
+
+    response = admin_client.post('/api/inventory/orders/status/', {
+        'ids': [order.id for order in orders] + ['missing'], 'status': 'cancelled',
+    }, format='json')
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['updated'] == [orders[0].id, orders[1].id]
+    assert response.data['errors'] == [
+        {'id': orders[2].id, 'error': 'Cannot change status from completed to cancelled'},
+        {'id': 'missing', 'error': 'Order not found'},
+    ]
+    first.refresh_from_db()
+    second.refresh_from_db()
+    assert (first.quantity, second.quantity) == (15, 11)
+
+
+@pytest.mark.django_db
+def test_final_statuses_cannot_be_left(regular_user, stock):
+    order = make_order(regular_user, [(stock[0], 1)])
+    assert transition_orders([order.id], 'completed', batch_size=1)['updated'] == [order.id]
+
+    result = transition_orders([order.id], 'pending')
+    assert result['errors'] == [{'id': order.id, 'error': 'Cannot change status from completed to pending'}]
+    order.refresh_from_db()
+    assert order.status == 'completed'
+
+
+@pytest.mark.django_db
+def test_single_status_update_uses_state_machine(admin_client, regular_user, stock):
+    order = make_order(regular_user, [(stock[0], 4)])
+
+    response = admin_client.patch(f'/api/inventory/orders/{order.id}/status/', {'status': 'cancelled'}, format='json')
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['status'] == 'cancelled'
+    stock[0].refresh_from_db()
+    assert stock[0].quantity == 14
+
+    response = admin_client.patch(f'/api/inventory/orders/{order.id}/status/', {'status': 'cancelled'}, format='json')
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    stock[0].refresh_from_db()
+    assert stock[0].quantity == 14
+
+
+@pytest.mark.django_db
+def test_bulk_status_rejects_bad_requests(admin_client):
+    assert admin_client.post('/api/inventory/orders/status/', {'ids': [], 'status': 'cancelled'},
+                             format='json').status_code == status.HTTP_400_BAD_REQUEST
+    assert admin_client.post('/api/inventory/orders/status/', {'ids': ['x'], 'status': 'shipped'},
+                             format='json').status_code == status.HTTP_400_BAD_REQUEST